@@ -0,0 +1,86 @@
+import os
+import sys
+import json
+import time
+import platform
+from argparse import ArgumentParser
+
+from ml_tracking_ops.bench import logger_bench, decode_bench, web_bench, sweep_bench, import_bench
+
+
+SUITES = {
+    "logger": logger_bench.run,
+    "decode": decode_bench.run,
+    "web": web_bench.run,
+    "sweep": sweep_bench.run,
+    "imports": import_bench.run
+}
+
+
+def collect_arguments():
+    parser = ArgumentParser(
+        prog="python -m ml_tracking_ops.bench",
+        description="Benchmarks the logger, the log decoding, the web app, the sweep launcher and the import time. Results are printed as JSON."
+    )
+    parser.add_argument("--suites", type=str, nargs="+", choices=list(SUITES), default=list(SUITES),
+        help="Benchmark suites to run."
+    )
+    parser.add_argument("--output", type=str, default=None,
+        help="File to which the results are written. Defaults to the standard output."
+    )
+    parser.add_argument("--calls", type=int, default=100000,
+        help="Number of add_scalar calls measured for each logger setting."
+    )
+    parser.add_argument("--max_events", type=int, nargs="+", default=[10, 100, 1000],
+        help="Capacities of the metric buffers for which add_scalar is measured."
+    )
+    parser.add_argument("--log_intervals", type=float, nargs="+", default=[0.1, 0.5, 2.0],
+        help="Flush intervals for which add_scalar is measured."
+    )
+    parser.add_argument("--run_lengths", type=int, nargs="+", default=[1000, 10000, 100000, 1000000],
+        help="Numbers of points logged before the flush latency is measured."
+    )
+    parser.add_argument("--experiments", type=int, default=20, help="Number of experiments in the synthetic logdir.")
+    parser.add_argument("--sweeps", type=int, default=2, help="Number of sweeps in the synthetic logdir.")
+    parser.add_argument("--trials", type=int, default=50, help="Number of trials of each synthetic sweep.")
+    parser.add_argument("--metrics", type=int, default=8, help="Number of metrics of each synthetic run.")
+    parser.add_argument("--points", type=int, default=10000, help="Number of points of each synthetic metric.")
+    parser.add_argument("--sweep_trials", type=int, default=10,
+        help="Number of trials launched for measuring the sweep launch overhead."
+    )
+    parser.add_argument("--import_budget_ms", type=float, default=50,
+        help="Maximum import time of the logger and of the CLI. The benchmarks exit with an error if it is exceeded."
+    )
+    cfg = parser.parse_args()
+    return cfg
+
+
+def main():
+    cfg = collect_arguments()
+    results = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "settings": vars(cfg)
+    }
+    for suite in cfg.suites:
+        print(f"Running the {suite} benchmarks", file=sys.stderr)
+        results[suite] = SUITES[suite](cfg)
+
+    if cfg.output is None:
+        print(json.dumps(results, indent=2))
+    else:
+        with open(cfg.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    over_budget = [result["entry_point"] for result in results.get("imports", []) if result.get("within_budget") is False]
+    if over_budget:
+        print(f"Import time budget exceeded by: {', '.join(over_budget)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
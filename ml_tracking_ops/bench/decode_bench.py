@@ -0,0 +1,40 @@
+import os
+import tempfile
+
+from ml_tracking_ops.bench.synthetic import metric_names, write_synthetic_log
+from ml_tracking_ops.bench.timing import measure
+from ml_tracking_ops.experiment.codecs import make_codec
+from ml_tracking_ops.experiment.log_format import CODEC_RAW
+from ml_tracking_ops.ml_tracking_ops.utils import load_experiment_columns, load_metric_columns, load_metric_summary
+
+
+def bench_decode(num_metrics: int, num_points: int, repeat: int = 5, codec: int = CODEC_RAW):
+    """Measures the decoding throughput of a segment log file whose segments are encoded with the given codec.
+
+    Decoding the whole log file, decoding a single metric and summarizing a single metric are measured separately.
+
+    Returns:
+        Dictionary with the timings and the throughput (points/s) of each way of decoding
+    """
+    with tempfile.TemporaryDirectory() as logdir:
+        log_file_path = os.path.join(logdir, "run.dat")
+        write_synthetic_log(log_file_path, num_metrics, num_points, codec=codec)
+        metric_name = metric_names(num_metrics)[0]
+
+        results = {"codec": codec, "metrics": num_metrics, "points_per_metric": num_points, "file_bytes": os.path.getsize(log_file_path)}
+        for name, fn, decoded_points in [
+            ("all_metrics", lambda: load_experiment_columns(log_file_path), num_metrics * num_points),
+            ("single_metric", lambda: load_metric_columns(log_file_path, metric_name), num_points),
+            ("single_metric_summary", lambda: load_metric_summary(log_file_path, metric_name), num_points)
+        ]:
+            timing = measure(fn, repeat)
+            results[name] = {**timing, "points_per_s": decoded_points / timing["median_s"]}
+    return results
+
+
+def run(cfg):
+    """Runs the decoding benchmarks with the settings parsed from the command line."""
+    return [
+        bench_decode(cfg.metrics, cfg.points),
+        bench_decode(cfg.metrics, cfg.points, codec=make_codec(delta_encoding=True, value_encoding="xor", compression="zlib"))
+    ]
@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import subprocess
+
+
+# Modules which the logging client and the CLI mustn't import when they are imported
+FORBIDDEN_MODULES = ["numpy", "flask", "watchdog", "multiprocessing", "sqlite3"]
+# Entry points which are measured, along with the statement which imports them
+ENTRY_POINTS = {
+    "logger": "import ml_tracking_ops.experiment.logger",
+    "cli": "import ml_tracking_ops.main"
+}
+
+
+def _run_python(args: list):
+    # Entry points have to be imported even if the library isn't installed
+    package_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(path for path in [package_root, os.environ.get("PYTHONPATH")] if path)
+    return subprocess.run([sys.executable, *args], env=env, capture_output=True, text=True, check=True)
+
+
+def _parse_importtime(output: str, module_name: str):
+    """Returns the cumulative import time of the module in seconds from the output of `python -X importtime`."""
+    cumulative_us = 0
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if name.strip() == module_name:
+            cumulative_us = max(cumulative_us, int(cumulative))
+    return cumulative_us / 1e6
+
+
+def bench_import(name: str, statement: str, budget_ms: float, repeat: int = 5):
+    """Measures the import time of the entry point with `python -X importtime`, in a fresh interpreter every time.
+
+    Arguments:
+        name: Name of the entry point
+        statement: Statement which imports the entry point
+        budget_ms: Maximum import time of the entry point in milliseconds
+        repeat: Number of measurements, of which the fastest is compared to the budget
+
+    Returns:
+        Dictionary with the import time, the startup time of the interpreter including the import,
+        the forbidden modules which got imported and whether the entry point fits into the budget
+    """
+    module_name = statement.split()[-1]
+    check_modules = (
+        "import sys; "
+        f"print(' '.join(m for m in {FORBIDDEN_MODULES} if m in sys.modules))"
+    )
+    import_times = []
+    startup_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = _run_python(["-X", "importtime", "-c", f"{statement}; {check_modules}"])
+        startup_times.append(time.perf_counter() - start)
+        import_times.append(_parse_importtime(result.stderr, module_name))
+    forbidden = result.stdout.split()
+
+    return {
+        "entry_point": name,
+        "import_s": min(import_times),
+        "startup_s": min(startup_times),
+        "budget_s": budget_ms / 1000,
+        "forbidden_modules": forbidden,
+        "within_budget": min(import_times) * 1000 <= budget_ms and not forbidden
+    }
+
+
+def bench_cli_help(repeat: int = 5):
+    """Measures the wall time of `ml-tracking-ops --help` against the startup time of a bare interpreter."""
+    interpreter_times = []
+    help_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _run_python(["-c", "pass"])
+        interpreter_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        _run_python(["-c", "import sys; from ml_tracking_ops.main import main; sys.argv[1:] = ['--help']; main()"])
+        help_times.append(time.perf_counter() - start)
+    return {
+        "entry_point": "cli --help",
+        "interpreter_startup_s": min(interpreter_times),
+        "help_s": min(help_times)
+    }
+
+
+def run(cfg):
+    """Runs the import time benchmarks with the settings parsed from the command line."""
+    results = [
+        bench_import(name, statement, cfg.import_budget_ms) for name, statement in ENTRY_POINTS.items()
+    ]
+    results.append(bench_cli_help())
+    return results
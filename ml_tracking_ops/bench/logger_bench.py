@@ -0,0 +1,126 @@
+import os
+import glob
+import time
+import tempfile
+import statistics
+
+from array import array
+
+from ml_tracking_ops.experiment.logger import ExperimentLogger
+
+
+# Flushes in these benchmarks are triggered explicitly, so the periodic flush shouldn't interfere
+NO_PERIODIC_FLUSH = 3600.0
+# Codec settings of the logger (delta_encoding, value_encoding, compression) whose disk usage is compared
+CODEC_SETTINGS = [
+    (False, "raw", None),
+    (True, "raw", None),
+    (True, "xor", "zlib"),
+    (True, "xor", "lzma"),
+    (True, "float32", "zlib")
+]
+
+
+def bench_add_scalar(max_events_options, log_interval_options, num_calls: int, num_metrics: int = 4):
+    """Measures the cost of a single add_scalar call for each combination of the logger settings.
+
+    Returns:
+        List of results, one for each (max_events, log_interval, async_logging) combination
+    """
+    metric_names = [f"metric_{metric_idx}" for metric_idx in range(num_metrics)]
+    results = []
+    for async_logging in [False, True]:
+        for max_events in max_events_options:
+            for log_interval in log_interval_options:
+                with tempfile.TemporaryDirectory() as logdir:
+                    logger = ExperimentLogger(
+                        logdir, max_events=max_events, log_interval=log_interval, async_logging=async_logging
+                    )
+                    start = time.perf_counter_ns()
+                    for step in range(num_calls):
+                        logger.add_scalar(metric_names[step % num_metrics], 0.5, step)
+                    elapsed = time.perf_counter_ns() - start
+                    logger._clean_up()
+                results.append({
+                    "max_events": max_events,
+                    "log_interval": log_interval,
+                    "async_logging": async_logging,
+                    "calls": num_calls,
+                    "ns_per_call": elapsed / num_calls
+                })
+    return results
+
+
+def bench_flush(run_lengths, flush_size: int = 1000, repeat: int = 10):
+    """Measures the latency of flushing the metric buffers as a function of the number of points already logged.
+
+    Returns:
+        List of results, one for each run length
+    """
+    results = []
+    values = array("d", [0.5]) * flush_size
+    for run_length in run_lengths:
+        with tempfile.TemporaryDirectory() as logdir:
+            # Buffers are never dumped before the explicit flush
+            logger = ExperimentLogger(logdir, max_events=flush_size + 1, log_interval=NO_PERIODIC_FLUSH)
+            for start in range(0, run_length, flush_size):
+                logger.add_scalar_array("metric", values, array("q", range(start, start + flush_size)))
+                logger._dump_all()
+
+            durations = []
+            for flush_idx in range(repeat):
+                first_step = run_length + flush_idx * flush_size
+                logger.add_scalar_array("metric", values, array("q", range(first_step, first_step + flush_size)))
+                start = time.perf_counter_ns()
+                logger._dump_all()
+                durations.append(time.perf_counter_ns() - start)
+            logger._clean_up()
+        results.append({
+            "run_length": run_length,
+            "flush_size": flush_size,
+            "median_flush_ms": statistics.median(durations) / 1e6,
+            "max_flush_ms": max(durations) / 1e6
+        })
+    return results
+
+
+def bench_bytes_per_point(num_points: int, num_metrics: int = 4, max_events: int = 100,
+                          delta_encoding: bool = False, value_encoding: str = "raw", compression: str = None):
+    """Measures the number of bytes on disk taken by a single logged point with the given codec settings.
+
+    Returns:
+        Dictionary with the size of the log file and of the summary file, and the bytes per point of the log file
+    """
+    with tempfile.TemporaryDirectory() as logdir:
+        logger = ExperimentLogger(
+            logdir, max_events=max_events, log_interval=NO_PERIODIC_FLUSH,
+            delta_encoding=delta_encoding, value_encoding=value_encoding, compression=compression
+        )
+        for step in range(num_points):
+            logger.add_scalars(step, {f"metric_{metric_idx}": step * 0.5 for metric_idx in range(num_metrics)})
+        logger._clean_up()
+        log_file_size = os.path.getsize(logger._db_path)
+        summary_file_size = sum(
+            os.path.getsize(path) for path in glob.glob(os.path.join(logdir, "*", "*.summary.json"))
+        )
+    return {
+        "points": num_points * num_metrics,
+        "max_events": max_events,
+        "delta_encoding": delta_encoding,
+        "value_encoding": value_encoding,
+        "compression": compression,
+        "log_file_bytes": log_file_size,
+        "summary_file_bytes": summary_file_size,
+        "bytes_per_point": log_file_size / (num_points * num_metrics)
+    }
+
+
+def run(cfg):
+    """Runs the logger benchmarks with the settings parsed from the command line."""
+    return {
+        "add_scalar": bench_add_scalar(cfg.max_events, cfg.log_intervals, cfg.calls),
+        "flush": bench_flush(cfg.run_lengths),
+        "disk": [bench_bytes_per_point(cfg.points, delta_encoding=delta_encoding, value_encoding=value_encoding,
+                                       compression=compression)
+                 for delta_encoding, value_encoding, compression in CODEC_SETTINGS]
+    }
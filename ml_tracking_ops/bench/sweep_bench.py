@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import tempfile
+import subprocess
+import contextlib
+
+from ml_tracking_ops.experiment.experiment_tracking import HyperparameterSweep
+from ml_tracking_ops.experiment.sampler import Uniform
+
+
+# Training script which only creates a logger and logs a single value. It can be started as a script
+# or its entry function can be called by the warm trial workers
+TRIAL_SCRIPT = """
+from argparse import ArgumentParser
+from ml_tracking_ops.experiment.logger import ExperimentLogger
+
+def train(logdir, lr):
+    logger = ExperimentLogger(logdir)
+    logger.add_scalar("loss", lr, 0)
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--logdir", type=str)
+    parser.add_argument("--lr", type=float)
+    cfg = parser.parse_args()
+    train(cfg.logdir, cfg.lr)
+"""
+
+
+def bench_sweep_launch(num_trials: int, max_parallel_runs: int = 1, entry_function: str = None):
+    """Measures the overhead of launching a trial of a sweep, using a trial which does no work.
+
+    The startup time of a bare interpreter is reported as well, since it bounds the overhead from below.
+
+    Arguments:
+        num_trials: Number of trials of the sweep
+        max_parallel_runs: Maximum number of trials which run concurrently
+        entry_function: If given, trials are forked from a warm parent which calls this function of the script
+
+    Returns:
+        Dictionary with the wall time of the sweep and the time per trial
+    """
+    # Trials have to import the library even if it isn't installed
+    package_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    python_path = os.pathsep.join(path for path in [package_root, os.environ.get("PYTHONPATH")] if path)
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    interpreter_startup = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as logdir:
+        script_path = os.path.join(logdir, "trial.py")
+        with open(script_path, "w") as f:
+            f.write(TRIAL_SCRIPT)
+
+        sweep = HyperparameterSweep(
+            script_name=script_path,
+            hyperparameters={"lr": Uniform(0.0001, 0.1)},
+            max_runs=num_trials,
+            logdir=logdir,
+            max_parallel_runs=max_parallel_runs,
+            worker_env={"PYTHONPATH": python_path},
+            entry_function=entry_function,
+            seed=0
+        )
+        # Progress of the sweep would mix with the printed results
+        with contextlib.redirect_stdout(sys.stderr):
+            start = time.perf_counter()
+            sweep.run()
+            sweep_time = time.perf_counter() - start
+
+    return {
+        "trials": num_trials,
+        "max_parallel_runs": max_parallel_runs,
+        "warm_workers": entry_function is not None,
+        "interpreter_startup_s": interpreter_startup,
+        "sweep_s": sweep_time,
+        "per_trial_s": sweep_time / num_trials
+    }
+
+
+def run(cfg):
+    """Runs the sweep benchmarks with the settings parsed from the command line."""
+    return [
+        bench_sweep_launch(cfg.sweep_trials),
+        bench_sweep_launch(cfg.sweep_trials, entry_function="train")
+    ]
@@ -0,0 +1,86 @@
+import os
+import json
+
+from array import array
+
+import numpy as np
+
+from ml_tracking_ops.experiment.log_format import CODEC_RAW, encode_file_header, encode_scalar_segment
+
+
+SWEEP_CONFIG_FILENAME = "experiment_description.json"
+
+
+def metric_names(num_metrics: int):
+    """Names of the synthetic metrics, e.g. "metric_000"."""
+    return [f"metric_{metric_idx:03d}" for metric_idx in range(num_metrics)]
+
+
+def write_synthetic_log(log_file_path: str, num_metrics: int, num_points: int, segment_size: int = 100, seed: int = 0,
+                        codec: int = CODEC_RAW):
+    """Writes a segment log file with random walks of the given number of metrics.
+
+    Segments of the metrics are interleaved, the same way the logger flushes its metric buffers.
+
+    Arguments:
+        log_file_path: Path of the created log file
+        num_metrics: Number of logged metrics
+        num_points: Number of points of each metric
+        segment_size: Number of points of a single segment, i.e. the capacity of the metric buffers
+        seed: Seed of the random walks
+        codec: Codec of the segments, see codecs.make_codec
+    """
+    rng = np.random.default_rng(seed)
+    steps = array("q", range(num_points))
+    times = array("d")
+    times.frombytes((np.arange(num_points) * 0.01).tobytes())
+    series = []
+    for _ in range(num_metrics):
+        values = array("d")
+        values.frombytes(np.cumsum(rng.standard_normal(num_points)).tobytes())
+        series.append(values)
+
+    with open(log_file_path, "wb") as f:
+        f.write(encode_file_header())
+        for start in range(0, num_points, segment_size):
+            end = min(start + segment_size, num_points)
+            for metric_name, values in zip(metric_names(num_metrics), series):
+                f.write(encode_scalar_segment(
+                    metric_name, steps[start:end], values[start:end], times[start:end], codec=codec
+                ))
+
+
+def create_synthetic_logdir(logdir: str, num_experiments: int, num_sweeps: int, trials_per_sweep: int,
+                            num_metrics: int, num_points: int):
+    """Creates a logdir with synthetic experiments and sweeps, laid out the same way the library lays them out.
+
+    Returns:
+        Tuple of (experiment directory names, sweep directory names)
+    """
+    os.makedirs(logdir, exist_ok=True)
+    experiment_dirs = [f"Experiment_{experiment_idx:05d}" for experiment_idx in range(num_experiments)]
+    for experiment_idx, experiment_dir in enumerate(experiment_dirs):
+        os.makedirs(os.path.join(logdir, experiment_dir), exist_ok=True)
+        write_synthetic_log(
+            os.path.join(logdir, experiment_dir, f"{experiment_dir}.dat"), num_metrics, num_points, seed=experiment_idx
+        )
+
+    sweep_dirs = [f"Sweep_{sweep_idx:05d}" for sweep_idx in range(num_sweeps)]
+    for sweep_idx, sweep_dir in enumerate(sweep_dirs):
+        sweep_dir_abs = os.path.join(logdir, sweep_dir)
+        os.makedirs(sweep_dir_abs, exist_ok=True)
+        with open(os.path.join(sweep_dir_abs, SWEEP_CONFIG_FILENAME), "w") as f:
+            json.dump({
+                "main_script_name": "train.py",
+                "hyperparameters": {"lr": {"hyp_type": "uniform", "hyp_desc": "Uniform(0.0001, 0.1)"}},
+                "max_runs": trials_per_sweep,
+                "optimization_metric": metric_names(num_metrics)[0],
+                "optimization_goal": "max",
+                "sampled_hyperparameters": [{"lr": 0.001 * (trial_id + 1)} for trial_id in range(trials_per_sweep)]
+            }, f)
+        for trial_id in range(trials_per_sweep):
+            write_synthetic_log(
+                os.path.join(sweep_dir_abs, f"trial-{trial_id:05d}.dat"), num_metrics, num_points,
+                seed=sweep_idx * trials_per_sweep + trial_id
+            )
+    return experiment_dirs, sweep_dirs
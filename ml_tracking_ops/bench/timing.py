@@ -0,0 +1,20 @@
+import time
+import statistics
+
+
+def measure(fn, repeat: int = 5):
+    """Calls the function @repeat times and summarizes the durations of the calls.
+
+    Returns:
+        Dictionary with the minimum, the median and the maximum duration in seconds
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return {
+        "min_s": min(durations),
+        "median_s": statistics.median(durations),
+        "max_s": max(durations)
+    }
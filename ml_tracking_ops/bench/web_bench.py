@@ -0,0 +1,80 @@
+import time
+import tempfile
+
+from ml_tracking_ops.bench.synthetic import metric_names, create_synthetic_logdir
+from ml_tracking_ops.bench.timing import measure
+from ml_tracking_ops.ml_tracking_ops import app, routes
+
+
+def _request(client, url: str):
+    response = client.get(url)
+    assert response.status_code == 200, f"Request {url} failed with status {response.status_code}"
+    return response
+
+
+def _time_request(client, url: str):
+    start = time.perf_counter()
+    _request(client, url)
+    return time.perf_counter() - start
+
+
+def bench_endpoints(num_experiments: int, num_sweeps: int, trials_per_sweep: int, num_metrics: int,
+                    num_points: int, max_points: int = 2000, repeat: int = 5):
+    """Measures the latency of the web app endpoints on a synthetic logdir.
+
+    Each endpoint is measured cold (nothing is cached nor persisted), after a restart of the server
+    (the index persisted inside of the logdir is present, but nothing is cached in memory) and warm.
+
+    Returns:
+        Dictionary with the size of the logdir and the timings of each endpoint
+    """
+    assert num_experiments > 0 and num_sweeps > 0, "Endpoints are benchmarked on at least one experiment and sweep"
+    with tempfile.TemporaryDirectory() as logdir:
+        experiment_dirs, sweep_dirs = create_synthetic_logdir(
+            logdir, num_experiments, num_sweeps, trials_per_sweep, num_metrics, num_points
+        )
+        metric_name = metric_names(num_metrics)[0]
+        # Data endpoints rely on the state registered by the page endpoints, so the order matters
+        urls = [
+            "/experiments",
+            f"/get_experiment_data/{experiment_dirs[0]}?max_points={max_points}",
+            f"/get_metric/{experiment_dirs[0]}/{metric_name}?max_points={max_points}",
+            "/sweeps",
+            f"/get_sweep_data/{sweep_dirs[0]}",
+            f"/get_sweep_data/{sweep_dirs[0]}?full=1&max_points={max_points}",
+            f"/query_sweep/{sweep_dirs[0]}?sort=-metric.{metric_name}.best&limit=20",
+            f"/query_sweep/{sweep_dirs[0]}?filter=hp.lr:gt:0.01&sort=-metric.{metric_name}.best&limit=20&offset=20",
+            f"/get_metric/{sweep_dirs[0]}:trial-00000/{metric_name}?max_points={max_points}"
+        ]
+
+        app.config["logdir"] = logdir
+        client = app.test_client()
+        routes.loaded_data.clear()
+        cold = {url: _time_request(client, url) for url in urls}
+        routes.loaded_data.clear()
+        restart = {url: _time_request(client, url) for url in urls}
+        warm = {url: measure(lambda: _request(client, url), repeat) for url in urls}
+        response_bytes = {url: len(_request(client, url).data) for url in urls}
+        routes.loaded_data.clear()
+
+    return {
+        "experiments": num_experiments,
+        "sweeps": num_sweeps,
+        "trials_per_sweep": trials_per_sweep,
+        "metrics": num_metrics,
+        "points_per_metric": num_points,
+        "endpoints": [
+            {
+                "url": url,
+                "cold_s": cold[url],
+                "restart_s": restart[url],
+                "warm": warm[url],
+                "response_bytes": response_bytes[url]
+            } for url in urls
+        ]
+    }
+
+
+def run(cfg):
+    """Runs the endpoint benchmarks with the settings parsed from the command line."""
+    return bench_endpoints(cfg.experiments, cfg.sweeps, cfg.trials, cfg.metrics, cfg.points)
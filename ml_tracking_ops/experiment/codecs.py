@@ -0,0 +1,161 @@
+import lzma
+import zlib
+import struct
+
+from array import array
+
+
+# Codec of a segment is a combination of these flags, 0 being the raw codec (CODEC_RAW)
+# Steps are stored as zigzag varints of the differences between consecutive steps
+CODEC_DELTA_STEPS = 0x01
+# Times are stored as zigzag varints of the differences between bit patterns of consecutive times
+CODEC_DELTA_TIMES = 0x02
+# Values are stored as XOR of bit patterns of consecutive values, or rounded to float32
+CODEC_VALUES_XOR = 0x04
+CODEC_VALUES_FLOAT32 = 0x08
+CODEC_VALUES_MASK = 0x0C
+# Whole payload is compressed with zlib or lzma
+CODEC_ZLIB = 0x10
+CODEC_LZMA = 0x20
+CODEC_COMPRESSION_MASK = 0x30
+
+VALUE_ENCODINGS = {"raw": 0, "xor": CODEC_VALUES_XOR, "float32": CODEC_VALUES_FLOAT32}
+COMPRESSIONS = {None: 0, "zlib": CODEC_ZLIB, "lzma": CODEC_LZMA}
+
+# Sizes of the steps and times sections, which precede the sections themselves
+SECTIONS_HEADER = struct.Struct("<II")
+
+
+def make_codec(delta_encoding: bool = False, value_encoding: str = "raw", compression: str = None):
+    """Combines the codec flags of the segment encoding.
+
+    Arguments:
+        delta_encoding: If True, steps and times are delta encoded
+        value_encoding: "raw" keeps values as float64, "xor" keeps the XOR of consecutive values (lossless)
+            and "float32" rounds values to float32 (lossy)
+        compression: None, "zlib" or "lzma"
+    """
+    assert value_encoding in VALUE_ENCODINGS, \
+        f"Invalid value encoding. Expected one of {list(VALUE_ENCODINGS)} but received {value_encoding}"
+    assert compression in COMPRESSIONS, \
+        f"Invalid compression. Expected one of {list(COMPRESSIONS)} but received {compression}"
+    return (CODEC_DELTA_STEPS | CODEC_DELTA_TIMES if delta_encoding else 0) | \
+        VALUE_ENCODINGS[value_encoding] | COMPRESSIONS[compression]
+
+
+def _encode_varints(np, deltas):
+    """Encodes int64 differences as zigzag LEB128 varints, all at once."""
+    zigzag = (deltas.astype(np.int64) << np.int64(1)) ^ (deltas.astype(np.int64) >> np.int64(63))
+    zigzag = zigzag.view(np.uint64)
+    # Byte k of a varint holds bits [7k, 7k + 7) and exists only if some higher bit is set
+    shifts = np.arange(10, dtype=np.uint64) * np.uint64(7)
+    shifted = zigzag[:, None] >> shifts[None, :]
+    groups = shifted & np.uint64(0x7F)
+    num_bytes = 1 + np.count_nonzero(shifted[:, 1:], axis=1)
+    present = np.arange(10)[None, :] < num_bytes[:, None]
+    continued = np.arange(10)[None, :] < (num_bytes - 1)[:, None]
+    encoded = (groups | (continued.astype(np.uint64) << np.uint64(7))).astype(np.uint8)
+    return encoded[present].tobytes()
+
+
+def _decode_varints(np, data: bytes, num_values: int):
+    """Decodes @num_values zigzag LEB128 varints into int64 differences."""
+    if num_values == 0:
+        return np.zeros(0, dtype=np.int64)
+    encoded = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(encoded < 0x80)[:num_values]
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    # Position of each byte within its varint
+    positions = np.arange(len(encoded)) - np.repeat(starts, ends - starts + 1)
+    groups = (encoded & 0x7F).astype(np.uint64) << (positions.astype(np.uint64) * np.uint64(7))
+    zigzag = np.bitwise_or.reduceat(groups, starts)
+    return ((zigzag >> np.uint64(1)).view(np.int64)) ^ -((zigzag & np.uint64(1)).view(np.int64))
+
+
+def _shuffle(np, column, item_size: int):
+    """Groups the i-th bytes of all elements together, which makes the column far more compressible."""
+    return column.view(np.uint8).reshape(-1, item_size).T.tobytes()
+
+
+def _unshuffle(np, data: bytes, item_size: int):
+    return np.frombuffer(data, dtype=np.uint8).reshape(item_size, -1).T.copy()
+
+
+def encode_payload(codec: int, steps: array, values: array, times: array, num_points: int):
+    """Encodes the columns of a scalar segment with a codec other than the raw one.
+
+    The payload consists of the sizes of the steps and times sections, followed by the steps, times
+    and values sections, and is then compressed as a whole if the codec asks for compression.
+    """
+    import numpy as np
+
+    steps = np.frombuffer(steps, dtype=np.int64, count=num_points)
+    values = np.frombuffer(values, dtype=np.float64, count=num_points)
+    times = np.frombuffer(times, dtype=np.float64, count=num_points)
+
+    if codec & CODEC_DELTA_STEPS:
+        steps_section = _encode_varints(np, np.diff(steps, prepend=np.int64(0)))
+    else:
+        steps_section = steps.astype("<i8").tobytes()
+    if codec & CODEC_DELTA_TIMES:
+        times_section = _encode_varints(np, np.diff(times.view(np.int64), prepend=np.int64(0)))
+    else:
+        times_section = times.astype("<f8").tobytes()
+    if codec & CODEC_VALUES_MASK == CODEC_VALUES_XOR:
+        bits = values.astype("<f8").view(np.uint64)
+        values_section = _shuffle(np, bits ^ np.concatenate(([np.uint64(0)], bits[:-1])), 8)
+    elif codec & CODEC_VALUES_MASK == CODEC_VALUES_FLOAT32:
+        values_section = _shuffle(np, values.astype("<f4"), 4)
+    else:
+        values_section = values.astype("<f8").tobytes()
+
+    payload = b"".join((
+        SECTIONS_HEADER.pack(len(steps_section), len(times_section)), steps_section, times_section, values_section
+    ))
+    if codec & CODEC_COMPRESSION_MASK == CODEC_ZLIB:
+        return zlib.compress(payload)
+    if codec & CODEC_COMPRESSION_MASK == CODEC_LZMA:
+        return lzma.compress(payload)
+    return payload
+
+
+def decode_payload(codec: int, payload: bytes, num_points: int):
+    """Decodes the payload of a scalar segment encoded by encode_payload.
+
+    Returns:
+        Tuple of (steps, values, times) arrays with typecodes "q", "d" and "d"
+    """
+    import numpy as np
+
+    if codec & CODEC_COMPRESSION_MASK == CODEC_ZLIB:
+        payload = zlib.decompress(payload)
+    elif codec & CODEC_COMPRESSION_MASK == CODEC_LZMA:
+        payload = lzma.decompress(payload)
+    steps_size, times_size = SECTIONS_HEADER.unpack_from(payload)
+    steps_start = SECTIONS_HEADER.size
+    times_start = steps_start + steps_size
+    values_start = times_start + times_size
+    steps_section = payload[steps_start:times_start]
+    times_section = payload[times_start:values_start]
+    values_section = payload[values_start:]
+
+    if codec & CODEC_DELTA_STEPS:
+        steps = np.cumsum(_decode_varints(np, steps_section, num_points), dtype=np.int64)
+    else:
+        steps = np.frombuffer(steps_section, dtype="<i8")
+    if codec & CODEC_DELTA_TIMES:
+        times = np.cumsum(_decode_varints(np, times_section, num_points), dtype=np.int64).view(np.float64)
+    else:
+        times = np.frombuffer(times_section, dtype="<f8")
+    if codec & CODEC_VALUES_MASK == CODEC_VALUES_XOR:
+        xors = _unshuffle(np, values_section, 8).view("<u8").ravel()
+        values = np.bitwise_xor.accumulate(xors).view("<f8")
+    elif codec & CODEC_VALUES_MASK == CODEC_VALUES_FLOAT32:
+        values = _unshuffle(np, values_section, 4).view("<f4").ravel()
+    else:
+        values = np.frombuffer(values_section, dtype="<f8")
+
+    columns = (array("q"), array("d"), array("d"))
+    for column, decoded, dtype in zip(columns, (steps, values, times), (np.int64, np.float64, np.float64)):
+        column.frombytes(decoded.astype(dtype).tobytes())
+    return columns
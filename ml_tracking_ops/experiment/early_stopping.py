@@ -0,0 +1,210 @@
+import os
+import struct
+import threading
+
+
+# Environment variables through which the sweep advertises the channel to the training script
+ADDRESS_ENV_VAR = "ML_TRACKING_OPS_EARLY_STOPPING_ADDRESS"
+AUTHKEY_ENV_VAR = "ML_TRACKING_OPS_EARLY_STOPPING_AUTHKEY"
+METRIC_ENV_VAR = "ML_TRACKING_OPS_EARLY_STOPPING_METRIC"
+EVAL_EVERY_ENV_VAR = "ML_TRACKING_OPS_EARLY_STOPPING_EVAL_EVERY"
+TRIAL_ID_ENV_VAR = "ML_TRACKING_OPS_TRIAL_ID"
+
+# Single metric update: step (int64) and value (float64)
+METRIC_UPDATE = struct.Struct("<qd")
+
+
+class EarlyStoppingMonitor:
+    """Tracks the patience of a single training run.
+
+    Terminates the training process after specified metric hasn't improved.
+    """
+
+    def __init__(self, process, metric_name: str, max_patience: int, goal: str, trial_id: int = 0,
+                 scheduler=None):
+        """Initializes the module.
+
+        Arguments:
+            process: Handle of the training process to terminate
+            metric_name: Metric which is monitored
+            max_patience: Maximum number of updates during which the metric must improve.
+                If None, the patience is not monitored
+            goal: "max" or "min", depending on whether the metric is maximized or minimized
+            trial_id: Id of the monitored trial
+            scheduler: Trial scheduler which can stop the trial based on values of other trials
+        """
+        self._process = process
+        self._trial_id = trial_id
+        self._scheduler = scheduler
+        self._metric_name = metric_name
+        self._max_patience = max_patience
+        self._goal = goal
+        self._patience_cnt = 0
+        self.best_value = None
+        self.last_value = None
+        self.stopped = False
+
+    def update(self, step: int, value: float):
+        """Updates the patience counter with the newly reported metric value."""
+        if self.stopped:
+            return
+        self.last_value = value
+        if self.best_value is None:
+            improved = True
+        elif self._goal == "max":
+            improved = value > self.best_value
+        else:
+            improved = value < self.best_value
+
+        if improved:
+            self.best_value = value
+            self._patience_cnt = 0
+        else:
+            self._patience_cnt += 1
+
+        # Specified metric hasn't improved for the @max_patience updates
+        if self._patience_cnt == self._max_patience:
+            # Notify the user that the training process was stopped due to "Early Stopping"
+            print(f"Early stopping. Best value of {self.best_value} was achieved for metric: {self._metric_name}")
+            self.stop()
+        elif self._scheduler is not None and not self._scheduler.report(self._trial_id, step, value):
+            print(f"Trial {self._trial_id + 1} stopped by the scheduler at step {step}. "
+                  f"Best value of {self.best_value} was achieved for metric: {self._metric_name}")
+            self.stop()
+
+    def stop(self):
+        """Terminates the monitored training process."""
+        self.stopped = True
+        if self._process.poll() is None:
+            self._process.kill()
+
+
+class EarlyStoppingServer:
+    """Receives metric updates from the training processes started by the sweep.
+
+    Each training process connects to the server and identifies itself with its trial id,
+    after which it sends compact (step, value) updates of the monitored metric.
+    Updates are dispatched to the monitor registered for that trial.
+    """
+
+    def __init__(self, metric_name: str, eval_every: int = 1):
+        """Initializes the module.
+
+        Arguments:
+            metric_name: Metric which the training processes should report
+            eval_every: Training processes report only every @eval_every-th value of the metric
+        """
+        from multiprocessing.connection import Listener
+
+        self._metric_name = metric_name
+        self._eval_every = eval_every
+        self._authkey = os.urandom(16)
+        self._listener = Listener(("localhost", 0), authkey=self._authkey)
+        self._monitors = {}
+        self._closed = False
+        self._accept_thread = threading.Thread(target=self._accept_connections, daemon=True)
+        self._accept_thread.start()
+
+    def environment(self, trial_id: int):
+        """Creates environment variables which advertise the channel to the training process of the trial."""
+        host, port = self._listener.address
+        return {
+            ADDRESS_ENV_VAR: f"{host}:{port}",
+            AUTHKEY_ENV_VAR: self._authkey.hex(),
+            METRIC_ENV_VAR: self._metric_name,
+            EVAL_EVERY_ENV_VAR: str(self._eval_every),
+            TRIAL_ID_ENV_VAR: str(trial_id)
+        }
+
+    def register(self, trial_id: int, monitor: EarlyStoppingMonitor):
+        """Registers the monitor which receives updates from the training process of the trial."""
+        self._monitors[trial_id] = monitor
+
+    def unregister(self, trial_id: int):
+        """Stops dispatching updates of the trial.
+
+        Returns:
+            Monitor which was registered for the trial
+        """
+        return self._monitors.pop(trial_id, None)
+
+    def close(self):
+        """Stops accepting new connections."""
+        self._closed = True
+        self._listener.close()
+
+    def _accept_connections(self):
+        """Accepts connections from the training processes."""
+        while not self._closed:
+            try:
+                connection = self._listener.accept()
+            except Exception:
+                # Listener was closed or the client failed the authentication
+                continue
+            threading.Thread(target=self._receive_updates, args=(connection, ), daemon=True).start()
+
+    def _receive_updates(self, connection):
+        """Dispatches updates sent over the connection until the training process closes it."""
+        with connection:
+            try:
+                trial_id = int(connection.recv_bytes().decode("ascii"))
+                while True:
+                    step, value = METRIC_UPDATE.unpack(connection.recv_bytes())
+                    monitor = self._monitors.get(trial_id)
+                    if monitor is not None:
+                        monitor.update(step, value)
+            except (EOFError, OSError):
+                pass
+
+
+class EarlyStoppingReporter:
+    """Sends values of the monitored metric from the training process to the sweep."""
+
+    def __init__(self, address: str, authkey: bytes, metric_name: str, eval_every: int, trial_id: str):
+        """Initializes the module.
+
+        Arguments:
+            address: "host:port" address of the sweep's early stopping server
+            authkey: Key used for authenticating with the server
+            metric_name: Metric which is monitored
+            eval_every: Only every @eval_every-th value of the metric is sent
+            trial_id: Id of the trial this training process belongs to
+        """
+        # Imported only once the training process was started by a sweep, since it is slow to import
+        from multiprocessing.connection import Client
+
+        host, port = address.rsplit(":", 1)
+        self._connection = Client((host, int(port)), authkey=authkey)
+        self._connection.send_bytes(trial_id.encode("ascii"))
+        self.metric_name = metric_name
+        self._eval_every = max(1, eval_every)
+        self._report_cnt = 0
+        self._connected = True
+
+    @classmethod
+    def from_environment(cls):
+        """Creates the reporter if the process was started by a sweep which uses early stopping."""
+        if ADDRESS_ENV_VAR not in os.environ:
+            return None
+        return cls(
+            address=os.environ[ADDRESS_ENV_VAR],
+            authkey=bytes.fromhex(os.environ[AUTHKEY_ENV_VAR]),
+            metric_name=os.environ[METRIC_ENV_VAR],
+            eval_every=int(os.environ.get(EVAL_EVERY_ENV_VAR, 1)),
+            trial_id=os.environ.get(TRIAL_ID_ENV_VAR, "0")
+        )
+
+    def report(self, step: int, value: float):
+        """Sends the new value of the monitored metric, respecting the evaluation cadence."""
+        self._report_cnt += 1
+        if not self._connected or self._report_cnt % self._eval_every:
+            return
+        try:
+            self._connection.send_bytes(METRIC_UPDATE.pack(step, value))
+        except OSError:
+            # The sweep is gone, there is no one left to evaluate the patience
+            self._connected = False
+
+    def close(self):
+        """Closes the connection to the sweep."""
+        self._connection.close()
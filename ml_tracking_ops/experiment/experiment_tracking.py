@@ -1,20 +1,22 @@
 import os
+import sys
 import time
 import json
-import shutil
+import random
 import atexit
 import subprocess
 
-from watchdog.observers import Observer
-
-from .utils import EarlyStoppingMonitor
+from .early_stopping import EarlyStoppingMonitor, EarlyStoppingServer, TRIAL_ID_ENV_VAR
+from .journal import TrialJournal
+from .summary import read_run_summary
+from .warm_workers import WarmWorkerPool
 
 
 class HyperparameterSweep:
 
     CONFIGURATION_FILE_NAME = "experiment_description.json"
-    TEMP_HELP_DIR = "_temp"
-    EARLY_STOPPING_LOG_FILE = os.path.join(TEMP_HELP_DIR, "_temp.dat")
+    # Number of seconds between two consecutive checks of the running trials
+    POLL_INTERVAL = 0.05
 
     def __init__(self,
                 script_name: str,
@@ -23,7 +25,17 @@ class HyperparameterSweep:
                 logdir: str,
                 optimization_metric: str = None,
                 optimization_goal: str = "max",
-                patience: int = 3):
+                patience: int = 3,
+                early_stopping_eval_every: int = 1,
+                max_parallel_runs: int = 1,
+                pin_cpus: bool = False,
+                worker_env: dict = None,
+                entry_function: str = None,
+                scheduler=None,
+                seed: int = None,
+                definition: dict = None,
+                resume_dir: str = None,
+                final_metric: str = None):
         """Initializes the module.
 
         Arguments:
@@ -36,41 +48,81 @@ class HyperparameterSweep:
                 If @optimization_metric is None this arguments is ignored
             patience: Maximum number of steps during which the @optimization_metric must improve.
                 If not, "Early Stopping" event is triggered. If @optimization_metric is None this arguments is ignored
+            early_stopping_eval_every: Training runs report only every n-th value of the @optimization_metric,
+                which limits the cost of the "Early Stopping" monitoring. If @optimization_metric is None
+                this arguments is ignored
+            max_parallel_runs: Maximum number of trials which are trained concurrently
+            pin_cpus: If True, available CPUs are split into @max_parallel_runs disjoint sets
+                and each concurrently running trial is pinned to its own set
+            worker_env: Environment variables overridden for every trial, e.g. thread counts.
+                When pinning CPUs, OMP_NUM_THREADS and MKL_NUM_THREADS default to the size of the CPU set
+            entry_function: Name of the function of the script which runs a single trial. If given, the script is
+                imported once by a warm parent process and every trial is forked from it and calls the function
+                with the sampled hyperparameters (and @logdir) as keyword arguments, instead of starting the script
+                in a new interpreter. Supported on platforms with fork only
+            scheduler: Trial scheduler (e.g. ASHA or median stopping rule) which stops unpromising trials
+                based on the intermediate values of the @optimization_metric. Requires @optimization_metric
+            seed: Seed from which the random number generator of each trial is derived. If None, a random seed is used
+            definition: JSON serializable definition of the sweep (e.g. content of the "experiment_cfg.json"),
+                recorded in the trial journal so that the sweep can be resumed from the command line
+            resume_dir: Directory of an interrupted sweep which should be continued.
+                Finished trials are skipped, interrupted ones are started again and the seed is restored.
+                Resuming is refused while trials started by the interrupted sweep are still running
+            final_metric: Metric whose final value is recorded in the trial journal when a trial ends, read from
+                the summary of the trial if the metric isn't monitored. Defaults to @optimization_metric
         """
         self._script_name = script_name
         self._hyperparameters = hyperparameters
         self._max_runs = max_runs
         self._optimization_metric = optimization_metric
+        self._final_metric = final_metric or optimization_metric
         self._optimization_goal = optimization_goal
         self._patience = patience
+        self._early_stopping_eval_every = early_stopping_eval_every
+        self._max_parallel_runs = max(1, max_parallel_runs)
+        self._cpu_sets = self._create_cpu_sets() if pin_cpus else [None] * self._max_parallel_runs
+        self._worker_env = worker_env if worker_env else {}
+        self._entry_function = entry_function
+        self._warm_workers = None
+        self._scheduler = scheduler
+        assert scheduler is None or optimization_metric, "Trial scheduler requires an optimization metric"
 
         self._logdir_base = logdir
-        # Directory where this particular experiment results will be logged
-        self._logdir = os.path.join(self._logdir_base, f"Experiment_{time.strftime('%b-%d_%H-%M-%S')}")
-        os.makedirs(self._logdir, exist_ok=True)
-        self._base_command_str = f"python {self._script_name} --logdir {self._logdir} "
-
-        self._dump_experiment_configuration()
-
-        if self._optimization_metric:
-            # Set-up the "Early Stopping" monitoring
-            # This directory will be used only for monitoring
-            self.TEMP_HELP_DIR  = os.path.join(self._logdir, self.TEMP_HELP_DIR)
-            os.makedirs(self.TEMP_HELP_DIR, exist_ok=True)
-            self._early_stopping_log_file_path = os.path.join(self._logdir, self.EARLY_STOPPING_LOG_FILE)
-            self._early_stopping = True
-            # This file will be monitored for triggering the early stopping event.
-            with open(self._early_stopping_log_file_path, "w") as f:
-                json.dump(
-                    {
-                        "metric_name": self._optimization_metric,
-                        "curr_value": -1
-                    },
-                    f
+        if resume_dir:
+            self._logdir = resume_dir
+            self._journal = TrialJournal(self._logdir)
+            sweep_record, started_trials, finished_trials = self._journal.replay()
+            self._seed = sweep_record["seed"]
+            # Trials which were running when the sweep got interrupted are started again
+            self._pending_trials = sorted(set(started_trials) - set(finished_trials))
+            # Trial which outlived the sweep driver would keep writing into the log file of the restarted trial
+            orphaned_trials = {
+                trial_id: started_trials[trial_id]["pid"] for trial_id in self._pending_trials
+                    if self._is_trial_running(started_trials[trial_id].get("pid"))
+            }
+            if orphaned_trials:
+                raise RuntimeError(
+                    f"Trials of the interrupted sweep are still running (trial id -> pid: {orphaned_trials}). "
+                    "Stop them or wait for them to exit before resuming the sweep."
                 )
+            self._next_trial_id = max(started_trials, default=-1) + 1
         else:
-            self._early_stopping = False
-    
+            # Directory where this particular experiment results will be logged
+            self._logdir = os.path.join(self._logdir_base, f"Experiment_{time.strftime('%b-%d_%H-%M-%S')}")
+            os.makedirs(self._logdir, exist_ok=True)
+            self._dump_experiment_configuration()
+
+            self._seed = seed if seed is not None else random.randrange(2 ** 32)
+            self._journal = TrialJournal(self._logdir)
+            self._journal.append({"event": "sweep", "seed": self._seed, "definition": definition, "time": time.time()})
+            self._pending_trials = []
+            self._next_trial_id = 0
+        self._base_command = [sys.executable, self._script_name, "--logdir", self._logdir]
+
+        # Training runs report the @optimization_metric to this server
+        self._early_stopping = bool(self._optimization_metric)
+        self._early_stopping_server = None
+
         atexit.register(self._clean_up)
 
     def _dump_experiment_configuration(self):
@@ -95,68 +147,180 @@ class HyperparameterSweep:
             json.dump(experiment_config, f)
 
     def run(self):
-        """Runs the hyperparameter sweep."""
+        """Runs the hyperparameter sweep.
+
+        Up to @max_parallel_runs trials are kept running at the same time.
+        Whenever a trial finishes, its worker slot is refilled with the next trial.
+        """
         if self._early_stopping:
-            event_handler = EarlyStoppingMonitor()
-            event_handler.MAX_PATIENCE = self._patience
-            event_handler.GOAL = self._optimization_goal
-            event_handler.PREV_BEST = 1e9 if self._optimization_goal == "min" else -1e9
-            event_handler.METRIC_KEY = "curr_value"
-
-            observer = Observer()
-            observer.schedule(event_handler, path=self.TEMP_HELP_DIR, recursive=False)
-            observer.start()
+            self._early_stopping_server = EarlyStoppingServer(
+                self._optimization_metric, self._early_stopping_eval_every
+            )
+        if self._entry_function:
+            self._warm_workers = WarmWorkerPool(
+                self._script_name, self._entry_function, {**os.environ, **self._worker_env}
+            )
+        # Worker slot -> (trial id, process handle)
+        running_trials = {}
+        free_slots = list(range(self._max_parallel_runs))
         try:
-            for comb in range(self._max_runs):
-                cmd_str, sampled_hyperparameters = self._create_shell_command()
-                print("Hyperparameter combination", comb + 1)
-                print("Sampled hyperparameters: ", sampled_hyperparameters)
-                proc = subprocess.Popen(cmd_str, shell=False)
-                event_handler.SUBPROCESS_HANDLE = proc
-
-                # Make sure we memorize the sampled hyperparameter combination in case te training gets interrupted
-                self._log_sampled_hyperparameters(sampled_hyperparameters)
+            while self._has_trials_to_launch() or running_trials:
+                while free_slots and self._has_trials_to_launch():
+                    slot = free_slots.pop(0)
+                    trial_id = self._next_trial()
+                    running_trials[slot] = (trial_id, self._launch_trial(trial_id, slot))
 
-                out, err = proc.communicate()
+                time.sleep(self.POLL_INTERVAL)
+                for slot, (trial_id, proc) in list(running_trials.items()):
+                    if proc.poll() is not None:
+                        self._finish_trial(trial_id, proc)
+                        del running_trials[slot]
+                        free_slots.append(slot)
+        finally:
+            for trial_id, proc in running_trials.values():
                 if proc.poll() is None:
                     proc.terminate()
-                print("=" * 75)
-                print()
-        finally:
             if self._early_stopping:
-                observer.stop()
-                observer.join()
+                self._early_stopping_server.close()
+            if self._warm_workers is not None:
+                self._warm_workers.close()
+                self._warm_workers = None
+
+    def _has_trials_to_launch(self):
+        """Checks whether some of the trials still need to be started."""
+        return bool(self._pending_trials) or self._next_trial_id < self._max_runs
+
+    def _next_trial(self):
+        """Returns the id of the next trial to start. Interrupted trials of a resumed sweep go first."""
+        if self._pending_trials:
+            return self._pending_trials.pop(0)
+        self._next_trial_id += 1
+        return self._next_trial_id - 1
 
-    def _log_sampled_hyperparameters(self, sampled_hyperparameters):
-        """Saves the currently sampled hyperparameters to the experiment config file.
+    def _launch_trial(self, trial_id: int, slot: int):
+        """Samples a hyperparameter combination and starts the training process for it.
 
         Arguments:
-            sampled_hyperparameters: Hyperparameter names along with their according sampled values        
+            trial_id: Id of the trial, i.e. the hyperparameter combination
+            slot: Worker slot in which the trial runs
+        """
+        cmd, sampled_hyperparameters = self._create_shell_command(trial_id)
+        print("Hyperparameter combination", trial_id + 1)
+        print("Sampled hyperparameters: ", sampled_hyperparameters)
+
+        # Environment variables which are set on top of the environment of the sweep
+        trial_env = {TRIAL_ID_ENV_VAR: str(trial_id)}
+        cpu_set = self._cpu_sets[slot]
+        if cpu_set is not None:
+            trial_env["OMP_NUM_THREADS"] = trial_env["MKL_NUM_THREADS"] = str(len(cpu_set))
+        trial_env.update(self._worker_env)
+        if self._early_stopping:
+            trial_env.update(self._early_stopping_server.environment(trial_id))
+
+        if self._warm_workers is not None:
+            # Script sees the same command line it would see if it was started in a new interpreter
+            proc = self._warm_workers.start_trial(
+                trial_id, {"logdir": self._logdir, **sampled_hyperparameters}, cmd[1:], trial_env
+            )
+        else:
+            proc = subprocess.Popen(cmd, shell=False, env={**os.environ, **trial_env})
+        if cpu_set is not None:
+            os.sched_setaffinity(proc.pid, cpu_set)
+        if self._early_stopping:
+            monitor = EarlyStoppingMonitor(
+                proc, self._optimization_metric, self._patience, self._optimization_goal, trial_id, self._scheduler
+            )
+            self._early_stopping_server.register(trial_id, monitor)
+
+        # Make sure we memorize the sampled hyperparameter combination in case te training gets interrupted
+        self._journal.append({
+            "event": "start",
+            "trial_id": trial_id,
+            "params": sampled_hyperparameters,
+            "pid": proc.pid,
+            "start_time": time.time()
+        })
+        return proc
+
+    def _is_trial_running(self, pid: int):
+        """Checks whether the process of a trial started by an interrupted sweep is still running.
+
+        Process ids are reused, so on Linux the process must also be running the script of the sweep.
         """
-        with open(os.path.join(self._logdir, self.CONFIGURATION_FILE_NAME), "r+", encoding="utf-8") as f:
-            experiment_desc = json.load(f)
-            experiment_desc["sampled_hyperparameters"].append(sampled_hyperparameters)
-            f.seek(0)
-            json.dump(experiment_desc, f)
+        # On Windows os.kill would terminate the process instead of checking it
+        if pid is None or os.name != "posix":
+            return False
+        try:
+            os.kill(pid, 0)
+        except (ProcessLookupError, PermissionError):
+            # Process which belongs to another user isn't a trial of this sweep
+            return False
+        cmdline_path = f"/proc/{pid}/cmdline"
+        if not os.path.exists(cmdline_path):
+            return True
+        with open(cmdline_path, "rb") as f:
+            return os.path.basename(self._script_name).encode() in f.read()
+
+    def _read_final_metric(self, trial_id: int):
+        """Reads the last value of the @final_metric from the summary written by the logger of the trial."""
+        run_summary = read_run_summary(os.path.join(self._logdir, f"trial-{trial_id:05d}.dat"))
+        if run_summary is None:
+            return None
+        return run_summary["metrics"].get(self._final_metric, {}).get("last")
 
-    def _create_shell_command(self):
+    def _finish_trial(self, trial_id: int, proc):
+        """Performs the bookkeeping after the training process of the trial has exited."""
+        final_metric = None
+        if self._early_stopping:
+            monitor = self._early_stopping_server.unregister(trial_id)
+            final_metric = monitor.last_value if monitor is not None else None
+        if final_metric is None and self._final_metric:
+            final_metric = self._read_final_metric(trial_id)
+        self._journal.append({
+            "event": "end",
+            "trial_id": trial_id,
+            "end_time": time.time(),
+            "exit_status": proc.returncode,
+            "final_metric": final_metric
+        })
+        print(f"Hyperparameter combination {trial_id + 1} finished with exit code {proc.returncode}")
+        print("=" * 75)
+        print()
+
+    def _create_cpu_sets(self):
+        """Splits the CPUs available to the sweep into a disjoint set for each worker slot."""
+        assert hasattr(os, "sched_setaffinity"), "Pinning CPUs is not supported on this platform"
+        available_cpus = sorted(os.sched_getaffinity(0))
+        cpus_per_slot = max(1, len(available_cpus) // self._max_parallel_runs)
+        return [
+            set(available_cpus[(slot * cpus_per_slot) % len(available_cpus):][:cpus_per_slot])
+                for slot in range(self._max_parallel_runs)
+        ]
+
+    def _create_shell_command(self, trial_id: int):
         """Creates the shell command which starts the desired main script with sampled hyperparameter values."""
-        sampled_hyperparameters = self._sample_hyperparameters()
-        # Create command strings for each hyperpameter value
-        hyperparam_val_cmds = [f"--{hyp_name} {hyp_val}" for hyp_name, hyp_val in sampled_hyperparameters.items()]
-        cmd_str = self._base_command_str + " ".join(hyperparam_val_cmds)
-        return cmd_str, sampled_hyperparameters
-
-    def _sample_hyperparameters(self):
-        """Samples hyperparameters."""
+        sampled_hyperparameters = self._sample_hyperparameters(trial_id)
+        # Create command arguments for each hyperpameter value
+        cmd = list(self._base_command)
+        for hyp_name, hyp_val in sampled_hyperparameters.items():
+            cmd += [f"--{hyp_name}", str(hyp_val)]
+        return cmd, sampled_hyperparameters
+
+    def _sample_hyperparameters(self, trial_id: int):
+        """Samples hyperparameters.
+
+        Each trial has its own random number generator derived from the sweep seed,
+        so the same trial always gets the same hyperparameters, even after the sweep was resumed.
+        """
+        rng = random.Random(f"{self._seed}-{trial_id}")
         sampled_hyperparameters = {
-            hyp_name: hyp_sampler.sample() for hyp_name, hyp_sampler in self._hyperparameters.items()
+            hyp_name: hyp_sampler.sample(rng) for hyp_name, hyp_sampler in self._hyperparameters.items()
         }
         return sampled_hyperparameters
 
     def _clean_up(self):
         """Performs clean up after the sweep has/was stopped."""
-        try:
-            shutil.rmtree(self.TEMP_HELP_DIR)
-        except:
-            pass
+        if self._early_stopping_server is not None:
+            self._early_stopping_server.close()
+        if self._warm_workers is not None:
+            self._warm_workers.close()
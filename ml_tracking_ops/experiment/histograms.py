@@ -0,0 +1,121 @@
+from array import array
+from numbers import Integral
+
+
+# Values are binned in chunks of this many elements, so the temporary memory doesn't grow with the logged tensor
+CHUNK_SIZE = 2 ** 16
+
+
+class Histogram:
+    """Bins and moments of the values logged at a single step.
+
+    Only the finite values are binned. Bin edges and counts are kept as array.array columns,
+    so a histogram takes the same amount of memory regardless of the number of values it describes.
+    """
+
+    __slots__ = ("edges", "counts", "count", "nonfinite", "min", "max", "sum", "sum_squares")
+
+    def __init__(self, edges: array, counts: array, nonfinite: int, minimum: float, maximum: float,
+                 total: float, total_squares: float):
+        """Initializes the module.
+
+        Arguments:
+            edges: Bin edges, typecode "d", one more than there are bins
+            counts: Number of values in each bin, typecode "q"
+            nonfinite: Number of NaN and infinite values, which aren't binned
+            minimum, maximum: Extremes of the finite values, NaN if there are no finite values
+            total, total_squares: Sum and sum of squares of the finite values
+        """
+        self.edges = edges
+        self.counts = counts
+        self.count = sum(counts)
+        self.nonfinite = nonfinite
+        self.min = minimum
+        self.max = maximum
+        self.sum = total
+        self.sum_squares = total_squares
+
+
+def _finite_range(flat_values):
+    """Returns the minimum and the maximum of the finite values, or None if there are no finite values."""
+    import numpy as np
+
+    if len(flat_values) == 0:
+        return None
+    minimum, maximum = np.fmin.reduce(flat_values), np.fmax.reduce(flat_values)
+    if np.isfinite(minimum) and np.isfinite(maximum):
+        return float(minimum), float(maximum)
+
+    # Infinite values are rare, so the chunked scan is only needed to skip over them
+    minimum, maximum = np.inf, -np.inf
+    for start in range(0, len(flat_values), CHUNK_SIZE):
+        chunk = flat_values[start:start + CHUNK_SIZE]
+        chunk = chunk[np.isfinite(chunk)]
+        if len(chunk):
+            minimum, maximum = min(minimum, chunk.min()), max(maximum, chunk.max())
+    return (float(minimum), float(maximum)) if minimum <= maximum else None
+
+
+def compute_histogram(values, bins=64, value_range: tuple = None):
+    """Bins the values in chunks, without copying them as a whole.
+
+    Arguments:
+        values: NumPy array or array-like of values of any shape
+        bins: Number of bins, or an increasing sequence of bin edges
+        value_range: Tuple of (lower, upper) bound of the bins, used when @bins is a number. If None, bins span
+            the finite values, so their edges adapt to each step. Values outside of fixed bins are counted
+            into the outermost bins, while the minimum and the maximum keep their actual values
+
+    Returns:
+        Histogram of the values
+    """
+    import numpy as np
+
+    flat_values = np.asarray(values).reshape(-1)
+    if isinstance(bins, Integral):
+        assert bins > 0, f"Number of bins must be positive, but received {bins}"
+        if value_range is None:
+            value_range = _finite_range(flat_values) or (0.0, 0.0)
+        lower, upper = value_range
+        assert lower <= upper, f"Invalid value_range {value_range}"
+        if lower == upper:
+            lower, upper = lower - 0.5, upper + 0.5
+        edges = np.linspace(lower, upper, bins + 1)
+        scale = bins / (upper - lower)
+    else:
+        edges = np.asarray(bins, dtype=np.float64)
+        assert edges.ndim == 1 and len(edges) > 1 and np.all(np.diff(edges) > 0), \
+            "Bin edges must be an increasing sequence of at least two edges"
+        scale = None
+    num_bins = len(edges) - 1
+
+    counts = np.zeros(num_bins, dtype=np.int64)
+    nonfinite, total, total_squares = 0, 0.0, 0.0
+    minimum, maximum = np.inf, -np.inf
+    for start in range(0, len(flat_values), CHUNK_SIZE):
+        chunk = flat_values[start:start + CHUNK_SIZE].astype(np.float64, copy=False)
+        finite = np.isfinite(chunk)
+        if not finite.all():
+            nonfinite += len(chunk) - int(finite.sum())
+            chunk = chunk[finite]
+        if len(chunk) == 0:
+            continue
+        minimum, maximum = min(minimum, chunk.min()), max(maximum, chunk.max())
+        total += float(chunk.sum())
+        total_squares += float(np.dot(chunk, chunk))
+        if scale is not None:
+            # Positions are clipped before the conversion, which would overflow for values far outside of the bins
+            positions = (chunk - edges[0]) * scale
+            np.clip(positions, 0, num_bins - 1, out=positions)
+            indices = positions.astype(np.int64)
+        else:
+            indices = np.searchsorted(edges, chunk, side="right") - 1
+            np.clip(indices, 0, num_bins - 1, out=indices)
+        counts += np.bincount(indices, minlength=num_bins)
+
+    if minimum > maximum:
+        minimum = maximum = float("nan")
+    edges_column, counts_column = array("d"), array("q")
+    edges_column.frombytes(edges.astype("=f8").tobytes())
+    counts_column.frombytes(counts.astype("=i8").tobytes())
+    return Histogram(edges_column, counts_column, nonfinite, float(minimum), float(maximum), total, total_squares)
@@ -0,0 +1,65 @@
+class LatencyHistogram:
+    """Histogram of latencies in nanoseconds with power-of-two buckets.
+
+    Bucket of a latency is found from the bit length of the latency, so recording it takes constant time
+    and the histogram never grows, no matter how many latencies are recorded.
+    """
+
+    NUM_BUCKETS = 48
+
+    def __init__(self):
+        """Initializes the module."""
+        # Bucket i counts the latencies within [2 ** (i - 1), 2 ** i) nanoseconds
+        self._buckets = [0] * self.NUM_BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def observe(self, latency_ns: int):
+        """Records a single latency."""
+        self._buckets[min(latency_ns.bit_length(), self.NUM_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total_ns += latency_ns
+        if latency_ns > self.max_ns:
+            self.max_ns = latency_ns
+
+    def quantile(self, q: float):
+        """Returns the upper bound of the bucket which contains the @q quantile, or None if nothing was recorded."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative_count = 0
+        for bucket, bucket_count in enumerate(self._buckets):
+            cumulative_count += bucket_count
+            if cumulative_count >= rank:
+                return 2 ** bucket
+        return 2 ** (self.NUM_BUCKETS - 1)
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_ns": self.total_ns,
+            "mean_ns": self.total_ns / self.count if self.count else None,
+            "p50_ns": self.quantile(0.5),
+            "p99_ns": self.quantile(0.99),
+            "max_ns": self.max_ns,
+            # Upper bound of each non-empty bucket along with its according count
+            "buckets": {2 ** bucket: bucket_count for bucket, bucket_count in enumerate(self._buckets) if bucket_count}
+        }
+
+
+class LoggerStats:
+    """Counters of the logger internals which are updated by an instrumented logger."""
+
+    def __init__(self):
+        """Initializes the module."""
+        self.calls = {
+            "add_scalar": LatencyHistogram(),
+            "add_scalars": LatencyHistogram(),
+            "add_scalar_array": LatencyHistogram(),
+            "add_histogram": LatencyHistogram()
+        }
+        self.flush_latency = LatencyHistogram()
+        self.last_flush_ns = 0
+        self.last_flush_bytes = 0
+        self.early_stopping_blocked_ns = 0
@@ -0,0 +1,63 @@
+import os
+import json
+
+
+class TrialJournal:
+    """Append-only JSON-lines journal of a hyperparameter sweep.
+
+    The first record describes the sweep itself, while every other record marks
+    the start or the end of a trial. Records are never rewritten, so recording a trial
+    costs the same regardless of the sweep size, and the sweep can be resumed
+    by replaying the journal after the sweep driver was interrupted.
+    """
+
+    FILE_NAME = "trials.jsonl"
+
+    def __init__(self, sweep_dir: str):
+        """Initializes the module.
+
+        Arguments:
+            sweep_dir: Directory of the sweep in which the journal is kept
+        """
+        self.path = os.path.join(sweep_dir, self.FILE_NAME)
+
+    def exists(self):
+        """Checks whether the journal was already created."""
+        return os.path.exists(self.path)
+
+    def append(self, record: dict):
+        """Appends a single record to the journal."""
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def read(self):
+        """Reads all complete records of the journal.
+
+        A partially written last line (e.g. the sweep driver died while writing it) is ignored.
+        """
+        records = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                records.append(json.loads(line))
+        return records
+
+    def replay(self):
+        """Replays the journal.
+
+        Returns:
+            Tuple of (sweep record, {trial id: last start record}, {trial id: end record})
+        """
+        records = self.read()
+        sweep_record = records[0]
+        started_trials = {}
+        finished_trials = {}
+        for record in records[1:]:
+            if record["event"] == "start":
+                started_trials[record["trial_id"]] = record
+                # A re-queued trial starts over
+                finished_trials.pop(record["trial_id"], None)
+            elif record["event"] == "end":
+                finished_trials[record["trial_id"]] = record
+        return sweep_record, started_trials, finished_trials
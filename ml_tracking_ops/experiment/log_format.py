@@ -0,0 +1,464 @@
+import os
+import sys
+import math
+import struct
+
+from array import array
+
+from .codecs import encode_payload, decode_payload
+
+
+# Every log file starts with this signature. Log files written by older versions
+# of the library are JSON documents and therefore start with "{".
+FILE_MAGIC = b"MTOPSLOG"
+FORMAT_VERSION = 1
+FILE_HEADER = struct.Struct("<8sI")
+
+# Segment header: kind, codec, metric name length, number of points, payload size in bytes
+SEGMENT_HEADER = struct.Struct("<BBHII")
+
+# Kinds of data a segment can hold
+KIND_SCALARS = 0
+# Scalars of a compacted run, rolled up into buckets of a fixed number of steps
+KIND_ROLLUP = 1
+# Histograms of the values logged at a step, e.g. the weights or the gradients of a layer
+KIND_HISTOGRAM = 2
+# Kinds of the segments which are read as a series of scalars
+SERIES_KINDS = (KIND_SCALARS, KIND_ROLLUP)
+
+# Rollup payload starts with the number of steps per bucket, followed by little-endian columns with one element
+# per bucket: steps of the minimum, the maximum and the last value, and the number of points (int64), followed by
+# the minimum, the maximum, the mean and the last value, and the relative time of the last value (float64)
+ROLLUP_HEADER = struct.Struct("<q")
+ROLLUP_TYPECODES = "qqqqddddd"
+
+# Histogram payload starts with little-endian columns with one element per histogram: steps, numbers of bins,
+# numbers of finite values and numbers of non-finite values (int64), followed by the relative times, and the minimums,
+# the maximums, the sums and the sums of squares of the finite values (float64). Bin edges (float64) and bin counts
+# (int64) of every histogram follow, concatenated in the order of the histograms
+HISTOGRAM_TYPECODES = "qqqqddddd"
+
+# Codecs used for encoding the segment payload. Other codecs are combinations of the flags defined in codecs.py
+CODEC_RAW = 0
+
+# Columns are stored in little-endian byte order regardless of the platform
+NATIVE_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def encode_file_header():
+    """Creates the header written at the beginning of every log file."""
+    return FILE_HEADER.pack(FILE_MAGIC, FORMAT_VERSION)
+
+
+def is_segment_log(log_file_path: str):
+    """Checks whether the log file at the specified path uses the segment log format."""
+    with open(log_file_path, "rb") as f:
+        return f.read(len(FILE_MAGIC)) == FILE_MAGIC
+
+
+def _column_bytes(column: array, num_points: int):
+    """Returns the first @num_points elements of the column as little-endian bytes."""
+    if NATIVE_LITTLE_ENDIAN:
+        return memoryview(column)[:num_points]
+    column = column[:num_points]
+    column.byteswap()
+    return column.tobytes()
+
+
+def encode_scalar_segment(metric_name: str, steps: array, values: array, times: array, num_points: int = None,
+                          codec: int = CODEC_RAW):
+    """Encodes a batch of scalar events as a single segment.
+
+    With the raw codec the payload is laid out as three contiguous little-endian columns:
+    steps (int64), values (float64) and relative times (float64).
+
+    Arguments:
+        metric_name: Metric to which the events belong
+        steps: Step of each event, typecode "q"
+        values: Value of each event, typecode "d"
+        times: Number of seconds between the logger creation and each event, typecode "d"
+        num_points: Number of leading elements of the columns to encode. If None, whole columns are encoded
+        codec: Codec of the payload, see codecs.make_codec
+    """
+    if num_points is None:
+        num_points = len(steps)
+    name_bytes = metric_name.encode("utf-8")
+    if codec != CODEC_RAW:
+        payload = encode_payload(codec, steps, values, times, num_points)
+        header = SEGMENT_HEADER.pack(KIND_SCALARS, codec, len(name_bytes), num_points, len(payload))
+        return b"".join((header, name_bytes, payload))
+    header = SEGMENT_HEADER.pack(KIND_SCALARS, CODEC_RAW, len(name_bytes), num_points, 24 * num_points)
+    return b"".join((
+        header,
+        name_bytes,
+        _column_bytes(steps, num_points),
+        _column_bytes(values, num_points),
+        _column_bytes(times, num_points)
+    ))
+
+
+def encode_rollup_segment(metric_name: str, bucket_steps: int, rollup: tuple):
+    """Encodes the rollup of a metric as a single segment.
+
+    Arguments:
+        metric_name: Metric to which the rollup belongs
+        bucket_steps: Number of steps per bucket
+        rollup: Tuple of (min steps, max steps, last steps, counts, minimums, maximums, means, last values, times)
+            arrays with typecodes ROLLUP_TYPECODES, one element per bucket
+    """
+    num_buckets = len(rollup[0])
+    name_bytes = metric_name.encode("utf-8")
+    header = SEGMENT_HEADER.pack(
+        KIND_ROLLUP, CODEC_RAW, len(name_bytes), num_buckets, ROLLUP_HEADER.size + 8 * len(rollup) * num_buckets
+    )
+    return b"".join((
+        header, name_bytes, ROLLUP_HEADER.pack(bucket_steps), *(_column_bytes(column, num_buckets) for column in rollup)
+    ))
+
+
+def encode_histogram_segment(metric_name: str, columns: tuple, edges: array, counts: array):
+    """Encodes a batch of histograms of a metric as a single segment.
+
+    Arguments:
+        metric_name: Metric to which the histograms belong
+        columns: Tuple of (steps, numbers of bins, counts, non-finite counts, times, minimums, maximums, sums,
+            sums of squares) arrays with typecodes HISTOGRAM_TYPECODES, one element per histogram
+        edges: Bin edges of every histogram, typecode "d". Each histogram has one more edge than it has bins
+        counts: Bin counts of every histogram, typecode "q"
+    """
+    num_histograms = len(columns[0])
+    name_bytes = metric_name.encode("utf-8")
+    payload_size = 8 * (len(columns) * num_histograms + len(edges) + len(counts))
+    header = SEGMENT_HEADER.pack(KIND_HISTOGRAM, CODEC_RAW, len(name_bytes), num_histograms, payload_size)
+    return b"".join((
+        header, name_bytes, *(_column_bytes(column, num_histograms) for column in columns),
+        _column_bytes(edges, len(edges)), _column_bytes(counts, len(counts))
+    ))
+
+
+def decode_histogram_payload(payload: bytes, num_histograms: int):
+    """Decodes the payload of a histogram segment.
+
+    Returns:
+        Tuple of (tuple of histogram columns as described in encode_histogram_segment, bin edges, bin counts)
+    """
+    columns = tuple(
+        _read_column(typecode, payload, 8 * column_idx * num_histograms, num_histograms)
+            for column_idx, typecode in enumerate(HISTOGRAM_TYPECODES)
+    )
+    num_bins = sum(columns[1])
+    start = 8 * len(columns) * num_histograms
+    edges = _read_column("d", payload, start, num_bins + num_histograms)
+    counts = _read_column("q", payload, start + 8 * len(edges), num_bins)
+    return columns, edges, counts
+
+
+def decode_rollup_payload(payload: bytes, num_buckets: int):
+    """Decodes the payload of a rollup segment.
+
+    Returns:
+        Tuple of (number of steps per bucket, tuple of rollup columns as described in encode_rollup_segment)
+    """
+    bucket_steps, = ROLLUP_HEADER.unpack_from(payload)
+    rollup = tuple(
+        _read_column(typecode, payload, ROLLUP_HEADER.size + 8 * column_idx * num_buckets, num_buckets)
+            for column_idx, typecode in enumerate(ROLLUP_TYPECODES)
+    )
+    return bucket_steps, rollup
+
+
+def expand_rollup_payload(payload: bytes, num_buckets: int):
+    """Expands the payload of a rollup segment into step, value and time columns, so it is read like a scalar segment.
+
+    Each bucket becomes its minimum, its maximum and its last value placed at their own steps,
+    which keeps the shape of the curve. All of them get the relative time of the last value.
+    """
+    _, (min_steps, max_steps, last_steps, _, minimums, maximums, _, last_values, times) = \
+        decode_rollup_payload(payload, num_buckets)
+    steps, values, expanded_times = array("q"), array("d"), array("d")
+    for bucket in zip(min_steps, minimums, max_steps, maximums, last_steps, last_values, times):
+        points = {bucket[0]: bucket[1], bucket[2]: bucket[3], bucket[4]: bucket[5]}
+        for step in sorted(points):
+            steps.append(step)
+            values.append(points[step])
+            expanded_times.append(bucket[6])
+    return steps, values, expanded_times
+
+
+def decode_series_payload(kind: int, payload: bytes, num_points: int, codec: int = CODEC_RAW):
+    """Decodes the payload of a scalar or a rollup segment into step, value and time columns."""
+    if kind == KIND_ROLLUP:
+        return expand_rollup_payload(payload, num_points)
+    return decode_scalar_payload(payload, num_points, codec)
+
+
+def _read_column(typecode: str, payload: bytes, start: int, num_points: int):
+    """Reads a little-endian column of @num_points elements which starts at the @start byte of the payload."""
+    column = array(typecode)
+    column.frombytes(memoryview(payload)[start:start + 8 * num_points])
+    if not NATIVE_LITTLE_ENDIAN:
+        column.byteswap()
+    return column
+
+
+def decode_scalar_payload(payload: bytes, num_points: int, codec: int = CODEC_RAW):
+    """Decodes the payload of a scalar segment into step, value and time columns."""
+    if codec != CODEC_RAW:
+        return decode_payload(codec, payload, num_points)
+    column_size = 8 * num_points
+    steps = _read_column("q", payload, 0, num_points)
+    values = _read_column("d", payload, column_size, num_points)
+    times = _read_column("d", payload, 2 * column_size, num_points)
+    return steps, values, times
+
+
+def iter_segments(f):
+    """Iterates over complete segments of an opened log file.
+
+    Reading stops at the first incomplete segment, which can only be the last one
+    in case it is still being written to. The file is then positioned at the start of that segment,
+    so reading can be resumed from there once the segment is complete.
+
+    Arguments:
+        f: Binary file object positioned right after the file header
+
+    Yields:
+        Tuples of (kind, codec, metric name, number of points, payload)
+    """
+    while True:
+        segment_start = f.tell()
+        header = f.read(SEGMENT_HEADER.size)
+        if len(header) < SEGMENT_HEADER.size:
+            f.seek(segment_start)
+            return
+        kind, codec, name_len, num_points, payload_size = SEGMENT_HEADER.unpack(header)
+        metric_name = f.read(name_len)
+        payload = f.read(payload_size)
+        if len(metric_name) < name_len or len(payload) < payload_size:
+            f.seek(segment_start)
+            return
+        yield kind, codec, metric_name.decode("utf-8"), num_points, payload
+
+
+def collect_scalar_series(f):
+    """Collects scalar segments of an opened file into a series per metric. Rollup segments are expanded.
+
+    Arguments:
+        f: Binary file object positioned at the first segment
+
+    Returns:
+        Dictionary mapping each metric name to a tuple of (steps, values, times) arrays
+    """
+    series = {}
+    for kind, codec, metric_name, num_points, payload in iter_segments(f):
+        if kind not in SERIES_KINDS:
+            continue
+        steps, values, times = decode_series_payload(kind, payload, num_points, codec)
+        if metric_name not in series:
+            series[metric_name] = (array("q"), array("d"), array("d"))
+        series[metric_name][0].extend(steps)
+        series[metric_name][1].extend(values)
+        series[metric_name][2].extend(times)
+    return series
+
+
+def read_scalar_series(log_file_path: str):
+    """Reads every scalar series stored in the segment log file.
+
+    Returns:
+        Dictionary mapping each metric name to a tuple of (steps, values, times) arrays
+    """
+    return read_scalar_series_from(log_file_path)[0]
+
+
+def read_scalar_series_from(log_file_path: str, offset: int = 0):
+    """Reads the scalar series stored in the segment log file after the given offset.
+
+    Used for tailing a log file which is still being written to, since only the new bytes are decoded.
+
+    Arguments:
+        log_file_path: Path of the segment log file
+        offset: Offset returned by the previous read. If 0, the whole file is read
+
+    Returns:
+        Tuple of (dictionary mapping each metric name to a tuple of (steps, values, times) arrays,
+        offset right after the last complete segment)
+    """
+    with open(log_file_path, "rb") as f:
+        if offset == 0:
+            magic, version = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+            assert magic == FILE_MAGIC, f"{log_file_path} is not a segment log file"
+        else:
+            f.seek(offset)
+        series = collect_scalar_series(f)
+        return series, f.tell()
+
+
+def scan_segments(f, segments: dict = None):
+    """Builds the directory of complete segments of an opened log file, reading only the segment headers.
+
+    Payloads are skipped over, so the directory of a file with hundreds of metrics is built
+    without decoding any of them. Scanning stops at the first incomplete segment and the file
+    is positioned at its start, so the directory can be extended once more segments are appended.
+
+    Arguments:
+        f: Binary file object positioned at a segment
+        segments: Directory to extend. If None, a new directory is created
+
+    Returns:
+        Dictionary mapping each metric name to a tuple of (kinds, codecs, payload offsets, payload sizes,
+        numbers of points) arrays, with one element per segment of the metric
+    """
+    segments = {} if segments is None else segments
+    file_size = os.fstat(f.fileno()).st_size
+    while True:
+        segment_start = f.tell()
+        header = f.read(SEGMENT_HEADER.size)
+        if len(header) < SEGMENT_HEADER.size:
+            f.seek(segment_start)
+            return segments
+        kind, codec, name_len, num_points, payload_size = SEGMENT_HEADER.unpack(header)
+        payload_offset = segment_start + SEGMENT_HEADER.size + name_len
+        if payload_offset + payload_size > file_size:
+            f.seek(segment_start)
+            return segments
+        metric_name = f.read(name_len).decode("utf-8")
+        if metric_name not in segments:
+            segments[metric_name] = (array("B"), array("B"), array("q"), array("I"), array("I"))
+        for column, element in zip(segments[metric_name], (kind, codec, payload_offset, payload_size, num_points)):
+            column.append(element)
+        f.seek(payload_offset + payload_size)
+
+
+def get_segment_names(segments: dict, kinds: tuple = SERIES_KINDS):
+    """Returns the sorted names of the metrics of the directory which have segments of any of the kinds.
+
+    Arguments:
+        segments: Directory built by scan_segments
+        kinds: Kinds of the segments, by default the kinds which are read as a series of scalars
+    """
+    return sorted(
+        metric_name for metric_name, metric_segments in segments.items()
+            if any(kind in kinds for kind in metric_segments[0])
+    )
+
+
+def read_metric_histograms(f, metric_segments: tuple):
+    """Reads the histograms of a single metric, touching only the payloads of its own histogram segments.
+
+    Arguments:
+        f: Binary file object of the log file
+        metric_segments: Segments of the metric, as listed by the directory built by scan_segments
+
+    Returns:
+        List of dictionaries with the step, the relative time, the number of finite and non-finite values,
+        the minimum, the maximum, the sum and the sum of squares of the finite values, and the bin edges
+        and counts of each histogram
+    """
+    histograms = []
+    for kind, codec, payload_offset, payload_size, num_points in zip(*metric_segments):
+        if kind != KIND_HISTOGRAM:
+            continue
+        f.seek(payload_offset)
+        columns, edges, counts = decode_histogram_payload(f.read(payload_size), num_points)
+        # Each histogram has one more edge than it has bins
+        edge_start, bin_start = 0, 0
+        for step, num_bins, count, nonfinite, time, minimum, maximum, total, total_squares in zip(*columns):
+            histograms.append({
+                "step": step,
+                "time": time,
+                "count": count,
+                "nonfinite": nonfinite,
+                "min": minimum,
+                "max": maximum,
+                "sum": total,
+                "sum_squares": total_squares,
+                "edges": edges[edge_start:edge_start + num_bins + 1],
+                "counts": counts[bin_start:bin_start + num_bins]
+            })
+            edge_start += num_bins + 1
+            bin_start += num_bins
+    return histograms
+
+
+def read_metric_series(f, metric_segments: tuple):
+    """Reads the series of a single metric, touching only the payloads of its own segments. Rollups are expanded.
+
+    Arguments:
+        f: Binary file object of the log file
+        metric_segments: Segments of the metric, as listed by the directory built by scan_segments
+
+    Returns:
+        Tuple of (steps, values, times) arrays
+    """
+    series = (array("q"), array("d"), array("d"))
+    for kind, codec, payload_offset, payload_size, num_points in zip(*metric_segments):
+        if kind not in SERIES_KINDS:
+            continue
+        f.seek(payload_offset)
+        for column, segment_column in zip(series, decode_series_payload(kind, f.read(payload_size), num_points, codec)):
+            column.extend(segment_column)
+    return series
+
+
+def _merge_extreme(reduce, extreme, values):
+    """Merges the minimum or the maximum of the values into the @extreme found so far, which is None if there is none.
+
+    NaN is never the minimum nor the maximum.
+    """
+    # Builtin min and max are unreliable in presence of NaN, so NaN is filtered out of the values which contain it.
+    # The sum of the values is NaN whenever any of them is NaN
+    if math.isnan(sum(values)):
+        values = [value for value in values if value == value]
+        if not values:
+            return extreme
+    return reduce(values) if extreme is None else reduce(extreme, reduce(values))
+
+
+def read_metric_summary(f, metric_segments: tuple, summary: dict = None):
+    """Summarizes the series of a single metric, reading only the value columns of its raw segments.
+
+    Segments encoded with other codecs have no addressable value column, so they are decoded as a whole.
+    Rollup segments are summarized from the statistics of their buckets. NaN is never the minimum nor the maximum,
+    which are None if every value is NaN.
+
+    Arguments:
+        f: Binary file object of the log file
+        metric_segments: Segments of the metric, as listed by the directory built by scan_segments
+        summary: Summary of the preceding segments of the metric to extend. If None, a new summary is created
+
+    Returns:
+        Dictionary with the number of points, the minimum, the maximum and the last value, and the last step
+    """
+    if summary is None:
+        summary = {"count": 0, "min": None, "max": None, "last": None, "last_step": None}
+    summary = dict(summary)
+    for kind, codec, payload_offset, payload_size, num_points in zip(*metric_segments):
+        if kind not in SERIES_KINDS or num_points == 0:
+            continue
+        if kind == KIND_ROLLUP:
+            f.seek(payload_offset)
+            _, rollup = decode_rollup_payload(f.read(payload_size), num_points)
+            summary["count"] += sum(rollup[3])
+            summary["min"] = _merge_extreme(min, summary["min"], rollup[4])
+            summary["max"] = _merge_extreme(max, summary["max"], rollup[5])
+            summary["last"] = rollup[7][-1]
+            summary["last_step"] = rollup[2][-1]
+            continue
+        if codec == CODEC_RAW:
+            column_size = 8 * num_points
+            # Last step is the last element of the steps column, which is directly followed by the values column
+            f.seek(payload_offset + column_size - 8)
+            column_bytes = f.read(column_size + 8)
+            last_step = _read_column("q", column_bytes, 0, 1)[0]
+            values = _read_column("d", column_bytes, 8, num_points)
+        else:
+            f.seek(payload_offset)
+            steps, values, _ = decode_payload(codec, f.read(payload_size), num_points)
+            last_step = steps[-1]
+        summary["count"] += num_points
+        summary["min"] = _merge_extreme(min, summary["min"], values)
+        summary["max"] = _merge_extreme(max, summary["max"], values)
+        summary["last"] = values[-1]
+        summary["last_step"] = last_step
+    return summary
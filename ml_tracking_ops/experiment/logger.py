@@ -1,23 +1,32 @@
 import os
 import time
-import json
-import pickle
-import base64
 import atexit
+import threading
 
-from typing import Union
+from array import array
+from numbers import Integral, Real
 
-from .utils import prepare_event
-from .utils import CallbackTimer
+from .early_stopping import EarlyStoppingReporter, TRIAL_ID_ENV_VAR
+from .codecs import make_codec
+from .instrumentation import LoggerStats
+from .histograms import Histogram, compute_histogram
+from .log_format import CODEC_RAW, HISTOGRAM_TYPECODES, encode_file_header, encode_scalar_segment, \
+    encode_histogram_segment
+from .shards import MetricAggregator, AggregationClient, get_shard_path
+from .summary import SUMMARY_GOALS, MetricSummary, write_run_summary
+from .utils import RepeatingTimer
+from .writer import EventQueue, BackgroundWriter
 
 
 class MetricBuffer:
     """Queue which buffers logs for the specified metric after reaching maximum capacity.
 
     Motivation: Evading the I/O bottleneck of constant writing to a log file.
+    Events are stored in preallocated step (int64), value (float64) and relative time (float64)
+    columns which are reused between dumps, so buffering an event doesn't allocate any memory.
     """
 
-    def __init__(self, metric_name: str, buffer_capacity: int, db_path: str):
+    def __init__(self, metric_name: str, buffer_capacity: int, db_path: str, codec: int = CODEC_RAW):
         """Initializes the module.
 
         Arguments:
@@ -25,42 +34,173 @@ class MetricBuffer:
             buffer_capacity: Number of elements in the buffer after which we dump
                 buffer content into a log file
             db_path: Location of the log file to which we dump buffer content
+            codec: Codec with which the segments are encoded, see codecs.make_codec
         """
         self._db_path = db_path
+        self._codec = codec
         self._metric_name = metric_name
         self._buffer_capacity = buffer_capacity
         self._buffer_size = 0
-        self._buffer = []
+        # Number of segments and bytes appended to the log file by this buffer
+        self.segments_written = 0
+        self.bytes_written = 0
+        self._steps = array("q", bytes(8 * buffer_capacity))
+        self._values = array("d", bytes(8 * buffer_capacity))
+        self._times = array("d", bytes(8 * buffer_capacity))
 
-    def add_event(self, metric_summary: dict):
+    def add_event(self, step: int, value: float, relative_time: float):
         """Adds event to the buffer."""
-        self._buffer.append(metric_summary)
-        self._buffer_size += 1
+        idx = self._buffer_size
+        self._steps[idx] = step
+        self._values[idx] = value
+        self._times[idx] = relative_time
+        self._buffer_size = idx + 1
         if self._buffer_size == self._buffer_capacity:
             self.dump()
 
+    def add_events(self, steps: array, values: array, relative_time: float):
+        """Adds a batch of events which share the same relative time to the buffer.
+
+        Arguments:
+            steps: Step of each event, typecode "q"
+            values: Value of each event, typecode "d"
+            relative_time: Number of seconds between the logger creation and the batch
+        """
+        num_events = len(steps)
+        start = 0
+        while start < num_events:
+            idx = self._buffer_size
+            chunk_size = min(num_events - start, self._buffer_capacity - idx)
+            self._steps[idx:idx + chunk_size] = steps[start:start + chunk_size]
+            self._values[idx:idx + chunk_size] = values[start:start + chunk_size]
+            self._times[idx:idx + chunk_size] = array("d", [relative_time]) * chunk_size
+            self._buffer_size = idx + chunk_size
+            start += chunk_size
+            if self._buffer_size == self._buffer_capacity:
+                self.dump()
+
     def dump(self):
-        """Writes events from the buffer to a binary file."""
-        if self._buffer_size == 0:
-            return
-        with open(self._db_path, "r+") as f:
-            db = json.load(f)
-            if self._metric_name not in db:
-                # We are loggin this metric's value for the first time
-                db[self._metric_name] = []
-            else:
-                loaded_bytes = base64.b64decode(db[self._metric_name])
-                db[self._metric_name] = pickle.loads(loaded_bytes)
+        """Appends events from the buffer to the log file as a new segment.
 
-            db[self._metric_name] += self._buffer
-            db[self._metric_name] = pickle.dumps(db[self._metric_name])
-            db[self._metric_name] = base64.b64encode(db[self._metric_name]).decode("ascii")
+        Previously written segments are never read nor rewritten,
+        so the cost of a dump depends only on the number of buffered events.
 
-            f.seek(0)
-            json.dump(db, f)
+        Returns:
+            Number of bytes appended to the log file
+        """
+        if self._buffer_size == 0:
+            return 0
+        segment = encode_scalar_segment(
+            self._metric_name, self._steps, self._values, self._times, self._buffer_size, self._codec
+        )
+        with open(self._db_path, "ab") as f:
+            f.write(segment)
 
-        self._buffer = []
         self._buffer_size = 0
+        self.segments_written += 1
+        self.bytes_written += len(segment)
+        return len(segment)
+
+    @property
+    def occupancy(self):
+        """Number of buffered events which weren't dumped yet."""
+        return self._buffer_size
+
+    @property
+    def capacity(self):
+        return self._buffer_capacity
+
+
+class HistogramBuffer:
+    """Queue which buffers histograms of the specified metric after reaching maximum capacity.
+
+    Only the bins and the moments of each histogram are buffered, so the memory taken by a buffered histogram
+    and the bytes it takes in the log file depend on the number of bins rather than on the number of binned values.
+    """
+
+    def __init__(self, metric_name: str, buffer_capacity: int, db_path: str):
+        """Initializes the module.
+
+        Arguments:
+            metric_name: Metric for which we buffer the histograms
+            buffer_capacity: Number of histograms in the buffer after which we dump
+                buffer content into a log file
+            db_path: Location of the log file to which we dump buffer content
+        """
+        self._db_path = db_path
+        self._metric_name = metric_name
+        self._buffer_capacity = buffer_capacity
+        # Number of segments and bytes appended to the log file by this buffer
+        self.segments_written = 0
+        self.bytes_written = 0
+        self._clear()
+
+    def add_histogram(self, step: int, histogram: Histogram, relative_time: float):
+        """Adds histogram to the buffer."""
+        row = (
+            step, len(histogram.counts), histogram.count, histogram.nonfinite, relative_time,
+            histogram.min, histogram.max, histogram.sum, histogram.sum_squares
+        )
+        for column, element in zip(self._columns, row):
+            column.append(element)
+        self._edges.extend(histogram.edges)
+        self._counts.extend(histogram.counts)
+        if len(self._columns[0]) == self._buffer_capacity:
+            self.dump()
+
+    def dump(self):
+        """Appends histograms from the buffer to the log file as a new segment.
+
+        Returns:
+            Number of bytes appended to the log file
+        """
+        if len(self._columns[0]) == 0:
+            return 0
+        segment = encode_histogram_segment(self._metric_name, self._columns, self._edges, self._counts)
+        with open(self._db_path, "ab") as f:
+            f.write(segment)
+
+        self._clear()
+        self.segments_written += 1
+        self.bytes_written += len(segment)
+        return len(segment)
+
+    def _clear(self):
+        self._columns = tuple(array(typecode) for typecode in HISTOGRAM_TYPECODES)
+        self._edges = array("d")
+        self._counts = array("q")
+
+    @property
+    def occupancy(self):
+        """Number of buffered histograms which weren't dumped yet."""
+        return len(self._columns[0])
+
+    @property
+    def capacity(self):
+        return self._buffer_capacity
+
+
+# NumPy dtypes matching the memory layout of array.array typecodes
+_NUMPY_DTYPES = {"q": "=i8", "d": "=f8"}
+
+
+def _is_scalar(value):
+    """Checks whether the value can be logged as a scalar. NumPy scalars are accepted as well."""
+    return type(value) is float or type(value) is int or (isinstance(value, Real) and not isinstance(value, bool))
+
+
+def _as_column(typecode: str, data):
+    """Converts an array-like object into an array.array column of the given typecode.
+
+    NumPy arrays are converted in bulk, without iterating over their elements in Python.
+    """
+    if isinstance(data, array) and data.typecode == typecode:
+        return data
+    if hasattr(data, "astype") and hasattr(data, "tobytes"):
+        column = array(typecode)
+        column.frombytes(data.astype(_NUMPY_DTYPES[typecode]).tobytes())
+        return column
+    return array(typecode, data)
 
 
 class ExperimentLogger:
@@ -68,10 +208,30 @@ class ExperimentLogger:
 
     It saves values for the specified metrics in the specified log directory.
     Log file is named after the timestamp when the experiment was run.
-    Metrics are saved as time-series in a JSON fashion.
+    Metrics are saved as time-series in an append-only binary log made out of segments.
+    A rolling summary of each metric is kept up to date and written next to the log file on every flush,
+    so the web app doesn't need the full series for showing the final or the best value of a run.
     """
 
-    def __init__(self, logdir: str = "runs", max_events: int = 100, log_interval: int = 0.5):
+    SWEEP_CONFIGURATION_FILE_NAME = "experiment_description.json"
+    # Metrics which an instrumented logger logs about itself are prefixed with this
+    SELF_METRIC_PREFIX = "_logger/"
+
+    def __init__(self,
+                logdir: str = "runs",
+                max_events: int = 100,
+                log_interval: int = 0.5,
+                async_logging: bool = False,
+                queue_capacity: int = 100000,
+                backpressure: str = "block",
+                instrument: bool = False,
+                delta_encoding: bool = False,
+                value_encoding: str = "raw",
+                compression: str = None,
+                run_name: str = None,
+                writer_id: int = None,
+                num_writers: int = None,
+                aggregation: str = None):
         """Initializes the module.
 
         Arguments:
@@ -80,43 +240,121 @@ class ExperimentLogger:
                 Buffers need to be filled completely before dumping the values to the log file.
             log_interval: Number of seconds after eaxh buffer dumps it's content to the log file.
                 This event happends periodically after @log_interval seconds.
+            async_logging: If True, @add_scalar only enqueues the event while a background
+                writer thread fills the metric buffers and writes them to the log file
+            queue_capacity: Maximum number of events waiting for the background writer.
+                If @async_logging is False this argument is ignored
+            backpressure: What to do when the queue is full: "block", "drop_oldest" or "sample".
+                If @async_logging is False this argument is ignored
+            instrument: If True, the logger records latencies of its own calls and flushes (see @stats)
+                and logs them, prefixed with "_logger/", into its own run on every flush
+            delta_encoding: If True, steps and times of each segment are stored as varint encoded differences
+            value_encoding: How values are stored: "raw" (float64), "xor" (XOR of consecutive float64 values,
+                lossless) or "float32" (values are rounded to float32, so precision is lost)
+            compression: Compression of the segments: None, "zlib" or "lzma"
+            run_name: Name of the run directory and of the log file. If None, they are named after
+                the time the logger was created. Ignored within a sweep, where the trial id names the log file
+            writer_id: Id of this writer, if several processes (e.g. ranks of a distributed training) log into
+                the same run. Writer 0 writes the log file of the run, every other writer writes its own shard
+                next to it (e.g. "trial-00001.w3.dat"), and the shards are merged by step when the run is read.
+                Outside of a sweep all of the writers must pass the same @run_name
+            num_writers: Number of writers of the run. Required only by @aggregation
+            aggregation: If set, writers don't write shards. Instead, writer 0 reduces the values which
+                all of the @num_writers writers logged at the same step with "mean", "sum", "min" or "max"
+                and writes only the reduced values
         """
         assert isinstance(logdir, str), f"Invalid type for log directory. Expected str, but received {type(logdir)}"
         self._logdir = logdir
         os.makedirs(logdir, exist_ok=True)
         init_time = time.strftime("%b-%d_%H-%M-%S")
 
-        # Set up the event dump timer
+        assert writer_id is None or run_name is not None or \
+            os.path.exists(os.path.join(logdir, self.SWEEP_CONFIGURATION_FILE_NAME)), \
+            "Writers of the same run outside of a sweep must share the run_name"
+        assert aggregation is None or (writer_id is not None and num_writers is not None), \
+            "Aggregation requires writer_id and num_writers"
         self._log_interval = log_interval
-        self._log_timer = CallbackTimer(self._log_interval, self._dump_all)
-        self._log_timer.start()
-
+        # Codec is recorded in every segment, so readers don't need to know how the logger was configured
+        self._codec = make_codec(delta_encoding, value_encoding, compression)
         self._metric_buffers = {}
+        self._histogram_buffers = {}
         self._max_events = max_events
+        self._async_logging = async_logging
+        # Guards the metric buffers which are shared between the caller and the flushing thread
+        self._buffers_lock = threading.Lock()
+        # Serializes the flushes, e.g. the final flush with a periodic flush still in progress
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        # Exception which stopped the periodic flushes of a synchronous logger
+        self._flush_error = None
+        self._metric_summaries = {}
+        # Summaries are written only if something was logged since they were last written
+        self._summaries_changed = False
+        # Metric names along with their according goal ("min" or "max"), all other metrics are minimized
+        self._metric_goals = {}
+        self._instrument = instrument
+        self._stats = LoggerStats()
+        # Number of events of the user metrics logged up to the last flush, so an idle logger doesn't log about itself
+        self._instrumented_events = 0
 
-        # "_temp" folder is present when using the hyperparameter sweep option
-        if os.path.exists(os.path.join(self._logdir, "_temp")):
-            self._early_stopping = True
-            self._early_stopping_log_file = os.path.join(os.path.join(self._logdir, "_temp"), "_temp.dat")
-            with open(self._early_stopping_log_file, "r") as f:
-                temp_log_data = json.load(f)
-                self._early_stopping_metric = temp_log_data["metric_name"]
-
+        # Sweep configuration file is present when using the hyperparameter sweep option
+        sweep_config_path = os.path.join(self._logdir, self.SWEEP_CONFIGURATION_FILE_NAME)
+        if os.path.exists(sweep_config_path):
             self._logdir_complete = self._logdir
+            # Imported only by the trials of a sweep, since json is slow to import
+            import json
+
+            with open(sweep_config_path, "r") as f:
+                sweep_config = json.load(f)
+            if sweep_config.get("optimization_goal") in SUMMARY_GOALS:
+                self._metric_goals[sweep_config["optimization_metric"]] = sweep_config["optimization_goal"]
         else:
-            self._early_stopping = False
-            self._logdir_complete = os.path.join(logdir, init_time)
+            self._logdir_complete = os.path.join(logdir, run_name or init_time)
+
+        # Sweeps which use early stopping advertise a channel for reporting the monitored metric.
+        # Only writer 0 reports, so the monitor sees a single series of the metric
+        self._early_stopping_reporter = EarlyStoppingReporter.from_environment() if not writer_id else None
+        self._early_stopping = self._early_stopping_reporter is not None
+        if self._early_stopping:
+            self._early_stopping_metric = self._early_stopping_reporter.metric_name
 
         os.makedirs(self._logdir_complete, exist_ok=True)
-        # Create a log file
-        self._db_path = os.path.join(self._logdir_complete, f"{init_time}.dat")
-        with open(self._db_path, "w") as f:
-            json.dump({}, f)
+        # Create a log file. Trials of a sweep can start at the same time, so they are named by their id
+        if self._logdir_complete == self._logdir and TRIAL_ID_ENV_VAR in os.environ:
+            log_file_name = f"trial-{int(os.environ[TRIAL_ID_ENV_VAR]):05d}.dat"
+        else:
+            log_file_name = f"{run_name or init_time}.dat"
+        run_log_path = os.path.join(self._logdir_complete, log_file_name)
+        # Each writer appends only to its own shard, so the writers never need to coordinate
+        self._db_path = get_shard_path(run_log_path, writer_id or 0)
+
+        # Writer 0 reduces the events of every writer, while the other writers only send theirs to it
+        self._aggregation = None
+        if aggregation is not None and writer_id == 0:
+            self._aggregation = MetricAggregator(run_log_path, num_writers, aggregation)
+        elif aggregation is not None:
+            self._aggregation = AggregationClient(run_log_path, writer_id)
+        if aggregation is None or writer_id == 0:
+            with open(self._db_path, "wb") as f:
+                f.write(encode_file_header())
 
         self.init_timestamp = time.time()
+
+        if self._async_logging:
+            # A single writer thread drains the queue and performs every write to the log file
+            self._event_queue = EventQueue(queue_capacity, backpressure)
+            self._writer = BackgroundWriter(
+                self._event_queue, self._write_event, self._dump_all, self._log_interval, lock=self._buffers_lock
+            )
+            self._writer.start()
+        else:
+            # Set up the event dump timer
+            self._log_timer = RepeatingTimer(self._log_interval, self._dump_periodically)
+            self._log_timer.start()
+
         atexit.register(self._clean_up)
 
-    def add_scalar(self, metric_name: str, value: Union[float, int], step: int):
+    def add_scalar(self, metric_name: str, value: float, step: int):
         """Add the new value for the specified metric into it's according buffer.
 
         Arguments:
@@ -124,47 +362,321 @@ class ExperimentLogger:
             value: New value for the specified metric
             step: Can represent training step, epoch etc.
         """
+        start = time.perf_counter_ns() if self._instrument else 0
         assert isinstance(metric_name, str), \
             f"Invalid metric_name type. Expected str but received {type(metric_name)}"
-        assert type(value) in [float, int], \
+        assert _is_scalar(value), \
             f"Invalid scalar type. Expected float or int but received {type(value)}"
-        assert isinstance(step, int), \
-            f"Invalid step type. Expected int but received {type(metric_name)}"
+        assert isinstance(step, Integral), \
+            f"Invalid step type. Expected int but received {type(step)}"
+
+        if self._async_logging:
+            self._event_queue.put((metric_name, step, value, time.time() - self.init_timestamp))
+        else:
+            with self._buffers_lock:
+                self._write_event(metric_name, step, value, time.time() - self.init_timestamp)
+
+        if self._early_stopping and metric_name == self._early_stopping_metric:
+            self._report_early_stopping(step, value)
+        if self._instrument:
+            self._stats.calls["add_scalar"].observe(time.perf_counter_ns() - start)
+
+    def add_scalars(self, step: int, scalars: dict):
+        """Adds new values for multiple metrics logged at the same step.
+
+        All of the values share a single timestamp and are validated in a single pass.
 
+        Arguments:
+            step: Can represent training step, epoch etc.
+            scalars: Metric names along with their according new values
+        """
+        start = time.perf_counter_ns() if self._instrument else 0
+        assert isinstance(step, Integral), \
+            f"Invalid step type. Expected int but received {type(step)}"
+        assert all(isinstance(metric_name, str) and _is_scalar(value) for metric_name, value in scalars.items()), \
+            "Invalid scalars. Expected str metric names and float or int values"
+
+        relative_time = time.time() - self.init_timestamp
+        if self._async_logging:
+            for metric_name, value in scalars.items():
+                self._event_queue.put((metric_name, step, value, relative_time))
+        else:
+            with self._buffers_lock:
+                for metric_name, value in scalars.items():
+                    self._write_event(metric_name, step, value, relative_time)
+
+        if self._early_stopping and self._early_stopping_metric in scalars:
+            self._report_early_stopping(step, scalars[self._early_stopping_metric])
+        if self._instrument:
+            self._stats.calls["add_scalars"].observe(time.perf_counter_ns() - start)
+
+    def add_scalar_array(self, metric_name: str, values, steps):
+        """Adds a whole series of values for the specified metric.
+
+        Useful for metrics which are computed per-batch on a device and retrieved in bulk.
+        All of the values share a single timestamp.
+
+        Arguments:
+            metric_name: Metric for which we log the new values
+            values: NumPy array or array-like of new values for the specified metric
+            steps: NumPy array or array-like of steps, one for each value
+        """
+        start = time.perf_counter_ns() if self._instrument else 0
+        assert isinstance(metric_name, str), \
+            f"Invalid metric_name type. Expected str but received {type(metric_name)}"
+        values = _as_column("d", values)
+        steps = _as_column("q", steps)
+        assert len(values) == len(steps), \
+            f"Number of values ({len(values)}) doesn't match the number of steps ({len(steps)})"
+        if len(values) == 0:
+            return
+
+        relative_time = time.time() - self.init_timestamp
+        if self._async_logging:
+            self._event_queue.put((metric_name, steps, values, relative_time))
+        else:
+            with self._buffers_lock:
+                self._write_event(metric_name, steps, values, relative_time)
+
+        if self._early_stopping and metric_name == self._early_stopping_metric:
+            # Only the most recent value is relevant for the "Early Stopping" monitoring
+            self._report_early_stopping(steps[-1], values[-1])
+        if self._instrument:
+            self._stats.calls["add_scalar_array"].observe(time.perf_counter_ns() - start)
+
+    def add_histogram(self, metric_name: str, values, step: int, bins=64, value_range: tuple = None):
+        """Adds the histogram of the values logged at the step, e.g. of the weights or the gradients of a layer.
+
+        Values are binned right away and only the bin edges, the bin counts and a few moments (count, minimum,
+        maximum, sum and sum of squares) are kept, so logging a large tensor costs as much memory and disk
+        as logging a small one. NumPy is imported on the first call.
+
+        Arguments:
+            metric_name: Metric for which we log the histogram
+            values: NumPy array or array-like of values of any shape. NaN and infinite values are only counted
+            step: Can represent training step, epoch etc.
+            bins: Number of bins, or an increasing sequence of bin edges
+            value_range: Tuple of (lower, upper) bound of the bins. If None, the bins span the values of each step
+        """
+        start = time.perf_counter_ns() if self._instrument else 0
+        assert isinstance(metric_name, str), \
+            f"Invalid metric_name type. Expected str but received {type(metric_name)}"
+        assert isinstance(step, Integral), \
+            f"Invalid step type. Expected int but received {type(step)}"
+        assert not isinstance(self._aggregation, AggregationClient), \
+            "Histograms of a run with aggregation are logged only by writer 0"
+
+        histogram = compute_histogram(values, bins, value_range)
+        relative_time = time.time() - self.init_timestamp
+        if self._async_logging:
+            self._event_queue.put((metric_name, step, histogram, relative_time))
+        else:
+            with self._buffers_lock:
+                self._write_event(metric_name, step, histogram, relative_time)
+
+        if self._instrument:
+            self._stats.calls["add_histogram"].observe(time.perf_counter_ns() - start)
+
+    def stats(self):
+        """Retrieves the statistics of the logger internals.
+
+        Occupancy of the metric buffers, the number of written segments and bytes and the number of dropped events
+        are always available, while the latencies of the calls and of the flushes and the time spent reporting
+        to the "Early Stopping" monitor are recorded only by a logger created with @instrument set to True.
+
+        Returns:
+            Dictionary with the statistics, latencies are given as histograms with power-of-two nanosecond buckets
+        """
+        with self._buffers_lock:
+            buffers = {
+                metric_name: {
+                    "buffered": buffer.occupancy,
+                    "capacity": buffer.capacity,
+                    "segments_written": buffer.segments_written,
+                    "bytes_written": buffer.bytes_written
+                } for metric_name, buffer in self._metric_buffers.items()
+            }
+            histogram_buffers = {
+                metric_name: {
+                    "buffered": buffer.occupancy,
+                    "capacity": buffer.capacity,
+                    "segments_written": buffer.segments_written,
+                    "bytes_written": buffer.bytes_written
+                } for metric_name, buffer in self._histogram_buffers.items()
+            }
+        return {
+            "instrumented": self._instrument,
+            "calls": {method_name: histogram.to_dict() for method_name, histogram in self._stats.calls.items()},
+            "buffers": buffers,
+            "histogram_buffers": histogram_buffers,
+            "flushes": {
+                "latency": self._stats.flush_latency.to_dict(),
+                "segments_written": sum(
+                    buffer["segments_written"] for buffer in [*buffers.values(), *histogram_buffers.values()]
+                ),
+                "bytes_written": sum(
+                    buffer["bytes_written"] for buffer in [*buffers.values(), *histogram_buffers.values()]
+                )
+            },
+            "early_stopping_blocked_ns": self._stats.early_stopping_blocked_ns,
+            "queued_events": len(self._event_queue) if self._async_logging else 0,
+            "dropped_events": self._event_queue.dropped_events if self._async_logging else 0
+        }
+
+    def _report_early_stopping(self, step, value):
+        """Reports the value of the monitored metric, measuring the time spent reporting if instrumented."""
+        if not self._instrument:
+            self._early_stopping_reporter.report(step, value)
+            return
+        start = time.perf_counter_ns()
+        self._early_stopping_reporter.report(step, value)
+        self._stats.early_stopping_blocked_ns += time.perf_counter_ns() - start
+
+    def _write_event(self, metric_name: str, step, value, relative_time: float):
+        """Places the event into the buffer of the according metric, or passes it on for aggregation.
+
+        The event can also be a batch of events, in which case @step and @value are arrays,
+        or a histogram, which is never aggregated.
+
+        Raises:
+            RuntimeError: If a periodic flush failed, so the event would never be written
+        """
+        if self._flush_error is not None:
+            raise RuntimeError("Periodic flush of the logger failed") from self._flush_error
+        if type(value) is Histogram:
+            self._buffer_histogram(metric_name, step, value, relative_time)
+            return
+        if self._aggregation is not None:
+            self._aggregation.add(metric_name, step, value, relative_time)
+            return
+        self._buffer_event(metric_name, step, value, relative_time)
+
+    def _buffer_event(self, metric_name: str, step, value, relative_time: float):
+        """Places the event into the buffer of the according metric."""
         if metric_name not in self._metric_buffers:
             self._register_buffer(metric_name, self._max_events)
-        
-        self._metric_buffers[metric_name].add_event(prepare_event(value, step, self.init_timestamp))
+        if type(step) is array:
+            self._metric_buffers[metric_name].add_events(step, value, relative_time)
+            self._metric_summaries[metric_name].update_batch(step, value, relative_time)
+        else:
+            self._metric_buffers[metric_name].add_event(step, value, relative_time)
+            self._metric_summaries[metric_name].update(step, value, relative_time)
+        self._summaries_changed = True
+
+    def _buffer_histogram(self, metric_name: str, step: int, histogram: Histogram, relative_time: float):
+        """Places the histogram into the histogram buffer of the according metric."""
+        if metric_name not in self._histogram_buffers:
+            self._histogram_buffers[metric_name] = HistogramBuffer(metric_name, self._max_events, self._db_path)
+        self._histogram_buffers[metric_name].add_histogram(step, histogram, relative_time)
 
-        if self._early_stopping:
-            # In the case of early stopping we update the specified metric's last value
-            if metric_name == self._early_stopping_metric:
-                with open(self._early_stopping_log_file, "r+") as f:
-                    temp_log_data = json.load(f)
-                    temp_log_data["curr_value"] = value
-                    f.seek(0)
-                    json.dump(temp_log_data, f)
-                    f.truncate()
-
-        if not self._log_timer.is_on:
-            self._log_timer.start()
-        
     def _register_buffer(self, metric_name: str, buffer_capacity):
         """Registers metric which is being logged for the first time."""
         new_metric_buffer = MetricBuffer(
             db_path=self._db_path,
             metric_name=metric_name,
-            buffer_capacity=buffer_capacity
+            buffer_capacity=buffer_capacity,
+            codec=self._codec
         )
         self._metric_buffers[metric_name] = new_metric_buffer
+        self._metric_summaries[metric_name] = MetricSummary(self._metric_goals.get(metric_name, "min"))
 
     def _dump_all(self):
-        """Logs content of each metric's buffer to the log file."""
-        for buffer in self._metric_buffers.values():
-            buffer.dump()
-        self._log_timer.reset()
+        """Logs content of each metric's buffer to the log file and writes the summaries of the metrics.
+
+        Events are exchanged with the other writers without holding the lock of the buffers,
+        so the logging calls never wait for another process.
+        """
+        with self._flush_lock:
+            if self._instrument:
+                with self._buffers_lock:
+                    self._log_self_metrics()
+                start = time.perf_counter_ns()
+            aggregated_events = []
+            if self._aggregation is not None:
+                # Final flush also reduces the steps for which some of the writers haven't logged a value
+                aggregated_events = self._aggregation.collect(final=self._closed)
+
+            with self._buffers_lock:
+                for event in aggregated_events:
+                    self._buffer_event(*event)
+                flushed_bytes = 0
+                for buffer in self._metric_buffers.values():
+                    flushed_bytes += buffer.dump()
+                for buffer in self._histogram_buffers.values():
+                    flushed_bytes += buffer.dump()
+
+                if self._instrument and flushed_bytes:
+                    self._stats.last_flush_ns = time.perf_counter_ns() - start
+                    self._stats.last_flush_bytes = flushed_bytes
+                    self._stats.flush_latency.observe(self._stats.last_flush_ns)
+                if self._summaries_changed:
+                    write_run_summary(self._db_path, self._metric_summaries)
+                    self._summaries_changed = False
+
+    def _dump_periodically(self):
+        """Flushes the buffers on the timer of a synchronous logger.
+
+        If the flush fails (e.g. the disk is full), the error is recorded and the timer stops,
+        so the error is raised by the next logging call and when the logger is closed.
+        """
+        try:
+            self._dump_all()
+        except BaseException as e:
+            self._flush_error = e
+            self._log_timer.cancel()
+
+    def _log_self_metrics(self):
+        """Logs the statistics of the logger into its own run, along with the events flushed next.
+
+        Latency and size of a flush are logged on the following flush, so the final flush
+        of the run still carries the statistics of every preceding flush.
+        """
+        user_buffers = [
+            buffer for metric_name, buffer in self._metric_buffers.items()
+                if not metric_name.startswith(self.SELF_METRIC_PREFIX)
+        ]
+        logged_events = sum(
+            summary.count for metric_name, summary in self._metric_summaries.items()
+                if not metric_name.startswith(self.SELF_METRIC_PREFIX)
+        )
+        if logged_events == self._instrumented_events:
+            return
+        self._instrumented_events = logged_events
+
+        add_scalar_latency = self._stats.calls["add_scalar"]
+        self_metrics = {
+            "buffer_occupancy": sum(buffer.occupancy for buffer in user_buffers) /
+                max(1, sum(buffer.capacity for buffer in user_buffers)),
+            "flush_ms": self._stats.last_flush_ns / 1e6,
+            "flush_bytes": self._stats.last_flush_bytes,
+            "early_stopping_blocked_ms": self._stats.early_stopping_blocked_ns / 1e6,
+            "dropped_events": self._event_queue.dropped_events if self._async_logging else 0
+        }
+        if add_scalar_latency.count:
+            self_metrics["add_scalar_mean_us"] = add_scalar_latency.total_ns / add_scalar_latency.count / 1e3
+            self_metrics["add_scalar_p99_us"] = add_scalar_latency.quantile(0.99) / 1e3
+
+        relative_time = time.time() - self.init_timestamp
+        step = self._stats.flush_latency.count
+        for metric_name, value in self_metrics.items():
+            self._write_event(self.SELF_METRIC_PREFIX + metric_name, step, value, relative_time)
 
     def _clean_up(self):
-        """Terminates running timers and dumps buffered metric values."""
-        self._dump_all()
-        self._log_timer.cancel()
+        """Terminates running timers and dumps buffered metric values.
+
+        Error of a failed background writer or of a failed periodic flush is raised once the logger is closed.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if self._async_logging:
+                self._writer.stop()
+            else:
+                self._log_timer.cancel()
+                if self._flush_error is not None:
+                    raise RuntimeError("Periodic flush of the logger failed") from self._flush_error
+                self._dump_all()
+        finally:
+            if self._early_stopping:
+                self._early_stopping_reporter.close()
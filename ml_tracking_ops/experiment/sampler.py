@@ -1,7 +1,6 @@
-from typing import Union, List, Tuple
-from random import choice
+import random
 
-import numpy.random as np_random
+from typing import Union, List, Tuple
 
 
 class HyperparameterSampler:
@@ -30,9 +29,13 @@ class Choice(HyperparameterSampler):
         self._hyperparameter_values = hyperparameter_values
         self.sampler_type = "choice"
 
-    def sample(self):
-        """Samples a hyperparameter value."""
-        return choice(self._hyperparameter_values)
+    def sample(self, rng: random.Random = random):
+        """Samples a hyperparameter value.
+
+        Arguments:
+            rng: Random number generator used for sampling
+        """
+        return rng.choice(self._hyperparameter_values)
     
     def get_str_representation(self):
         hyperparam_vals_str = [str(val) for val in self._hyperparameter_values]
@@ -53,9 +56,13 @@ class Uniform(HyperparameterSampler):
         self._upper_bound = upper_bound
         self.sampler_type = "uniform"
 
-    def sample(self):
-        """Samples a hyperparameter value."""
-        return np_random.uniform(low=self._lower_bound, high=self._upper_bound)
+    def sample(self, rng: random.Random = random):
+        """Samples a hyperparameter value.
+
+        Arguments:
+            rng: Random number generator used for sampling
+        """
+        return rng.uniform(self._lower_bound, self._upper_bound)
 
     def get_str_representation(self):
         representation = f"Uniform({self._lower_bound}, {self._upper_bound})"
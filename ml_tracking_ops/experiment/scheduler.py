@@ -0,0 +1,152 @@
+import bisect
+import threading
+
+
+class TrialScheduler:
+    """Base class for schedulers which stop unpromising trials based on intermediate metric values.
+
+    Intermediate values arrive concurrently from all of the running trials,
+    so every decision is made under a lock.
+    """
+
+    def __init__(self, goal: str):
+        """Initializes the module.
+
+        Arguments:
+            goal: "max" or "min", depending on whether the optimization metric is maximized or minimized
+        """
+        assert goal in ["max", "min"], f"Invalid optimization goal. Expected 'max' or 'min' but received {goal}"
+        self._goal = goal
+        self._lock = threading.Lock()
+
+    def report(self, trial_id: int, step: int, value: float):
+        """Records an intermediate value of the trial.
+
+        Returns:
+            False if the trial should be stopped, True otherwise
+        """
+        with self._lock:
+            return self._report(trial_id, step, value)
+
+    def _report(self, trial_id: int, step: int, value: float):
+        raise NotImplementedError()
+
+    def _is_better(self, value: float, reference: float):
+        """Checks whether the value is at least as good as the reference value."""
+        return value >= reference if self._goal == "max" else value <= reference
+
+    def _best_of(self, value: float, other: float):
+        """Returns the better one of the two values."""
+        return max(value, other) if self._goal == "max" else min(value, other)
+
+
+class SuccessiveHalvingScheduler(TrialScheduler):
+    """Asynchronous successive halving (ASHA), optionally with Hyperband brackets.
+
+    Resource is the step at which the optimization metric was logged. Rungs are placed at
+    @min_resource * @reduction_factor^k steps. When a trial reaches a rung, its best value so far
+    is compared with the values of all trials which reached that rung before it.
+    The trial continues only if it is in the top 1 / @reduction_factor of them.
+    Decisions never wait for other trials, so concurrently running trials are never blocked.
+
+    With @brackets > 1 trials are assigned to brackets in a round-robin fashion,
+    where bracket s places its first rung at @min_resource * @reduction_factor^s steps (Hyperband).
+    """
+
+    def __init__(self, goal: str, min_resource: int, max_resource: int, reduction_factor: int = 3,
+                 brackets: int = 1):
+        """Initializes the module.
+
+        Arguments:
+            goal: "max" or "min", depending on whether the optimization metric is maximized or minimized
+            min_resource: Step at which the first rung is placed
+            max_resource: Maximum number of steps a trial is trained for. No rungs are placed at or after it
+            reduction_factor: Only the top 1 / @reduction_factor trials are promoted at each rung
+            brackets: Number of Hyperband brackets
+        """
+        super().__init__(goal)
+        assert reduction_factor >= 2, f"Reduction factor must be at least 2, but received {reduction_factor}"
+        self._reduction_factor = reduction_factor
+        self._bracket_rungs = []
+        for bracket in range(brackets):
+            rungs = []
+            resource = min_resource * reduction_factor ** bracket
+            while resource < max_resource:
+                rungs.append(resource)
+                resource *= reduction_factor
+            self._bracket_rungs.append(rungs)
+        # Values recorded at each rung of each bracket
+        self._rung_values = [[[] for _ in rungs] for rungs in self._bracket_rungs]
+        # Trial id -> [bracket, index of the next rung, best value so far]
+        self._trials = {}
+
+    def _report(self, trial_id: int, step: int, value: float):
+        if trial_id not in self._trials:
+            self._trials[trial_id] = [trial_id % len(self._bracket_rungs), 0, value]
+        trial = self._trials[trial_id]
+        bracket, rung_idx, best_value = trial
+        best_value = self._best_of(value, best_value)
+        trial[2] = best_value
+
+        rungs = self._bracket_rungs[bracket]
+        while rung_idx < len(rungs) and step >= rungs[rung_idx]:
+            competing_values = self._rung_values[bracket][rung_idx]
+            competing_values.append(best_value)
+            rung_idx += 1
+            trial[1] = rung_idx
+            if not self._is_promotable(best_value, competing_values):
+                return False
+        return True
+
+    def _is_promotable(self, value: float, competing_values: list):
+        """Checks whether the value is in the top 1 / @reduction_factor of the competing values."""
+        num_promoted = max(1, len(competing_values) // self._reduction_factor)
+        ranked_values = sorted(competing_values, reverse=self._goal == "max")
+        return self._is_better(value, ranked_values[num_promoted - 1])
+
+
+class MedianStoppingScheduler(TrialScheduler):
+    """Median stopping rule.
+
+    A trial is stopped at step s if its best value up to s is worse than the median
+    of the best values up to s of the trials started before it.
+    """
+
+    def __init__(self, goal: str, min_steps: int = 0, min_trials: int = 5):
+        """Initializes the module.
+
+        Arguments:
+            goal: "max" or "min", depending on whether the optimization metric is maximized or minimized
+            min_steps: Trials are never stopped before reaching this step
+            min_trials: Minimum number of earlier trials which must have reached step s before the rule is applied
+        """
+        super().__init__(goal)
+        self._min_steps = min_steps
+        self._min_trials = min_trials
+        # Trial id -> ([steps], [best values up to each step])
+        self._histories = {}
+
+    def _report(self, trial_id: int, step: int, value: float):
+        if trial_id not in self._histories:
+            self._histories[trial_id] = ([], [])
+        steps, best_values = self._histories[trial_id]
+        best_value = self._best_of(value, best_values[-1]) if best_values else value
+        steps.append(step)
+        best_values.append(best_value)
+
+        if step < self._min_steps:
+            return True
+
+        earlier_values = []
+        for other_trial_id, (other_steps, other_best_values) in self._histories.items():
+            if other_trial_id >= trial_id or not other_steps or other_steps[-1] < step:
+                continue
+            earlier_values.append(other_best_values[bisect.bisect_right(other_steps, step) - 1])
+        if len(earlier_values) < self._min_trials:
+            return True
+
+        earlier_values.sort()
+        middle = len(earlier_values) // 2
+        median = earlier_values[middle] if len(earlier_values) % 2 else \
+            (earlier_values[middle - 1] + earlier_values[middle]) / 2
+        return self._is_better(best_value, median)
@@ -0,0 +1,332 @@
+import os
+import time
+import threading
+
+from array import array
+
+
+# Writer 0 writes the log file of the run itself, every other writer writes its own shard next to it,
+# named "<run>.w<writer id>.dat"
+SHARD_FILE_EXTENSION = ".dat"
+# File through which writer 0 advertises the channel over which the other writers send their events
+AGGREGATOR_FILE_EXTENSION = ".aggregator.json"
+
+REDUCTIONS = {
+    "mean": lambda values: sum(values) / len(values),
+    "sum": sum,
+    "min": min,
+    "max": max
+}
+
+
+def get_shard_path(log_file_path: str, writer_id: int):
+    """Returns the path of the shard written by the writer, e.g. "trial-00001.w3.dat" for writer 3 of trial 1."""
+    if writer_id == 0:
+        return log_file_path
+    return f"{os.path.splitext(log_file_path)[0]}.w{writer_id}.dat"
+
+
+def _split_shard_file(file_name: str):
+    """Splits the name of the shard into the name of the run and the writer id, or returns None for other files.
+
+    Names are split without regular expressions, since importing re would slow down the import of the logger.
+    """
+    if not file_name.endswith(SHARD_FILE_EXTENSION):
+        return None
+    run, _, writer_id = file_name[:-len(SHARD_FILE_EXTENSION)].rpartition(".w")
+    if not run or not writer_id.isdigit():
+        return None
+    return run, writer_id
+
+
+def is_shard_file(file_name: str):
+    """Checks whether the log file is a shard written by a writer other than writer 0."""
+    return _split_shard_file(file_name) is not None
+
+
+def parse_shard_file(shard_file_name: str):
+    """Parses the name of the shard.
+
+    Returns:
+        Tuple of (name of the log file of the run to which the shard belongs, writer id)
+    """
+    run, writer_id = _split_shard_file(shard_file_name)
+    return run + SHARD_FILE_EXTENSION, int(writer_id)
+
+
+def _get_aggregator_path(log_file_path: str):
+    return os.path.splitext(log_file_path)[0] + AGGREGATOR_FILE_EXTENSION
+
+
+class MetricAggregator:
+    """Reduces the values which every writer of the run logged at the same step of a metric.
+
+    Runs in the process of writer 0. Events of writer 0 are added directly, while the other writers
+    send theirs in batches over a channel which is advertised in a file next to the log file of the run.
+    A (metric, step) pair is reduced once every writer has logged a value for it, a writer which logs
+    the same step twice replaces its previous value. Pairs which are still incomplete are reduced when the logger
+    is closed, after the writers which connected have finished.
+    """
+
+    # Seconds during which writer 0 waits for the connected writers to send their last events when it is closed
+    CLOSE_TIMEOUT = 30.0
+
+    def __init__(self, log_file_path: str, num_writers: int, reduction: str):
+        """Initializes the module.
+
+        Arguments:
+            log_file_path: Log file of the run, the channel is advertised next to it
+            num_writers: Number of writers which log values of the run
+            reduction: How the values of the writers are reduced: "mean", "sum", "min" or "max"
+        """
+        assert reduction in REDUCTIONS, \
+            f"Invalid reduction. Expected one of {list(REDUCTIONS)} but received {reduction}"
+        # Imported only by the runs logged by several writers, since they are slow to import
+        import json
+        from multiprocessing.connection import Listener
+
+        self._num_writers = num_writers
+        self._reduce = REDUCTIONS[reduction]
+        # (metric name, step) -> [value logged by each writer id, relative time of the latest value]
+        self._pending = {}
+        self._complete = []
+        self._lock = threading.Lock()
+        # Notified whenever another writer closes its connection
+        self._writer_finished = threading.Condition(self._lock)
+        self._num_connected_writers = 0
+        self._num_finished_writers = 0
+        self._closed = False
+
+        self._authkey = os.urandom(16)
+        self._listener = Listener(("localhost", 0), authkey=self._authkey)
+        host, port = self._listener.address
+        self._aggregator_path = _get_aggregator_path(log_file_path)
+        tmp_path = f"{self._aggregator_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"address": f"{host}:{port}", "authkey": self._authkey.hex()}, f)
+        os.replace(tmp_path, self._aggregator_path)
+        self._accept_thread = threading.Thread(target=self._accept_connections, daemon=True)
+        self._accept_thread.start()
+
+    def add(self, metric_name: str, step, value, relative_time: float):
+        """Adds the event of writer 0. The event can also be a batch of events, with @step and @value as arrays."""
+        with self._lock:
+            if type(step) is array:
+                for step_, value_ in zip(step, value):
+                    self._add(metric_name, 0, step_, value_, relative_time)
+            else:
+                self._add(metric_name, 0, step, value, relative_time)
+
+    def collect(self, final: bool = False):
+        """Takes the reduced events.
+
+        Writers which never connected (e.g. because they didn't log anything) aren't waited for.
+
+        Arguments:
+            final: If True, the incomplete (metric, step) pairs are reduced as well and the channel is closed
+
+        Returns:
+            List of (metric name, step, reduced value, relative time) events
+        """
+        with self._lock:
+            if final and not self._closed:
+                self._writer_finished.wait_for(
+                    lambda: self._num_finished_writers >= self._num_connected_writers, self.CLOSE_TIMEOUT
+                )
+                self._close()
+            if final:
+                for (metric_name, step), (values, relative_time) in self._pending.items():
+                    self._complete.append((metric_name, step, self._reduce(list(values.values())), relative_time))
+                self._pending = {}
+            complete, self._complete = self._complete, []
+        return complete
+
+    def _add(self, metric_name: str, writer_id: int, step: int, value: float, relative_time: float):
+        key = (metric_name, step)
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = [{}, relative_time]
+        pending[0][writer_id] = value
+        pending[1] = max(pending[1], relative_time)
+        if len(pending[0]) == self._num_writers:
+            del self._pending[key]
+            self._complete.append((metric_name, step, self._reduce(list(pending[0].values())), pending[1]))
+
+    def _close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._listener.close()
+        if os.path.exists(self._aggregator_path):
+            os.remove(self._aggregator_path)
+
+    def _accept_connections(self):
+        """Accepts connections from the other writers."""
+        while not self._closed:
+            try:
+                connection = self._listener.accept()
+            except Exception:
+                # Listener was closed or the client failed the authentication
+                continue
+            with self._lock:
+                self._num_connected_writers += 1
+            threading.Thread(target=self._receive_events, args=(connection, ), daemon=True).start()
+
+    def _receive_events(self, connection):
+        """Adds the batches of events sent over the connection until the writer closes it.
+
+        Writer introduces itself with its writer id, which is followed by the batches of its events.
+        """
+        with connection:
+            try:
+                writer_id = connection.recv()
+                while True:
+                    # Batch maps each metric name to its (steps, values, relative times) columns
+                    batch = connection.recv()
+                    with self._lock:
+                        for metric_name, (steps, values, times) in batch.items():
+                            for step, value, relative_time in zip(steps, values, times):
+                                self._add(metric_name, writer_id, step, value, relative_time)
+            except (EOFError, OSError):
+                pass
+        with self._lock:
+            self._num_finished_writers += 1
+            self._writer_finished.notify_all()
+
+
+class AggregationClient:
+    """Sends the events of a writer other than writer 0 to the aggregator of the run.
+
+    Events are only appended to per-metric columns when they are logged, and are sent as a single batch on every flush,
+    so the logging calls never wait for the channel nor for writer 0. A batch which can't be sent yet, because
+    writer 0 hasn't advertised the aggregator yet, is sent along with the next one. If the aggregator can't be reached
+    for CONNECT_TIMEOUT seconds or writer 0 closes the channel, a warning is issued and the events are discarded.
+    """
+
+    # Seconds during which the client waits for writer 0 to advertise the aggregator
+    CONNECT_TIMEOUT = 60.0
+    # Seconds between two consecutive connection attempts of the final flush
+    RETRY_INTERVAL = 0.1
+
+    def __init__(self, log_file_path: str, writer_id: int):
+        """Initializes the module.
+
+        Arguments:
+            log_file_path: Log file of the run, next to which writer 0 advertises the aggregator
+            writer_id: Id of this writer, with which it introduces itself to the aggregator
+        """
+        self._aggregator_path = _get_aggregator_path(log_file_path)
+        self._writer_id = writer_id
+        self._connection = None
+        self._batch = {}
+        # Guards the batch, which is filled by the logging calls and taken by the flushes
+        self._lock = threading.Lock()
+        # Time by which the aggregator has to be reached, set once it couldn't be reached
+        self._deadline = None
+        # Set once the events are discarded, after the aggregator couldn't be reached
+        self._abandoned = False
+
+    def add(self, metric_name: str, step, value, relative_time: float):
+        """Adds the event to the next batch. The event can also be a batch of events."""
+        with self._lock:
+            if self._abandoned:
+                return
+            if metric_name not in self._batch:
+                self._batch[metric_name] = (array("q"), array("d"), array("d"))
+            steps, values, times = self._batch[metric_name]
+            if type(step) is array:
+                steps.extend(step)
+                values.extend(value)
+                times.extend(array("d", [relative_time]) * len(step))
+            else:
+                steps.append(step)
+                values.append(value)
+                times.append(relative_time)
+
+    def collect(self, final: bool = False):
+        """Sends the batch of events to the aggregator. Nothing is written by this writer, so no event is returned.
+
+        Flushes share the connection, so they must not collect concurrently.
+
+        Arguments:
+            final: If True, the aggregator is waited for if it wasn't advertised yet,
+                and the connection is closed after sending the batch
+        """
+        with self._lock:
+            batch, self._batch = self._batch, {}
+        if batch and not self._send(batch, wait=final):
+            with self._lock:
+                # Events logged in the meantime follow the events of the batch which wasn't sent
+                for metric_name, columns in self._batch.items():
+                    if metric_name not in batch:
+                        batch[metric_name] = columns
+                        continue
+                    for column, new_column in zip(batch[metric_name], columns):
+                        column.extend(new_column)
+                self._batch = batch
+        if final and self._connection is not None:
+            self._connection.close()
+            self._connection = None
+        return []
+
+    def _send(self, batch: dict, wait: bool):
+        """Sends the batch to the aggregator, connecting to it first if necessary.
+
+        Arguments:
+            batch: Batch of events to send
+            wait: If True, connecting is retried until the aggregator is reached or CONNECT_TIMEOUT passes
+
+        Returns:
+            False if the aggregator wasn't advertised yet, so the batch has to be sent again, True otherwise
+        """
+        from multiprocessing import AuthenticationError
+
+        while True:
+            connected = self._connection is not None
+            try:
+                if not connected:
+                    self._connection = self._connect()
+                self._connection.send(batch)
+                self._deadline = None
+                return True
+            except (OSError, ValueError, AuthenticationError):
+                if self._connection is not None:
+                    self._connection.close()
+                    self._connection = None
+                if connected:
+                    self._abandon("writer 0 closed the channel")
+                    return True
+            # Writer 0 hasn't started yet, or an aggregator of a previous run was advertised
+            if self._deadline is None:
+                self._deadline = time.monotonic() + self.CONNECT_TIMEOUT
+            if time.monotonic() > self._deadline:
+                self._abandon(f"no aggregator was advertised in {self._aggregator_path}")
+                return True
+            if not wait:
+                return False
+            time.sleep(self.RETRY_INTERVAL)
+
+    def _connect(self):
+        """Connects to the aggregator advertised by writer 0 and introduces this writer to it."""
+        import json
+        from multiprocessing.connection import Client
+
+        with open(self._aggregator_path, "r") as f:
+            aggregator = json.load(f)
+        host, port = aggregator["address"].rsplit(":", 1)
+        connection = Client((host, int(port)), authkey=bytes.fromhex(aggregator["authkey"]))
+        connection.send(self._writer_id)
+        return connection
+
+    def _abandon(self, reason: str):
+        """Discards the events of this writer from now on, warning once that they are lost."""
+        import warnings
+
+        with self._lock:
+            self._abandoned = True
+            self._batch = {}
+        warnings.warn(
+            f"Events of writer {self._writer_id} are discarded, since {reason}. "
+            "They are missing from the aggregated values of the run.",
+            RuntimeWarning
+        )
@@ -0,0 +1,201 @@
+import os
+import math
+
+
+SUMMARY_FILE_EXTENSION = ".summary.json"
+SUMMARY_GOALS = ["min", "max"]
+
+
+def get_summary_path(log_file_path: str):
+    """Returns the path of the summary file kept next to the log file, e.g. "trial-00001.summary.json"."""
+    return os.path.splitext(log_file_path)[0] + SUMMARY_FILE_EXTENSION
+
+
+def _as_list(column):
+    """Converts an array.array, a NumPy array or a sequence into a list of Python numbers."""
+    return column.tolist() if hasattr(column, "tolist") else [element.item() if hasattr(element, "item") else element
+                                                               for element in column]
+
+
+class MetricSummary:
+    """Rolling summary of a single metric.
+
+    Keeps the number of points, the minimum, the maximum, the last and the best value, the step of the best value
+    and the relative time of the last point. Updating the summary takes constant time per logged value,
+    so the summary of a run never has to be derived from its full series.
+    """
+
+    def __init__(self, goal: str = "min"):
+        """Initializes the module.
+
+        Arguments:
+            goal: "min" or "max", depending on whether the best value of the metric is its minimum or its maximum
+        """
+        assert goal in SUMMARY_GOALS, f"Invalid goal. Expected one of {SUMMARY_GOALS} but received {goal}"
+        self.goal = goal
+        self.count = 0
+        self.min = self.max = self.last = None
+        self.min_step = self.max_step = self.last_step = None
+        self.wall_time = None
+
+    def update(self, step: int, value: float, relative_time: float):
+        """Adds a single logged value to the summary.
+
+        NumPy scalars are converted into Python numbers, so the summary can always be written as JSON.
+        """
+        step, value = int(step), float(value)
+        self.count += 1
+        self.last, self.last_step = value, step
+        self.wall_time = relative_time
+        # NaN is never the minimum nor the maximum
+        if value != value:
+            return
+        if self.min is None or value < self.min:
+            self.min, self.min_step = value, step
+        if self.max is None or value > self.max:
+            self.max, self.max_step = value, step
+
+    def update_batch(self, steps, values, relative_time: float):
+        """Adds a batch of logged values to the summary.
+
+        Extremes of the batch are found by the builtin min and max, without visiting the values one by one in Python.
+
+        Arguments:
+            steps: Step of each value
+            values: Logged values
+            relative_time: Relative time of the last value of the batch
+        """
+        if len(values) == 0:
+            return
+        # Batches of NumPy values are converted into Python numbers, so the summary can always be written as JSON
+        steps, values = _as_list(steps), _as_list(values)
+        batch_min, batch_max = min(values), max(values)
+        # Builtin min and max are unreliable in presence of NaN, so such batches are added value by value.
+        # The sum of the values is NaN whenever any of them is NaN
+        if math.isnan(sum(values)):
+            for step, value in zip(steps, values):
+                self.update(step, value, relative_time)
+            return
+
+        self.count += len(values)
+        self.last, self.last_step = values[-1], steps[-1]
+        self.wall_time = relative_time
+        if self.min is None or batch_min < self.min:
+            self.min, self.min_step = batch_min, steps[values.index(batch_min)]
+        if self.max is None or batch_max > self.max:
+            self.max, self.max_step = batch_max, steps[values.index(batch_max)]
+
+    @property
+    def best(self):
+        return self.max if self.goal == "max" else self.min
+
+    @property
+    def best_step(self):
+        return self.max_step if self.goal == "max" else self.min_step
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "last": self.last,
+            "last_step": self.last_step,
+            "goal": self.goal,
+            "best": self.best,
+            "best_step": self.best_step,
+            "wall_time": self.wall_time
+        }
+
+
+def summarize_run(summaries: dict):
+    """Combines the summaries of the metrics of a run into the form stored in the summary file.
+
+    Arguments:
+        summaries: Metric names along with their according MetricSummary objects
+    """
+    metrics = {metric_name: summary.to_dict() for metric_name, summary in summaries.items()}
+    wall_times = [summary["wall_time"] for summary in metrics.values() if summary["wall_time"] is not None]
+    return {
+        "wall_time": max(wall_times) if wall_times else None,
+        "metrics": metrics
+    }
+
+
+def write_run_summary(log_file_path: str, summaries: dict):
+    """Writes the summaries of the metrics of a run into the summary file next to its log file.
+
+    The file is replaced atomically, so a reader never sees a partially written summary.
+
+    Arguments:
+        log_file_path: Log file of the run
+        summaries: Metric names along with their according MetricSummary objects
+    """
+    # Imported on the first flush instead of at import time, since json is slow to import
+    import json
+
+    run_summary = summarize_run(summaries)
+    summary_path = get_summary_path(log_file_path)
+    tmp_path = f"{summary_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(run_summary, f)
+    os.replace(tmp_path, summary_path)
+
+
+def read_run_summary(log_file_path: str):
+    """Reads the summary file of the run, or returns None if the run has no summary file."""
+    import json
+
+    summary_path = get_summary_path(log_file_path)
+    if not os.path.exists(summary_path):
+        return None
+    with open(summary_path, "r") as f:
+        return json.load(f)
+
+
+def _pick(candidates: list, choose):
+    """Picks a value out of the non-None candidates, or returns None if there are none."""
+    candidates = [candidate for candidate in candidates if candidate is not None]
+    return choose(candidates) if candidates else None
+
+
+def merge_run_summaries(run_summaries: list):
+    """Merges the summaries of the shards which several writers wrote for the same run.
+
+    Counts are added up, while the extremes, the last and the best value of each metric
+    are taken from the shard in which they occurred.
+
+    Arguments:
+        run_summaries: Summaries of the shards, as read by read_run_summary
+    """
+    metrics = {}
+    for run_summary in run_summaries:
+        for metric_name, summary in run_summary["metrics"].items():
+            metrics.setdefault(metric_name, []).append(summary)
+
+    merged_metrics = {}
+    for metric_name, summaries in metrics.items():
+        goal = summaries[0]["goal"]
+        best_of = max if goal == "max" else min
+        last = _pick(
+            [summary for summary in summaries if summary["last_step"] is not None],
+            lambda candidates: max(candidates, key=lambda summary: summary["last_step"])
+        )
+        best = _pick(
+            [summary for summary in summaries if summary["best"] is not None],
+            lambda candidates: best_of(candidates, key=lambda summary: summary["best"])
+        )
+        merged_metrics[metric_name] = {
+            "count": sum(summary["count"] for summary in summaries),
+            "min": _pick([summary["min"] for summary in summaries], min),
+            "max": _pick([summary["max"] for summary in summaries], max),
+            "last": last["last"] if last else None,
+            "last_step": last["last_step"] if last else None,
+            "goal": goal,
+            "best": best["best"] if best else None,
+            "best_step": best["best_step"] if best else None,
+            "wall_time": _pick([summary["wall_time"] for summary in summaries], max)
+        }
+    return {
+        "wall_time": _pick([run_summary["wall_time"] for run_summary in run_summaries], max),
+        "metrics": merged_metrics
+    }
@@ -0,0 +1,229 @@
+import os
+import sys
+import atexit
+import signal
+import random
+import socket
+import threading
+import traceback
+import subprocess
+import importlib.util
+
+from multiprocessing.connection import Connection, wait
+
+
+# Environment variable through which the warm parent receives the socket connected to the sweep
+CONNECTION_FD_ENV_VAR = "ML_TRACKING_OPS_WARM_WORKER_FD"
+
+
+class WarmTrialProcess:
+    """Handle of a trial forked by the warm parent.
+
+    Mirrors the part of the subprocess.Popen interface used by the sweep and by the early stopping monitors,
+    so killing the trial kills only the forked process, never the warm parent.
+    """
+
+    def __init__(self, pool, pid: int):
+        """Initializes the module.
+
+        Arguments:
+            pool: Pool of warm workers which forked the trial
+            pid: Process id of the forked trial
+        """
+        self._pool = pool
+        self.pid = pid
+        self.returncode = None
+
+    def poll(self):
+        """Returns the exit code of the trial, or None if it is still running."""
+        if self.returncode is None:
+            self.returncode = self._pool.get_returncode(self.pid)
+        return self.returncode
+
+    def kill(self):
+        self._send_signal(signal.SIGKILL)
+
+    def terminate(self):
+        self._send_signal(signal.SIGTERM)
+
+    def _send_signal(self, signal_number: int):
+        if self.poll() is not None:
+            return
+        try:
+            os.kill(self.pid, signal_number)
+        except ProcessLookupError:
+            # Trial exited in the meantime
+            pass
+
+
+class WarmWorkerPool:
+    """Runs trials in processes forked from a warm parent which imported the training script once.
+
+    The warm parent is a single long-lived interpreter which imports the script as a module, so the imports
+    and the module level set-up are paid once per sweep instead of once per trial. Every trial is a fresh fork
+    of the warm parent which calls the entry function of the script with the sampled hyperparameters.
+    """
+
+    def __init__(self, script_name: str, entry_function: str, env: dict = None):
+        """Initializes the module.
+
+        Arguments:
+            script_name: Training script which is imported by the warm parent
+            entry_function: Name of the function of the script which runs a single trial
+            env: Environment of the warm parent, inherited by every trial. Defaults to the environment of the sweep
+        """
+        assert hasattr(os, "fork"), "Warm trial workers are not supported on this platform"
+        sweep_socket, parent_socket = socket.socketpair()
+        env = dict(os.environ if env is None else env)
+        env[CONNECTION_FD_ENV_VAR] = str(parent_socket.fileno())
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", __name__, os.path.abspath(script_name), entry_function],
+            env=env, pass_fds=(parent_socket.fileno(), )
+        )
+        parent_socket.close()
+        self._connection = Connection(sweep_socket.detach())
+        # Early stopping monitors poll trials from the threads of the early stopping server
+        self._lock = threading.Lock()
+        # Process id of each finished trial -> exit code
+        self._returncodes = {}
+
+        message = self._receive()
+        if message[0] == "error":
+            self.close()
+            raise RuntimeError(f"Warm parent failed to import {script_name}:\n{message[1]}")
+
+    def start_trial(self, trial_id: int, kwargs: dict, argv: list, env: dict):
+        """Forks a trial from the warm parent.
+
+        Arguments:
+            trial_id: Id of the trial
+            kwargs: Keyword arguments of the entry function
+            argv: Value of sys.argv in the trial, for scripts which also parse the command line
+            env: Environment variables which are set in the trial on top of the environment of the warm parent
+        """
+        with self._lock:
+            self._connection.send(("start", trial_id, kwargs, argv, env))
+            while True:
+                message = self._receive()
+                if message[0] == "started" and message[1] == trial_id:
+                    return WarmTrialProcess(self, message[2])
+                self._handle(message)
+
+    def get_returncode(self, pid: int):
+        """Returns the exit code of the trial, or None if it is still running."""
+        with self._lock:
+            try:
+                while self._connection.poll():
+                    self._handle(self._receive())
+            except EOFError:
+                # Warm parent is gone and so are the trials it forked
+                return self._returncodes.get(pid, -signal.SIGKILL)
+            return self._returncodes.get(pid)
+
+    def close(self):
+        """Stops the warm parent once every trial it forked has exited."""
+        self._connection.close()
+        self._process.wait()
+
+    def _receive(self):
+        try:
+            return self._connection.recv()
+        except EOFError:
+            raise RuntimeError("Warm parent exited unexpectedly")
+
+    def _handle(self, message):
+        if message[0] == "exited":
+            self._returncodes[message[1]] = message[2]
+
+
+def _import_script(script_path: str):
+    """Imports the training script as a module, without running its `if __name__ == "__main__"` block."""
+    module_name = os.path.splitext(os.path.basename(script_path))[0]
+    # Script can import modules placed next to it, as if it was run directly
+    sys.path.insert(0, os.path.dirname(script_path))
+    spec = importlib.util.spec_from_file_location(module_name, script_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _run_trial(connection, wakeup_fds, entry, kwargs: dict, argv: list, env: dict):
+    """Runs the trial in the forked process and exits it. Never returns."""
+    connection.close()
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    for fd in wakeup_fds:
+        os.close(fd)
+    os.environ.update(env)
+    sys.argv = argv
+    # Forked trials would otherwise share the state of the random number generators of the warm parent
+    random.seed()
+    if "numpy" in sys.modules:
+        sys.modules["numpy"].random.seed()
+
+    exit_code = 0
+    try:
+        entry(**kwargs)
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else int(e.code is not None)
+    except BaseException:
+        traceback.print_exc()
+        exit_code = 1
+    finally:
+        # Loggers are closed by their exit handlers, which os._exit would skip
+        atexit._run_exitfuncs()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(exit_code)
+
+
+def _serve(script_path: str, entry_function: str):
+    """Main loop of the warm parent: imports the script once, then forks a trial whenever the sweep asks for it."""
+    connection = Connection(int(os.environ.pop(CONNECTION_FD_ENV_VAR)))
+    try:
+        entry = getattr(_import_script(script_path), entry_function)
+    except BaseException:
+        connection.send(("error", traceback.format_exc()))
+        return
+    connection.send(("ready", ))
+
+    # Exit of a trial wakes the loop up through the pipe, so its exit code is sent to the sweep right away
+    wakeup_fds = os.pipe()
+    for fd in wakeup_fds:
+        os.set_blocking(fd, False)
+    signal.signal(signal.SIGCHLD, lambda signal_number, frame: None)
+    signal.set_wakeup_fd(wakeup_fds[1])
+
+    running_trials = set()
+    try:
+        while True:
+            ready = wait([connection, wakeup_fds[0]], timeout=1.0)
+            if wakeup_fds[0] in ready:
+                os.read(wakeup_fds[0], 4096)
+            if connection in ready:
+                _, trial_id, kwargs, argv, env = connection.recv()
+                # Anything buffered before the fork would be printed by every trial
+                sys.stdout.flush()
+                sys.stderr.flush()
+                pid = os.fork()
+                if pid == 0:
+                    _run_trial(connection, wakeup_fds, entry, kwargs, argv, env)
+                running_trials.add(pid)
+                connection.send(("started", trial_id, pid))
+
+            for pid in list(running_trials):
+                reaped_pid, status = os.waitpid(pid, os.WNOHANG)
+                if reaped_pid != 0:
+                    running_trials.remove(pid)
+                    connection.send(("exited", pid, os.waitstatus_to_exitcode(status)))
+    except (EOFError, OSError):
+        # Sweep has finished or is gone
+        pass
+
+    for pid in running_trials:
+        os.waitpid(pid, 0)
+
+
+if __name__ == "__main__":
+    _serve(sys.argv[1], sys.argv[2])
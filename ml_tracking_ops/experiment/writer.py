@@ -0,0 +1,171 @@
+import time
+import threading
+
+from collections import deque
+
+
+class EventQueue:
+    """Bounded FIFO queue which hands logged events from the training thread to the background writer.
+
+    Appending to the queue never takes a lock unless the queue is full.
+    What happens when the queue is full is decided by the backpressure policy:
+        block: Caller waits until the writer frees some space
+        drop_oldest: Oldest queued event is discarded in favor of the new one
+        sample: Only every @sample_every-th overflowing event is kept (replacing the oldest one)
+    """
+
+    BACKPRESSURE_POLICIES = ("block", "drop_oldest", "sample")
+
+    def __init__(self, capacity: int, backpressure: str = "block", sample_every: int = 10):
+        """Initializes the module.
+
+        Arguments:
+            capacity: Maximum number of events waiting to be written
+            backpressure: Policy applied when the queue is full
+            sample_every: Sampling period for overflowing events when using the "sample" policy
+        """
+        assert backpressure in self.BACKPRESSURE_POLICIES, \
+            f"Invalid backpressure policy. Expected one of {self.BACKPRESSURE_POLICIES} but received {backpressure}"
+        self._events = deque()
+        self._capacity = capacity
+        self._backpressure = backpressure
+        self._sample_every = sample_every
+        self._overflow_cnt = 0
+        self._space_available = threading.Condition()
+        # Set when the queue gets full so that the writer drains it without waiting for the next poll
+        self.full = threading.Event()
+        self.dropped_events = 0
+        # Exception which stopped the writer. Once set, the queue is dead and adding to it raises
+        self.error = None
+
+    def __len__(self):
+        return len(self._events)
+
+    def put(self, event):
+        """Adds the event to the end of the queue, applying the backpressure policy if the queue is full.
+
+        Raises:
+            RuntimeError: If the writer failed, so the event would never be written
+        """
+        if self.error is not None:
+            raise RuntimeError("Background writer of the logger failed") from self.error
+        if len(self._events) >= self._capacity:
+            self.full.set()
+            if self._backpressure == "block":
+                with self._space_available:
+                    while len(self._events) >= self._capacity and self.error is None:
+                        self._space_available.wait(timeout=0.1)
+                if self.error is not None:
+                    raise RuntimeError("Background writer of the logger failed") from self.error
+            elif self._backpressure == "drop_oldest":
+                self._discard_oldest()
+            else:
+                self._overflow_cnt += 1
+                if self._overflow_cnt % self._sample_every:
+                    self.dropped_events += 1
+                    return
+                self._discard_oldest()
+        self._events.append(event)
+
+    def drain(self):
+        """Removes and returns all events currently present in the queue."""
+        self.full.clear()
+        events = []
+        pop_event = self._events.popleft
+        try:
+            for _ in range(len(self._events)):
+                events.append(pop_event())
+        except IndexError:
+            pass
+
+        if self._backpressure == "block" and events:
+            with self._space_available:
+                self._space_available.notify_all()
+        return events
+
+    def fail(self, error: BaseException):
+        """Marks the queue as dead after the writer failed, releasing the callers which wait for space."""
+        self.error = error
+        with self._space_available:
+            self._space_available.notify_all()
+
+    def _discard_oldest(self):
+        """Discards the oldest event in the queue."""
+        try:
+            self._events.popleft()
+            self.dropped_events += 1
+        except IndexError:
+            pass
+
+
+class BackgroundWriter(threading.Thread):
+    """Long-lived thread which drains the event queue and flushes the drained events.
+
+    Events are handed over to @write_event one by one (which coalesces them per metric),
+    while @flush_all is called whenever more than @flush_interval seconds passed since the last flush.
+    """
+
+    def __init__(self, event_queue: EventQueue, write_event, flush_all, flush_interval: float,
+                 poll_interval: float = 0.01, lock=None):
+        """Initializes the module.
+
+        Arguments:
+            event_queue: Queue filled by the training thread
+            write_event: Callback which receives each drained event
+            flush_all: Callback which writes all of the coalesced events to the log file
+            flush_interval: Maximum number of seconds an event can wait before being flushed
+            poll_interval: Number of seconds between two consecutive queue drains
+            lock: Lock held while the drained events are handed over, which guards the state @write_event mutates
+        """
+        super().__init__(name="ExperimentLoggerWriter", daemon=True)
+        self._event_queue = event_queue
+        self._write_event = write_event
+        self._flush_all = flush_all
+        self._flush_interval = flush_interval
+        self._poll_interval = min(poll_interval, flush_interval)
+        self._stopped = False
+        self._lock = lock if lock is not None else threading.Lock()
+
+    def run(self):
+        """Drains the queue until the writer is stopped.
+
+        If writing fails (e.g. the disk is full), the error is recorded on the queue and the writer stops,
+        so the callers get the error instead of waiting for a writer which is gone.
+        """
+        try:
+            last_flush = time.monotonic()
+            while not self._stopped:
+                self._event_queue.full.wait(self._poll_interval)
+                self._drain()
+                if time.monotonic() - last_flush >= self._flush_interval:
+                    self._flush_all()
+                    last_flush = time.monotonic()
+
+            # Make sure that nothing gets lost when the logger is closed
+            self._drain()
+            self._flush_all()
+        except BaseException as e:
+            self._event_queue.fail(e)
+
+    def stop(self):
+        """Stops the writer and waits until every queued event is written.
+
+        Raises:
+            RuntimeError: If the writer failed, in which case some of the events weren't written
+        """
+        self._stopped = True
+        self._event_queue.full.set()
+        if self.is_alive():
+            self.join()
+        if self._event_queue.error is not None:
+            raise RuntimeError("Background writer of the logger failed") from self._event_queue.error
+
+    def _drain(self):
+        """Hands over every queued event to the @write_event callback."""
+        events = self._event_queue.drain()
+        if not events:
+            return
+        # Lock is taken once per drain rather than once per event
+        with self._lock:
+            for event in events:
+                self._write_event(*event)
@@ -1,52 +1,138 @@
 import os
+import sys
 import json
 from argparse import ArgumentParser
 
-from ml_tracking_ops.ml_tracking_ops import app
-from ml_tracking_ops.experiment.experiment_tracking import HyperparameterSweep
-from ml_tracking_ops.experiment.utils import get_hyperparameter_samplers
+# Web app, sweep and compaction modules are imported by the command which uses them,
+# so the CLI starts without importing Flask or NumPy
 
 
 def collect_arguments():
     default_logdir = "runs"
     parser = ArgumentParser()
+    parser.add_argument("command", nargs="?", choices=["compact"], default=None,
+        help="compact: Rewrite the runs older than --older_than_days into rollup tiers and exit."
+    )
     parser.add_argument("--run_sweep", type=bool, default=False,
         help="\nTrue: Starting the hyperparameter search experiment. \nFalse: Start the experiment visualization tool."
     )
     parser.add_argument("--logdir", type=str, default=default_logdir)
+    parser.add_argument("--resume", type=str, default=None,
+        help="Directory of an interrupted hyperparameter sweep which should be continued."
+    )
+    parser.add_argument("--index_memory_mb", type=int, default=512,
+        help="Maximum amount of memory taken by decoded logs cached by the visualization tool."
+    )
+    parser.add_argument("--workers", type=int, default=None,
+        help="Number of workers which load logs in parallel in the visualization tool. Defaults to the number of CPUs."
+    )
+    parser.add_argument("--instrument", action="store_true",
+        help="Record the timings of the requests of the visualization tool and expose them on the /_metrics endpoint."
+    )
+    parser.add_argument("--compress", action="store_true",
+        help="Compress the responses of the visualization tool with gzip, for browsers which accept it."
+    )
+    parser.add_argument("--older_than_days", type=float, default=30,
+        help="Runs whose log files weren't modified for this many days are compacted."
+    )
+    parser.add_argument("--rollup_steps", type=int, default=100,
+        help="Number of steps per bucket of the rollup of a compacted run."
+    )
+    parser.add_argument("--keep_best", type=int, default=1,
+        help="Number of the best trials of each sweep which keep the full resolution when compacting."
+    )
+    parser.add_argument("--dry_run", action="store_true",
+        help="Report how much compaction would save without rewriting any log file."
+    )
+    parser.add_argument("--compact_every_hours", type=float, default=None,
+        help="Compact the logdir periodically in the background while the visualization tool is running."
+    )
     cfg = parser.parse_args()
     return cfg
 
 
+def compact(cfg):
+    from ml_tracking_ops.ml_tracking_ops.compaction import compact_logdir
+
+    report = compact_logdir(cfg.logdir, cfg.older_than_days, cfg.rollup_steps, cfg.keep_best, cfg.dry_run)
+    for entry in report["compacted"]:
+        print(f"{entry['path']}: {entry['bytes_before']} -> {entry['bytes_after']} bytes")
+    for entry in report["failed"]:
+        print(f"{entry['path']}: compaction failed with {entry['error']}", file=sys.stderr)
+    action = "Would compact" if cfg.dry_run else "Compacted"
+    print(f"{action} {len(report['compacted'])} log files from {report['bytes_before']} to {report['bytes_after']} bytes, "
+          f"{report['kept_best_trials']} best trials kept the full resolution")
+
+
 def run_experiment(cfg):
-    try:
-        experiment_cfg_path = os.path.join(os.getcwd(), "experiment_cfg.json")
-        with open(experiment_cfg_path, "r") as f:
-            experiment_cfg = json.load(f)
-    except:
-        raise Exception("Module experiment_config does not contain a hyperparameter sweep definition.")
+    from ml_tracking_ops.experiment.experiment_tracking import HyperparameterSweep
+    from ml_tracking_ops.experiment.journal import TrialJournal
+    from ml_tracking_ops.experiment.utils import get_hyperparameter_samplers, get_trial_scheduler
+
+    if cfg.resume:
+        # Sweep definition was recorded in the trial journal when the sweep was started
+        experiment_cfg = TrialJournal(cfg.resume).read()[0]["definition"]
+        assert experiment_cfg, f"Sweep {cfg.resume} can't be resumed since its definition wasn't recorded."
+    else:
+        try:
+            experiment_cfg_path = os.path.join(os.getcwd(), "experiment_cfg.json")
+            with open(experiment_cfg_path, "r") as f:
+                experiment_cfg = json.load(f)
+        except:
+            raise Exception("Module experiment_config does not contain a hyperparameter sweep definition.")
 
     # Extract the hyperparameter sweep description
     main_script = experiment_cfg["main_script_name"]
     hyperparameters = experiment_cfg["hyperparameters"]
     hyperparameter_samplers = get_hyperparameter_samplers(hyperparameters)
 
+    # Trial schedulers use the optimization metric even if the patience based early stopping is disabled
+    scheduler = None
+    monitor_metric = experiment_cfg["early_stopping"]
+    if "scheduler" in experiment_cfg:
+        scheduler = get_trial_scheduler(experiment_cfg["scheduler"], experiment_cfg["optimization_goal"])
+        monitor_metric = True
+
     sweep = HyperparameterSweep(
         script_name=main_script,
         hyperparameters=hyperparameter_samplers,
         max_runs=experiment_cfg["max_runs"],
         logdir=cfg.logdir,
-        optimization_metric=experiment_cfg["optimization_metric"] if experiment_cfg["early_stopping"] else None,
-        optimization_goal=experiment_cfg["optimization_goal"] if experiment_cfg["early_stopping"] else None,
-        patience= experiment_cfg["early_stopping_patience"] if experiment_cfg["early_stopping"] else None
+        optimization_metric=experiment_cfg["optimization_metric"] if monitor_metric else None,
+        optimization_goal=experiment_cfg["optimization_goal"] if monitor_metric else None,
+        patience= experiment_cfg["early_stopping_patience"] if experiment_cfg["early_stopping"] else None,
+        early_stopping_eval_every=experiment_cfg.get("early_stopping_eval_every", 1),
+        max_parallel_runs=experiment_cfg.get("max_parallel_runs", 1),
+        pin_cpus=experiment_cfg.get("pin_cpus", False),
+        worker_env=experiment_cfg.get("worker_env"),
+        entry_function=experiment_cfg.get("entry_function"),
+        scheduler=scheduler,
+        seed=experiment_cfg.get("seed"),
+        definition=experiment_cfg,
+        resume_dir=cfg.resume,
+        final_metric=experiment_cfg.get("optimization_metric")
     )
     sweep.run()
 
 
 def main():
     cfg = collect_arguments()
-    if cfg.run_sweep:
+    if cfg.command == "compact":
+        compact(cfg)
+    elif cfg.run_sweep or cfg.resume:
         run_experiment(cfg)
     else:
+        from ml_tracking_ops.ml_tracking_ops import app
+        from ml_tracking_ops.ml_tracking_ops.compaction import start_compaction_policy
+
         app.config["logdir"] = cfg.logdir
+        app.config["INDEX_MEMORY_CAP_MB"] = cfg.index_memory_mb
+        app.config["INDEX_WORKERS"] = cfg.workers
+        app.config["INSTRUMENT"] = cfg.instrument
+        app.config["COMPRESS_RESPONSES"] = cfg.compress
+        if cfg.compact_every_hours:
+            start_compaction_policy(
+                cfg.logdir, cfg.compact_every_hours * 3600, older_than_days=cfg.older_than_days,
+                bucket_steps=cfg.rollup_steps, keep_best=cfg.keep_best
+            )
         app.run(debug=False)
@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+
+class RunCatalog:
+    """Catalog of the trials of the sweeps, queried with filtering, sorting and pagination done by SQLite.
+
+    Sampled hyperparameters and the summary of each metric of every trial are kept in indexed tables,
+    so a page of trials such as "top 20 trials by the best Accuracy where batch_size = 64" is selected
+    without summarizing nor sending the other trials. Trials are brought up to date lazily, when their sweep
+    is queried, and only the trials whose log files changed since the last update are summarized again.
+    """
+
+    CATALOG_FILE_NAME = "catalog.db"
+    # Minimum number of seconds between two updates of the trials of the same sweep
+    SYNC_INTERVAL = 1.0
+    # Comparison operators of the filters
+    OPERATORS = {"eq": "=", "ne": "!=", "lt": "<", "le": "<=", "gt": ">", "ge": ">="}
+    # Statistics of a metric by which trials can be filtered and sorted
+    METRIC_STATS = ("count", "min", "max", "last", "last_step", "best", "best_step", "wall_time")
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 1000
+
+    def __init__(self, catalog_dir: str = None):
+        """Initializes the module.
+
+        Arguments:
+            catalog_dir: Directory in which the catalog is persisted. If None, the catalog is kept in memory
+        """
+        if catalog_dir is not None:
+            os.makedirs(catalog_dir, exist_ok=True)
+        db_path = os.path.join(catalog_dir, self.CATALOG_FILE_NAME) if catalog_dir is not None else ":memory:"
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        # Sweep id -> time of the last update of its trials
+        self._synced = {}
+        with self._db:
+            self._db.executescript(
+                "CREATE TABLE IF NOT EXISTS trials ("
+                "sweep TEXT, trial_index INTEGER, run_id TEXT, version TEXT, wall_time REAL, summary TEXT, "
+                "hyperparameters TEXT, PRIMARY KEY (sweep, trial_index));"
+                "CREATE TABLE IF NOT EXISTS hyperparameters ("
+                "sweep TEXT, trial_index INTEGER, name TEXT, value_num REAL, value_text TEXT, "
+                "PRIMARY KEY (sweep, trial_index, name));"
+                "CREATE INDEX IF NOT EXISTS hyperparameters_num ON hyperparameters (sweep, name, value_num);"
+                "CREATE INDEX IF NOT EXISTS hyperparameters_text ON hyperparameters (sweep, name, value_text);"
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                "sweep TEXT, trial_index INTEGER, metric TEXT, count INTEGER, min REAL, max REAL, last REAL, "
+                "last_step INTEGER, best REAL, best_step INTEGER, wall_time REAL, "
+                "PRIMARY KEY (sweep, trial_index, metric));"
+                + "".join(
+                    f"CREATE INDEX IF NOT EXISTS summaries_{stat} ON summaries (sweep, metric, {stat});"
+                        for stat in ("best", "last", "min", "max")
+                )
+            )
+
+    def sync_sweep(self, sweep_id: str, sampled_hyperparameters: list, trial_log_paths: list, run_index,
+                   goals: dict = None, force: bool = False):
+        """Brings the trials of the sweep up to date.
+
+        Arguments:
+            sweep_id: Name of the sweep directory
+            sampled_hyperparameters: Sampled hyperparameters of each trial, ordered by the trial id
+            trial_log_paths: Log file of each trial, ordered by the trial id
+            run_index: Index of the runs which summarizes the trials
+            goals: Metric names along with their according goal ("min" or "max")
+            force: If True, the trials are updated even if they were updated less than SYNC_INTERVAL seconds ago
+        """
+        with self._lock:
+            if not force and time.time() - self._synced.get(sweep_id, 0) < self.SYNC_INTERVAL:
+                return
+            versions = dict(self._db.execute("SELECT trial_index, version FROM trials WHERE sweep = ?", (sweep_id, )))
+            trials = list(zip(sampled_hyperparameters, trial_log_paths))
+            with self._db:
+                for trial_index, (hyperparameters, log_file_path) in enumerate(trials):
+                    # Trial which was just started might not have created its log file yet
+                    exists = os.path.exists(log_file_path)
+                    version = json.dumps(run_index.get_run_version(log_file_path)) if exists else None
+                    if trial_index in versions and versions[trial_index] == version:
+                        continue
+                    run_summary = run_index.get_run_summary(log_file_path, goals) if exists else {}
+                    run_id = f"{sweep_id}:{os.path.splitext(os.path.basename(log_file_path))[0]}"
+                    self._store_trial(sweep_id, trial_index, run_id, version, hyperparameters, run_summary)
+                # Any other trials belong to a removed sweep which had the same name
+                for table in ("trials", "hyperparameters", "summaries"):
+                    self._db.execute(f"DELETE FROM {table} WHERE sweep = ? AND trial_index >= ?", (sweep_id, len(trials)))
+            self._synced[sweep_id] = time.time()
+
+    def query_trials(self, sweep_id: str, filters: list = None, sort: str = None, limit: int = None, offset: int = 0):
+        """Selects a page of the trials of the sweep.
+
+        Fields are "trial", "wall_time", "hp.<hyperparameter name>" and "metric.<metric name>.<statistic>",
+        where the statistic is one of METRIC_STATS.
+
+        Arguments:
+            sweep_id: Name of the sweep directory
+            filters: List of (field, operator, value) conditions which the trials must satisfy,
+                where the operator is one of OPERATORS. Numeric values are compared as numbers, others as text
+            sort: Field by which the trials are sorted, in descending order if prefixed with "-".
+                Trials without the field come last. Defaults to the order of the trial ids
+            limit: Maximum number of returned trials
+            offset: Number of matching trials which are skipped
+
+        Returns:
+            Dictionary with the number of matching trials and the page of trials, each with its index,
+            run id, sampled hyperparameters and summary
+
+        Raises:
+            ValueError: If a field, a metric statistic or an operator is invalid
+        """
+        limit = min(self.DEFAULT_LIMIT if limit is None else max(limit, 0), self.MAX_LIMIT)
+        conditions = ["t.sweep = ?"]
+        condition_args = [sweep_id]
+        for field, operator, value in filters or []:
+            # Operator is placed into the SQL, so it is checked even when asserts are disabled
+            if operator not in self.OPERATORS:
+                raise ValueError(f"Invalid operator. Expected one of {list(self.OPERATORS)} but received {operator}")
+            condition, args = self._compare(field, self.OPERATORS[operator], value)
+            conditions.append(condition)
+            condition_args += args
+
+        join, join_args, order = "", [], "t.trial_index"
+        if sort:
+            descending = sort.startswith("-")
+            join, join_args, sort_column = self._sort_column(sort.lstrip("-"))
+            order = f"{sort_column} IS NULL, {sort_column} {'DESC' if descending else 'ASC'}, t.trial_index"
+
+        where = " AND ".join(conditions)
+        with self._lock:
+            total = self._db.execute(f"SELECT COUNT(*) FROM trials t WHERE {where}", condition_args).fetchone()[0]
+            rows = self._db.execute(
+                f"SELECT t.trial_index, t.run_id, t.hyperparameters, t.summary FROM trials t {join} "
+                f"WHERE {where} ORDER BY {order} LIMIT ? OFFSET ?",
+                join_args + condition_args + [limit, max(offset, 0)]
+            ).fetchall()
+        return {
+            "total": total,
+            "trials": [
+                {
+                    "trial_index": trial_index,
+                    "run_id": run_id,
+                    "hyperparameters": json.loads(hyperparameters),
+                    "summary": json.loads(summary)
+                } for trial_index, run_id, hyperparameters, summary in rows
+            ]
+        }
+
+    def _store_trial(self, sweep_id: str, trial_index: int, run_id: str, version: str, hyperparameters: dict,
+                     run_summary: dict):
+        key = (sweep_id, trial_index)
+        self._db.execute(
+            "INSERT OR REPLACE INTO trials VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (*key, run_id, version, run_summary.get("wall_time"), json.dumps(run_summary), json.dumps(hyperparameters))
+        )
+        self._db.execute("DELETE FROM hyperparameters WHERE sweep = ? AND trial_index = ?", key)
+        self._db.executemany(
+            "INSERT INTO hyperparameters VALUES (?, ?, ?, ?, ?)",
+            [(*key, name, *self._split_value(value)) for name, value in hyperparameters.items()]
+        )
+        self._db.execute("DELETE FROM summaries WHERE sweep = ? AND trial_index = ?", key)
+        self._db.executemany(
+            "INSERT INTO summaries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (*key, metric_name, *(summary.get(stat) for stat in self.METRIC_STATS))
+                    for metric_name, summary in run_summary.get("metrics", {}).items()
+            ]
+        )
+
+    @staticmethod
+    def _split_value(value):
+        """Splits the hyperparameter value into its numeric and its text form, only one of which is set."""
+        if isinstance(value, (int, float)):
+            return float(value), None
+        return None, value if isinstance(value, str) else json.dumps(value)
+
+    def _parse_field(self, field: str):
+        """Parses the field into its kind ("trial", "wall_time", "hp" or "metric"), name and metric statistic."""
+        if field in ("trial", "wall_time"):
+            return field, None, None
+        kind, _, rest = field.partition(".")
+        if kind == "hp" and rest:
+            return kind, rest, None
+        if kind == "metric":
+            metric_name, _, stat = rest.rpartition(".")
+            # Statistic is placed into the SQL, so it is checked even when asserts are disabled
+            if stat not in self.METRIC_STATS:
+                raise ValueError(
+                    f"Invalid metric statistic. Expected one of {list(self.METRIC_STATS)} but received {stat}"
+                )
+            return kind, metric_name, stat
+        raise ValueError(f"Invalid field {field}")
+
+    def _compare(self, field: str, operator: str, value: str):
+        """Creates the SQL condition which compares the field of a trial with the value."""
+        kind, name, stat = self._parse_field(field)
+        try:
+            value, value_column = float(value), "value_num"
+        except ValueError:
+            value_column = "value_text"
+        if kind == "trial":
+            return f"t.trial_index {operator} ?", [value]
+        if kind == "wall_time":
+            return f"t.wall_time {operator} ?", [value]
+        if kind == "hp":
+            return (
+                "EXISTS (SELECT 1 FROM hyperparameters h WHERE h.sweep = t.sweep AND h.trial_index = t.trial_index "
+                f"AND h.name = ? AND h.{value_column} {operator} ?)", [name, value]
+            )
+        return (
+            "EXISTS (SELECT 1 FROM summaries s WHERE s.sweep = t.sweep AND s.trial_index = t.trial_index "
+            f"AND s.metric = ? AND s.{stat} {operator} ?)", [name, value]
+        )
+
+    def _sort_column(self, field: str):
+        """Creates the SQL join which brings the field in, along with the column by which the trials are sorted."""
+        kind, name, stat = self._parse_field(field)
+        if kind == "trial":
+            return "", [], "t.trial_index"
+        if kind == "wall_time":
+            return "", [], "t.wall_time"
+        if kind == "hp":
+            return (
+                "LEFT JOIN hyperparameters o ON o.sweep = t.sweep AND o.trial_index = t.trial_index AND o.name = ?",
+                [name], "COALESCE(o.value_num, o.value_text)"
+            )
+        return (
+            "LEFT JOIN summaries o ON o.sweep = t.sweep AND o.trial_index = t.trial_index AND o.metric = ?",
+            [name], f"o.{stat}"
+        )
@@ -0,0 +1,310 @@
+import os
+import sys
+import json
+import time
+import traceback
+
+from array import array
+
+from ml_tracking_ops.experiment.log_format import FILE_HEADER, SEGMENT_HEADER, KIND_SCALARS, KIND_ROLLUP, \
+    ROLLUP_TYPECODES, encode_file_header, encode_rollup_segment, decode_scalar_payload, decode_rollup_payload, \
+    is_segment_log, iter_segments
+from ml_tracking_ops.experiment.utils import RepeatingTimer
+from ml_tracking_ops.ml_tracking_ops.index import RunIndex
+from ml_tracking_ops.ml_tracking_ops.utils import load_experiment_columns, get_sweep_trials
+
+
+# Suffix of the file into which a log file is compacted before it replaces the log file
+COMPACTION_TMP_SUFFIX = ".compact.tmp"
+
+
+def rollup_series(steps, values, times):
+    """Turns a series into a rollup in which every point is a bucket of its own."""
+    import numpy as np
+
+    steps = np.asarray(steps, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    return (
+        steps, steps, steps, np.ones(len(steps), dtype=np.int64),
+        values, values, values, values, np.asarray(times, dtype=np.float64)
+    )
+
+
+def coarsen_rollup(rollup: tuple, bucket_steps: int):
+    """Merges the buckets of the rollup which fall into the same bucket of @bucket_steps steps.
+
+    Buckets are assigned by the step of their last value. Minimum and maximum keep the step at which they occurred,
+    the mean is weighted by the number of points and NaN values are ignored by it (buckets which held NaN values
+    are weighted by all of their points when coarsened again, since the number of NaN values isn't kept).
+
+    Arguments:
+        rollup: Tuple of rollup columns as described in log_format.encode_rollup_segment
+        bucket_steps: Number of steps per bucket
+
+    Returns:
+        Tuple of rollup columns, as NumPy arrays, ordered by step
+    """
+    import numpy as np
+
+    order = np.argsort(rollup[2], kind="stable")
+    min_steps, max_steps, last_steps, counts, minimums, maximums, means, last_values, times = (
+        np.asarray(column)[order] for column in rollup
+    )
+    if len(last_steps) == 0:
+        return min_steps, max_steps, last_steps, counts, minimums, maximums, means, last_values, times
+
+    keys = last_steps // bucket_steps
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    ends = np.concatenate((starts[1:], [len(keys)])) - 1
+    groups = np.repeat(np.arange(len(starts)), ends - starts + 1)
+    # Sorting by the value within each group puts the extreme at the start of the group, NaN values sort last
+    min_idx = np.lexsort((minimums, groups))[starts]
+    max_idx = np.lexsort((-maximums, groups))[starts]
+
+    valid = ~np.isnan(means)
+    weights = np.add.reduceat(np.where(valid, counts, 0), starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        bucket_means = np.add.reduceat(np.where(valid, means * counts, 0.0), starts) / weights
+    return (
+        min_steps[min_idx], max_steps[max_idx], last_steps[ends], np.add.reduceat(counts, starts),
+        minimums[min_idx], maximums[max_idx], bucket_means, last_values[ends], times[ends]
+    )
+
+
+def _to_arrays(rollup: tuple):
+    """Converts the NumPy rollup columns into arrays with typecodes ROLLUP_TYPECODES."""
+    columns = []
+    for column, typecode in zip(rollup, ROLLUP_TYPECODES):
+        converted = array(typecode)
+        converted.frombytes(column.astype("<i8" if typecode == "q" else "<f8").tobytes())
+        columns.append(converted)
+    return tuple(columns)
+
+
+def _read_log_file(log_file_path: str):
+    """Reads the series and the rollups of each metric of the log file.
+
+    Returns:
+        Tuple of (metric name -> [list of series, list of (bucket steps, rollup)], encoded segments of other kinds)
+    """
+    metrics = {}
+    other_segments = []
+    if not is_segment_log(log_file_path):
+        for metric_name, columns in load_experiment_columns(log_file_path).items():
+            metrics[metric_name] = [[columns], []]
+        return metrics, other_segments
+
+    with open(log_file_path, "rb") as f:
+        f.seek(FILE_HEADER.size)
+        for kind, codec, metric_name, num_points, payload in iter_segments(f):
+            if kind == KIND_SCALARS:
+                metrics.setdefault(metric_name, [[], []])[0].append(decode_scalar_payload(payload, num_points, codec))
+            elif kind == KIND_ROLLUP:
+                metrics.setdefault(metric_name, [[], []])[1].append(decode_rollup_payload(payload, num_points))
+            else:
+                name_bytes = metric_name.encode("utf-8")
+                other_segments.append(
+                    SEGMENT_HEADER.pack(kind, codec, len(name_bytes), num_points, len(payload)) + name_bytes + payload
+                )
+    return metrics, other_segments
+
+
+def compact_log_file(log_file_path: str, bucket_steps: int, dry_run: bool = False):
+    """Rewrites the log file into a rollup tier of @bucket_steps steps per bucket.
+
+    Each metric keeps the minimum, the maximum, the mean and the last value of every bucket, so the shape of its curve
+    is kept, while segments which don't hold scalars are kept as they are. Metrics which are already rolled up
+    into coarser buckets keep their buckets. The compacted log is written into a temporary file next to the log file,
+    which then replaces the log file atomically, so readers see either the old or the new log file.
+    The log file is left untouched if it changed while being compacted, or if compacting it wouldn't make it smaller.
+
+    Returns:
+        Tuple of (size of the log file before, size after) in bytes, or None if the log file wasn't compacted
+    """
+    import numpy as np
+
+    stat = os.stat(log_file_path)
+    metrics, other_segments = _read_log_file(log_file_path)
+    # Log file which only holds rollups at least as coarse as the requested ones is already compacted
+    if all(not series and all(steps >= bucket_steps for steps, _ in rollups) for series, rollups in metrics.values()):
+        return None
+
+    segments = []
+    for metric_name, (series, rollups) in metrics.items():
+        parts = [rollup_series(*(np.frombuffer(column, dtype=column.typecode) for column in columns)) for columns in series]
+        parts += [tuple(np.frombuffer(column, dtype=column.typecode) for column in rollup) for _, rollup in rollups]
+        metric_bucket_steps = max([bucket_steps] + [steps for steps, _ in rollups])
+        rollup = coarsen_rollup(tuple(np.concatenate(columns) for columns in zip(*parts)), metric_bucket_steps)
+        segments.append(encode_rollup_segment(metric_name, metric_bucket_steps, _to_arrays(rollup)))
+    compacted_size = FILE_HEADER.size + sum(len(segment) for segment in segments + other_segments)
+    if compacted_size >= stat.st_size:
+        return None
+    if dry_run:
+        return stat.st_size, compacted_size
+
+    tmp_path = log_file_path + COMPACTION_TMP_SUFFIX
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(encode_file_header())
+            for segment in segments + other_segments:
+                f.write(segment)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        # Partially written file (e.g. when the disk is full) mustn't be left next to the log file
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    current_stat = os.stat(log_file_path)
+    if (current_stat.st_size, current_stat.st_mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+        # Run was resumed in the meantime, the log file is compacted once it gets old again
+        os.remove(tmp_path)
+        return None
+    # Age of the run is kept, so the run can be moved into a coarser tier later on
+    os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(tmp_path, log_file_path)
+    return stat.st_size, compacted_size
+
+
+def _rank_trials(trial_log_paths: list, sweep_config: dict, run_index: RunIndex):
+    """Orders the trials of the sweep from the best to the worst according to the optimization metric of the sweep.
+
+    Trials which didn't log the optimization metric come last.
+    """
+    metric_name = sweep_config.get("optimization_metric", "/")
+    goal = sweep_config.get("optimization_goal", "/")
+    if metric_name == "/" or goal not in ("min", "max"):
+        return None
+    best_values = {}
+    for log_file_path in trial_log_paths:
+        metric_summary = run_index.get_run_summary(log_file_path, {metric_name: goal})["metrics"].get(metric_name, {})
+        if metric_summary.get("best") is not None:
+            best_values[log_file_path] = metric_summary["best"]
+    ranked = sorted(best_values, key=best_values.get, reverse=goal == "max")
+    return ranked + [log_file_path for log_file_path in trial_log_paths if log_file_path not in best_values]
+
+
+def select_log_files(logdir: str, run_index: RunIndex, older_than: float, keep_best: int):
+    """Selects the log files of the runs which should be compacted.
+
+    Arguments:
+        logdir: Directory which contains the experiment and sweep logs
+        run_index: Index of the runs in the logdir
+        older_than: Runs whose log files (including the shards) were last modified more than @older_than seconds ago
+            are compacted
+        keep_best: Number of the best trials of each sweep, according to its optimization metric and goal,
+            which keep the full resolution. Trials of sweeps without an optimization metric are all compacted
+
+    Returns:
+        Tuple of (paths of the log files to compact, number of runs which keep the full resolution as the best trials)
+    """
+    cutoff = time.time() - older_than
+    experiment_dirs, sweep_dirs = run_index.list_runs()
+    run_log_paths = [
+        log_file_path for experiment_dir in experiment_dirs for log_file_path in run_index.get_log_files(experiment_dir)
+    ]
+    num_kept = 0
+    for sweep_dir in sweep_dirs:
+        sweep_dir_abs = os.path.join(logdir, sweep_dir)
+        _, trial_log_paths = get_sweep_trials(sweep_dir_abs)
+        trial_log_paths = [log_file_path for log_file_path in trial_log_paths if os.path.exists(log_file_path)]
+        with open(os.path.join(sweep_dir_abs, RunIndex.SWEEP_CONFIG_FILENAME), "r") as f:
+            ranked = _rank_trials(trial_log_paths, json.load(f), run_index)
+        if ranked is not None and keep_best > 0:
+            num_kept += len(ranked[:keep_best])
+            trial_log_paths = ranked[keep_best:]
+        run_log_paths += trial_log_paths
+
+    log_file_paths = []
+    for log_file_path in run_log_paths:
+        shard_paths = run_index.get_shard_paths(log_file_path)
+        if max(os.stat(path).st_mtime for path in shard_paths) < cutoff:
+            log_file_paths += shard_paths
+    return log_file_paths, num_kept
+
+
+def compact_logdir(logdir: str, older_than_days: float = 30, bucket_steps: int = 100, keep_best: int = 1,
+                   dry_run: bool = False):
+    """Compacts the runs of the logdir which are older than @older_than_days into rollup tiers.
+
+    Compacting the logdir again with a larger @bucket_steps moves the compacted runs into a coarser tier.
+    Log files which fail to be compacted (e.g. because of a truncated segment or a missing permission) are reported
+    and skipped, so they don't prevent the compaction of the other log files.
+
+    Arguments:
+        logdir: Directory which contains the experiment and sweep logs
+        older_than_days: Minimum age of a run, measured since its log files were last modified
+        bucket_steps: Number of steps per bucket of the rollup
+        keep_best: Number of the best trials of each sweep which keep the full resolution
+        dry_run: If True, the sizes after compaction are computed, but no log file is rewritten
+
+    Returns:
+        Dictionary with the compacted log files along with their sizes before and after the compaction,
+        and the log files which failed to be compacted along with their errors
+
+    Raises:
+        ValueError: If @bucket_steps isn't positive
+    """
+    _check_bucket_steps(bucket_steps)
+    run_index = RunIndex(logdir, persist=False)
+    log_file_paths, num_kept = select_log_files(logdir, run_index, older_than_days * 24 * 3600, keep_best)
+    compacted, failed = [], []
+    for log_file_path in log_file_paths:
+        try:
+            sizes = compact_log_file(log_file_path, bucket_steps, dry_run)
+        except FileNotFoundError:
+            # Log file was removed in the meantime
+            continue
+        except Exception as e:
+            failed.append({"path": log_file_path, "error": f"{type(e).__name__}: {e}"})
+            continue
+        if sizes is not None:
+            compacted.append({"path": log_file_path, "bytes_before": sizes[0], "bytes_after": sizes[1]})
+    return {
+        "compacted": compacted,
+        "failed": failed,
+        "kept_best_trials": num_kept,
+        "bytes_before": sum(entry["bytes_before"] for entry in compacted),
+        "bytes_after": sum(entry["bytes_after"] for entry in compacted)
+    }
+
+
+def start_compaction_policy(logdir: str, interval: float, **compaction_settings):
+    """Compacts the logdir every @interval seconds in a background thread.
+
+    Arguments:
+        logdir: Directory which contains the experiment and sweep logs
+        interval: Number of seconds between two consecutive compactions
+        compaction_settings: Keyword arguments of compact_logdir
+
+    Returns:
+        Timer which can be cancelled to stop the compactions
+
+    Raises:
+        ValueError: If the number of steps per bucket given in @compaction_settings isn't positive
+    """
+    if "bucket_steps" in compaction_settings:
+        _check_bucket_steps(compaction_settings["bucket_steps"])
+    timer = RepeatingTimer(interval, lambda: _compact_periodically(logdir, compaction_settings))
+    timer.start()
+    return timer
+
+
+def _compact_periodically(logdir: str, compaction_settings: dict):
+    """Compacts the logdir on the timer of the compaction policy, printing the failures to stderr.
+
+    An exception would end the timer thread, which would stop the compactions for the life of the server,
+    so failures are reported and the logdir is compacted again on the next tick.
+    """
+    try:
+        report = compact_logdir(logdir, **compaction_settings)
+    except Exception:
+        traceback.print_exc()
+        return
+    for entry in report["failed"]:
+        print(f"Compaction of {entry['path']} failed: {entry['error']}", file=sys.stderr)
+
+
+def _check_bucket_steps(bucket_steps: int):
+    if bucket_steps <= 0:
+        raise ValueError(f"Number of steps per bucket must be positive, but received {bucket_steps}")
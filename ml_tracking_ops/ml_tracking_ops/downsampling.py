@@ -0,0 +1,184 @@
+import numpy as np
+
+
+DOWNSAMPLING_METHODS = ["minmax", "lttb"]
+# First and last point, and the extremes of at least one bucket
+MIN_POINTS = 4
+
+
+def select_window(steps, values, times, step_min=None, step_max=None):
+    """Selects the points logged within the [@step_min, @step_max] range of steps.
+
+    Arguments:
+        steps, values, times: Columns of a single metric
+        step_min: First step of the window. If None, the window is not bounded from below
+        step_max: Last step of the window. If None, the window is not bounded from above
+    """
+    steps = np.asarray(steps)
+    values = np.asarray(values)
+    times = np.asarray(times)
+    if step_min is None and step_max is None:
+        return steps, values, times
+
+    mask = np.ones(len(steps), dtype=bool)
+    if step_min is not None:
+        mask &= steps >= step_min
+    if step_max is not None:
+        mask &= steps <= step_max
+    return steps[mask], values[mask], times[mask]
+
+
+def min_max_indices(values, max_points: int):
+    """Selects the minimum and the maximum of each bucket of consecutive points.
+
+    Both extremes of every bucket are kept, so no peak of the series is lost.
+    Buckets are found by reshaping the (padded) values, so the whole selection is vectorized.
+
+    Returns:
+        Sorted indices of at most @max_points selected points
+    """
+    num_points = len(values)
+    if num_points <= max_points:
+        return np.arange(num_points)
+
+    # First and last point are always kept, every bucket contributes two points
+    num_buckets = max(1, (max_points - 2) // 2)
+    bucket_size = -(-num_points // num_buckets)
+    num_buckets = -(-num_points // bucket_size)
+    padding = num_buckets * bucket_size - num_points
+
+    # Padding never wins, it is placed after the last point with the worst possible value
+    buckets = np.pad(values.astype(np.float64), (0, padding), constant_values=np.inf).reshape(num_buckets, bucket_size)
+    min_indices = buckets.argmin(axis=1)
+    buckets[-1, bucket_size - padding:] = -np.inf
+    max_indices = buckets.argmax(axis=1)
+
+    offsets = np.arange(num_buckets) * bucket_size
+    indices = np.concatenate(([0], offsets + min_indices, offsets + max_indices, [num_points - 1]))
+    return np.unique(indices)
+
+
+def lttb_indices(steps, values, max_points: int):
+    """Selects points by the Largest-Triangle-Three-Buckets algorithm.
+
+    Points between the first and the last one are split into @max_points - 2 buckets.
+    From each bucket the point which forms the largest triangle with the point selected
+    from the previous bucket and the average point of the next bucket is kept.
+    Areas within a bucket are computed at once, only the buckets are visited in a loop.
+
+    Returns:
+        Sorted indices of at most @max_points selected points
+    """
+    num_points = len(values)
+    if num_points <= max_points:
+        return np.arange(num_points)
+
+    x = steps.astype(np.float64)
+    y = values.astype(np.float64)
+    edges = np.linspace(1, num_points - 1, max_points - 1).astype(np.int64)
+
+    # Average point of each bucket, the last point serves as the bucket after the last one
+    bucket_sums_x = np.add.reduceat(x[:-1], edges[:-1])
+    bucket_sums_y = np.add.reduceat(y[:-1], edges[:-1])
+    bucket_sizes = np.diff(edges)
+    averages_x = np.append(bucket_sums_x / bucket_sizes, x[-1])
+    averages_y = np.append(bucket_sums_y / bucket_sizes, y[-1])
+
+    indices = np.empty(max_points, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = num_points - 1
+    selected = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_x, next_y = averages_x[bucket + 1], averages_y[bucket + 1]
+        # Doubled area of the triangle, the constant factor doesn't change the argmax
+        areas = np.abs(
+            (x[selected] - next_x) * (y[start:end] - y[selected]) -
+            (x[selected] - x[start:end]) * (next_y - y[selected])
+        )
+        selected = start + int(areas.argmax())
+        indices[bucket + 1] = selected
+    return indices
+
+
+def downsample(steps, values, times, max_points: int, method: str = "minmax"):
+    """Reduces the columns of a single metric to at most @max_points points.
+
+    Arguments:
+        steps, values, times: Columns of a single metric
+        max_points: Maximum number of points which are kept
+        method: "minmax" keeps the extremes of each bucket, "lttb" keeps the visually most significant points
+    """
+    assert method in DOWNSAMPLING_METHODS, \
+        f"Invalid downsampling method. Expected one of {DOWNSAMPLING_METHODS} but received {method}"
+    assert max_points >= MIN_POINTS, f"At least {MIN_POINTS} points must be kept, but received {max_points}"
+    steps = np.asarray(steps)
+    values = np.asarray(values)
+    times = np.asarray(times)
+    if method == "minmax":
+        indices = min_max_indices(values, max_points)
+    else:
+        indices = lttb_indices(steps, values, max_points)
+    return steps[indices], values[indices], times[indices]
+
+
+def merge_histograms(histograms: list):
+    """Merges histograms into a single histogram which describes all of their values.
+
+    Histograms with the same bin edges are merged exactly. Otherwise the bins span all of the histograms
+    with as many bins as the finest of them has, and the counts of each histogram are spread over them
+    assuming the values are uniformly distributed within each of its bins, so merged counts can be fractional.
+
+    Arguments:
+        histograms: Histograms as read by log_format.read_metric_histograms, ordered by step
+
+    Returns:
+        Histogram with the step and the relative time of the last histogram
+    """
+    edges = [np.asarray(histogram["edges"], dtype=np.float64) for histogram in histograms]
+    counts = [np.asarray(histogram["counts"]) for histogram in histograms]
+    if all(len(histogram_edges) == len(edges[0]) and np.array_equal(histogram_edges, edges[0])
+           for histogram_edges in edges):
+        merged_edges, merged_counts = edges[0], np.sum(counts, axis=0)
+    else:
+        num_bins = max(len(histogram_edges) - 1 for histogram_edges in edges)
+        merged_edges = np.linspace(
+            min(histogram_edges[0] for histogram_edges in edges), max(histogram_edges[-1] for histogram_edges in edges),
+            num_bins + 1
+        )
+        # Cumulative counts are interpolated at the merged edges, values below the first edge are all counted at it
+        merged_counts = np.sum([
+            np.diff(np.interp(merged_edges, histogram_edges, np.concatenate(([0], np.cumsum(histogram_counts)))))
+                for histogram_edges, histogram_counts in zip(edges, counts)
+        ], axis=0)
+
+    # Histograms without finite values have no extremes
+    non_empty = [histogram for histogram in histograms if histogram["count"]]
+    return {
+        "step": histograms[-1]["step"],
+        "time": histograms[-1]["time"],
+        "count": sum(histogram["count"] for histogram in histograms),
+        "nonfinite": sum(histogram["nonfinite"] for histogram in histograms),
+        "min": min(histogram["min"] for histogram in non_empty) if non_empty else float("nan"),
+        "max": max(histogram["max"] for histogram in non_empty) if non_empty else float("nan"),
+        "sum": sum(histogram["sum"] for histogram in histograms),
+        "sum_squares": sum(histogram["sum_squares"] for histogram in histograms),
+        "edges": merged_edges,
+        "counts": merged_counts
+    }
+
+
+def downsample_histograms(histograms: list, max_steps: int):
+    """Reduces the histograms of a metric to at most @max_steps histograms.
+
+    Histograms of consecutive steps are merged, so every logged value is still counted by one of the histograms.
+
+    Arguments:
+        histograms: Histograms ordered by step
+        max_steps: Maximum number of histograms which are kept
+    """
+    assert max_steps > 0, f"At least one histogram must be kept, but received {max_steps}"
+    if len(histograms) <= max_steps:
+        return histograms
+    bounds = np.linspace(0, len(histograms), max_steps + 1).astype(np.int64)
+    return [merge_histograms(histograms[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
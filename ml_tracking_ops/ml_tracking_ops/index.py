@@ -0,0 +1,766 @@
+import io
+import os
+import json
+import time
+import atexit
+import hashlib
+import sqlite3
+import threading
+import multiprocessing
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from ml_tracking_ops.experiment.codecs import make_codec
+from ml_tracking_ops.experiment.log_format import FILE_HEADER, KIND_HISTOGRAM, encode_scalar_segment, \
+    collect_scalar_series, is_segment_log, scan_segments, get_segment_names, read_metric_series, read_metric_summary, \
+    read_metric_histograms
+from ml_tracking_ops.experiment.shards import is_shard_file, parse_shard_file
+from ml_tracking_ops.experiment.summary import summarize_run, read_run_summary, merge_run_summaries
+from ml_tracking_ops.ml_tracking_ops.downsampling import downsample, select_window, merge_histograms, \
+    downsample_histograms
+from ml_tracking_ops.ml_tracking_ops.instrumentation import phase
+from ml_tracking_ops.ml_tracking_ops.utils import load_experiment_columns, summarize_columns, \
+    summarize_metric_columns, merge_columns_by_step, merge_metric_summaries, read_column_file_header, \
+    write_column_file, map_column_file
+
+
+def index_log_file(log_file_path: str):
+    """Indexes a single log file, the unit of work fanned out by RunIndex.load_runs.
+
+    Segment logs are scanned for their directory, while legacy JSON logs are decoded as a whole.
+
+    Returns:
+        Tuple of (inode, (size, modification time), directory or None, offset after the directory or None,
+        columns of a legacy log or None)
+    """
+    stat = os.stat(log_file_path)
+    key = (stat.st_size, stat.st_mtime_ns)
+    if not is_segment_log(log_file_path):
+        return stat.st_ino, key, None, None, load_experiment_columns(log_file_path)
+    with open(log_file_path, "rb") as f:
+        f.seek(FILE_HEADER.size)
+        directory = scan_segments(f)
+        return stat.st_ino, key, directory, f.tell(), None
+
+
+class RunIndex:
+    """Cache of decoded run logs for the web app.
+
+    Metrics of segment logs are decoded lazily, one metric at a time. A directory of the segments
+    of each metric is built from the segment headers alone, so a single metric (or just its summary)
+    is read without touching the other metrics. Segment logs only ever grow while their run is in progress,
+    so the directory is extended, and only the segments appended since the last decoding are decoded.
+    Legacy JSON logs are decoded as a whole, only if their (size, modification time) changed.
+    Decoded columns are kept in memory with least-recently-used eviction under a memory cap,
+    while metric names are kept for every known log file, so listing metrics never requires decoding.
+    Runs logged by several writers are read from the log file of the run along with the shards of the other writers,
+    which are merged by step.
+    The index is persisted to a SQLite file inside of the logdir, so restarting the server starts warm.
+    Entries of segment logs, which change while their runs are in progress, are persisted in batches
+    at most every PERSIST_INTERVAL seconds rather than whenever a run is read.
+    When persisted, decoded columns of legacy logs are written into a column file per metric instead of being kept
+    in memory, and are served as read-only NumPy views of the memory-mapped file. Segment logs are already
+    column-encoded and read per metric, so their columns aren't copied into column files.
+    """
+
+    INDEX_DIR_NAME = ".ml_tracking_ops"
+    INDEX_FILE_NAME = "index.db"
+    COLUMN_DIR_NAME = "columns"
+    COLUMN_FILE_EXTENSION = ".col"
+    SWEEP_CONFIG_FILENAME = "experiment_description.json"
+    # Maximum number of downsampled series kept in memory
+    MAX_DOWNSAMPLED_SERIES = 4096
+    # Maximum number of memory-mapped series, each of which holds a file descriptor
+    MAX_MAPPED_SERIES = 1024
+    # Minimum number of seconds between two writes of the index entries of segment logs, which change while runs
+    # are in progress, so following a live run doesn't turn every request into a write transaction
+    PERSIST_INTERVAL = 30.0
+    # Codec of the persisted columns of legacy logs, which keeps the index database small
+    PERSISTED_CODEC = make_codec(delta_encoding=True, value_encoding="xor", compression="zlib")
+
+    def __init__(self, logdir: str, memory_cap: int = 512 * 2 ** 20, persist: bool = True, workers: int = None):
+        """Initializes the module.
+
+        Arguments:
+            logdir: Directory which contains the experiment and sweep logs
+            memory_cap: Maximum number of bytes taken by decoded columns kept in memory
+            persist: If True, the index is persisted to a SQLite file inside of the @logdir
+                and decoded columns of legacy logs are memory-mapped from column files next to it
+            workers: Number of workers which index log files in parallel. If None, the number of CPUs is used
+        """
+        self._logdir = logdir
+        self._workers = workers or os.cpu_count() or 1
+        # Legacy logs are decoded by processes since decoding them is CPU-bound,
+        # while segment logs are scanned by threads since scanning them is I/O-bound
+        self._process_pool = None
+        self._thread_pool = None
+        self._memory_cap = memory_cap
+        self._memory_used = 0
+        self._num_mapped = 0
+        # (log file path, metric name) -> (version, columns, number of bytes or None if mapped),
+        # in least recently used order.
+        # Version is (inode, number of decoded segments) for segment logs and (size, modification time) otherwise
+        self._columns = OrderedDict()
+        # Segment log file path -> [inode, offset right after the last scanned segment, segments of each metric]
+        self._directories = {}
+        # (segment log file path, metric name) -> ((inode, number of summarized segments), summary)
+        self._summaries = {}
+        # (segment log file path, metric name) -> ((inode, number of read segments), histograms)
+        self._histograms = {}
+        # Log file path -> (size, modification time, metric names)
+        self._metric_names = {}
+        # Path of a log file without the summary file -> (version of the run, summary of the run)
+        self._run_summaries = {}
+        # (log file path, metric name, max points, method, step window) -> (version of the run, columns)
+        self._downsampled = OrderedDict()
+        # Run directory name -> (modification time, is sweep, sorted log file names)
+        self._run_dirs = {}
+        # Directory path -> (modification time, log file name of each run -> paths of the shards of the run)
+        self._shards = {}
+        self._lock = threading.RLock()
+        # Log file path -> (size, modification time, metric names) of the segment logs which weren't persisted yet
+        self._unpersisted = {}
+        self._last_persisted = time.monotonic()
+        self._db = self._open_db() if persist else None
+        if persist:
+            atexit.register(self.flush)
+        self._column_dir = None
+        if persist:
+            self._column_dir = os.path.join(logdir, self.INDEX_DIR_NAME, self.COLUMN_DIR_NAME)
+            os.makedirs(self._column_dir, exist_ok=True)
+
+    def list_runs(self):
+        """Lists the run directories of the logdir.
+
+        Only the directories which were modified since the last listing are inspected again.
+
+        Returns:
+            Tuple of (experiment directory names, sweep directory names)
+        """
+        experiment_dirs, sweep_dirs = [], []
+        with self._lock, phase("listing"):
+            for dir_entry in os.scandir(self._logdir):
+                if dir_entry.name.startswith(".") or not dir_entry.is_dir():
+                    continue
+                mtime = dir_entry.stat().st_mtime_ns
+                cached = self._run_dirs.get(dir_entry.name)
+                if cached is None or cached[0] != mtime:
+                    is_sweep = os.path.exists(os.path.join(dir_entry.path, self.SWEEP_CONFIG_FILENAME))
+                    log_files = sorted(
+                        fname for fname in os.listdir(dir_entry.path)
+                            if fname.endswith(".dat") and not is_shard_file(fname)
+                    )
+                    cached = (mtime, is_sweep, log_files)
+                    self._run_dirs[dir_entry.name] = cached
+                (sweep_dirs if cached[1] else experiment_dirs).append(dir_entry.name)
+        return sorted(experiment_dirs), sorted(sweep_dirs)
+
+    def get_log_files(self, dir_name: str):
+        """Returns paths of the log files inside of the run directory, as of the last listing."""
+        if dir_name not in self._run_dirs:
+            self.list_runs()
+        return [os.path.join(self._logdir, dir_name, fname) for fname in self._run_dirs[dir_name][2]]
+
+    def get_columns(self, log_file_path: str):
+        """Returns decoded columns of every metric in the log file.
+
+        Returns:
+            Dictionary mapping each metric name to a tuple of (steps, values, times) arrays
+        """
+        return {
+            metric_name: self.get_metric_columns(log_file_path, metric_name)
+                for metric_name in self.get_metric_names(log_file_path)
+        }
+
+    def get_shard_paths(self, log_file_path: str):
+        """Returns the log file of the run along with the shards written next to it by the other writers of the run.
+
+        Shards are ordered by their writer id. Directory is listed again only if it was modified since the last listing.
+        """
+        log_dir, log_file_name = os.path.split(log_file_path)
+        mtime = os.stat(log_dir).st_mtime_ns
+        with self._lock:
+            cached = self._shards.get(log_dir)
+            if cached is None or cached[0] != mtime:
+                shards = {}
+                for fname in os.listdir(log_dir):
+                    if is_shard_file(fname):
+                        run_file_name, writer_id = parse_shard_file(fname)
+                        shards.setdefault(run_file_name, []).append((writer_id, os.path.join(log_dir, fname)))
+                cached = (mtime, {run_file_name: [path for _, path in sorted(run_shards)]
+                                  for run_file_name, run_shards in shards.items()})
+                self._shards[log_dir] = cached
+        return [log_file_path] + cached[1].get(log_file_name, [])
+
+    def get_metric_columns(self, log_file_path: str, metric_name: str):
+        """Returns decoded columns of a single metric of the run.
+
+        Columns of a run logged by several writers are merged by step out of the columns of each shard.
+
+        Returns:
+            Tuple of (steps, values, times) arrays
+        """
+        shard_paths = self.get_shard_paths(log_file_path)
+        if len(shard_paths) == 1:
+            return self._get_file_metric_columns(log_file_path, metric_name)
+
+        with self._lock:
+            shard_paths = [path for path in shard_paths if metric_name in self._get_file_metric_names(path)]
+            shard_columns = [self._get_file_metric_columns(path, metric_name) for path in shard_paths]
+            version = tuple((path, len(columns[0])) for path, columns in zip(shard_paths, shard_columns))
+            cache_key = (log_file_path, metric_name, "merged")
+            cached = self._columns.get(cache_key)
+            if cached is not None and cached[0] == version:
+                self._columns.move_to_end(cache_key)
+                return cached[1]
+            with phase("aggregation"):
+                columns = merge_columns_by_step(shard_columns)
+            self._cache(cache_key, version, columns)
+            return columns
+
+    def get_metric_summary(self, log_file_path: str, metric_name: str):
+        """Returns the number of points, the minimum, the maximum and the last value, and the last step of the metric.
+
+        Summaries of the shards of a run logged by several writers are merged.
+        """
+        shard_paths = self.get_shard_paths(log_file_path)
+        if len(shard_paths) == 1:
+            return self._get_file_metric_summary(log_file_path, metric_name)
+        return merge_metric_summaries([
+            self._get_file_metric_summary(path, metric_name)
+                for path in shard_paths if metric_name in self._get_file_metric_names(path)
+        ])
+
+    def get_metric_names(self, log_file_path: str):
+        """Returns names of the metrics logged in the run, by any of its writers."""
+        shard_paths = self.get_shard_paths(log_file_path)
+        if len(shard_paths) == 1:
+            return self._get_file_metric_names(log_file_path)
+        return sorted(set().union(*(self._get_file_metric_names(path) for path in shard_paths)))
+
+    def _get_file_metric_columns(self, log_file_path: str, metric_name: str):
+        """Returns decoded columns of a single metric in the log file.
+
+        Only the segments of the metric which were appended since it was last decoded are decoded.
+        A legacy JSON log is decoded as a whole whenever it changes, since it can't be read partially.
+
+        Returns:
+            Tuple of (steps, values, times) arrays
+        """
+        stat = os.stat(log_file_path)
+        cache_key = (log_file_path, metric_name)
+        with self._lock:
+            cached = self._columns.get(cache_key)
+            if not self._is_segment_log(log_file_path):
+                key = (stat.st_size, stat.st_mtime_ns)
+                if cached is not None and cached[0] == key:
+                    self._columns.move_to_end(cache_key)
+                    return cached[1]
+                columns = self._map_columns(log_file_path, metric_name, key)
+                if columns is not None:
+                    self._cache(cache_key, key, columns, mapped=True)
+                    return columns
+                # Every metric of the log is cached in turn, so a small cache might have already evicted this one
+                return self._load_legacy(log_file_path, key)[metric_name]
+
+            metric_segments = self._update_directory(log_file_path, stat)[metric_name]
+            num_segments = len(metric_segments[0])
+            version = (stat.st_ino, num_segments)
+            if cached is not None and cached[0] == version:
+                self._columns.move_to_end(cache_key)
+                return cached[1]
+            with open(log_file_path, "rb") as f, phase("decode"):
+                if cached is not None and cached[0][0] == stat.st_ino:
+                    columns = self._extend_columns(
+                        cached[1], read_metric_series(f, tuple(column[cached[0][1]:] for column in metric_segments))
+                    )
+                else:
+                    columns = read_metric_series(f, metric_segments)
+            self._cache(cache_key, version, columns)
+            return columns
+
+    def _get_file_metric_summary(self, log_file_path: str, metric_name: str):
+        """Returns the number of points, the minimum, the maximum and the last value, and the last step of the metric.
+
+        Summaries of segment logs are extended with the segments appended since the last summary,
+        reading only the values of the metric itself.
+        """
+        stat = os.stat(log_file_path)
+        cache_key = (log_file_path, metric_name)
+        with self._lock:
+            if not self._is_segment_log(log_file_path):
+                steps, values, _ = self._get_file_metric_columns(log_file_path, metric_name)
+                return summarize_columns(steps, values)
+
+            metric_segments = self._update_directory(log_file_path, stat)[metric_name]
+            num_segments = len(metric_segments[0])
+            cached = self._summaries.get(cache_key)
+            if cached is not None and cached[0] == (stat.st_ino, num_segments):
+                return cached[1]
+
+            with open(log_file_path, "rb") as f, phase("aggregation"):
+                if cached is not None and cached[0][0] == stat.st_ino:
+                    summary = read_metric_summary(
+                        f, tuple(column[cached[0][1]:] for column in metric_segments), cached[1]
+                    )
+                else:
+                    summary = read_metric_summary(f, metric_segments)
+            self._summaries[cache_key] = ((stat.st_ino, num_segments), summary)
+            return summary
+
+    def get_series(self, log_file_path: str, metric_name: str, max_points: int = None, method: str = "minmax",
+                   step_min: int = None, step_max: int = None):
+        """Returns the columns of a single metric, restricted to a window of steps and downsampled.
+
+        Downsampled series are cached per (run, metric, resolution, window), so redrawing a chart
+        doesn't touch the full series again, while a narrower window is downsampled from the full series.
+
+        Arguments:
+            log_file_path: Log file of the run
+            metric_name: Metric whose columns are retrieved
+            max_points: Maximum number of points to return. If None, every point within the window is returned
+            method: Downsampling method, "minmax" or "lttb"
+            step_min: First step of the window. If None, the window is not bounded from below
+            step_max: Last step of the window. If None, the window is not bounded from above
+
+        Returns:
+            Tuple of (steps, values, times) arrays
+        """
+        version = self.get_run_version(log_file_path)
+        series_key = (log_file_path, metric_name, max_points, method, step_min, step_max)
+        with self._lock:
+            cached = self._downsampled.get(series_key)
+            if cached is not None and cached[0] == version:
+                self._downsampled.move_to_end(series_key)
+                return cached[1]
+
+        columns = self.get_metric_columns(log_file_path, metric_name)
+        with phase("aggregation"):
+            columns = select_window(*columns, step_min, step_max)
+            if max_points is None:
+                return columns
+            columns = downsample(*columns, max_points, method)
+        with self._lock:
+            self._downsampled[series_key] = (version, columns)
+            self._downsampled.move_to_end(series_key)
+            while len(self._downsampled) > self.MAX_DOWNSAMPLED_SERIES:
+                self._downsampled.popitem(last=False)
+        return columns
+
+    def get_histogram_names(self, log_file_path: str):
+        """Returns names of the metrics of the run which were logged as histograms, by any of its writers."""
+        names = set()
+        with self._lock:
+            for path in self.get_shard_paths(log_file_path):
+                if self._is_segment_log(path):
+                    names.update(get_segment_names(self._update_directory(path, os.stat(path)), (KIND_HISTOGRAM, )))
+        return sorted(names)
+
+    def get_histograms(self, log_file_path: str, metric_name: str, max_steps: int = None, step_min: int = None,
+                       step_max: int = None):
+        """Returns the histograms of a single metric over the steps, restricted to a window of steps and downsampled.
+
+        Histograms which several writers of the run logged at the same step are merged into one.
+
+        Arguments:
+            log_file_path: Log file of the run
+            metric_name: Metric whose histograms are retrieved
+            max_steps: Maximum number of histograms to return, histograms of consecutive steps are merged
+                to fit. If None, every histogram within the window is returned
+            step_min: First step of the window. If None, the window is not bounded from below
+            step_max: Last step of the window. If None, the window is not bounded from above
+
+        Returns:
+            List of histograms as read by log_format.read_metric_histograms, ordered by step
+        """
+        histograms = []
+        for path in self.get_shard_paths(log_file_path):
+            histograms += self._get_file_histograms(path, metric_name)
+        histograms = [
+            histogram for histogram in histograms
+                if (step_min is None or histogram["step"] >= step_min) and
+                   (step_max is None or histogram["step"] <= step_max)
+        ]
+        with phase("aggregation"):
+            histograms.sort(key=lambda histogram: histogram["step"])
+            by_step = {}
+            for histogram in histograms:
+                by_step.setdefault(histogram["step"], []).append(histogram)
+            histograms = [
+                step_histograms[0] if len(step_histograms) == 1 else merge_histograms(step_histograms)
+                    for step_histograms in by_step.values()
+            ]
+            if max_steps is not None:
+                histograms = downsample_histograms(histograms, max_steps)
+        return histograms
+
+    def _get_file_histograms(self, log_file_path: str, metric_name: str):
+        """Returns the histograms of a single metric in the log file.
+
+        Only the histogram segments appended since the histograms were last read are decoded.
+        """
+        stat = os.stat(log_file_path)
+        cache_key = (log_file_path, metric_name)
+        with self._lock:
+            if not self._is_segment_log(log_file_path):
+                return []
+            metric_segments = self._update_directory(log_file_path, stat).get(metric_name)
+            if metric_segments is None:
+                return []
+            num_segments = len(metric_segments[0])
+            cached = self._histograms.get(cache_key)
+            if cached is not None and cached[0] == (stat.st_ino, num_segments):
+                return cached[1]
+
+            with open(log_file_path, "rb") as f, phase("decode"):
+                if cached is not None and cached[0][0] == stat.st_ino:
+                    histograms = cached[1] + read_metric_histograms(
+                        f, tuple(column[cached[0][1]:] for column in metric_segments)
+                    )
+                else:
+                    histograms = read_metric_histograms(f, metric_segments)
+            self._histograms[cache_key] = ((stat.st_ino, num_segments), histograms)
+            return histograms
+
+    def get_end_offset(self, log_file_path: str):
+        """Returns the offset right after the last complete segment of the segment log."""
+        with self._lock:
+            self._update_directory(log_file_path, os.stat(log_file_path))
+            return self._directories[log_file_path][1]
+
+    def _get_file_metric_names(self, log_file_path: str):
+        """Returns names of the metrics logged in the log file.
+
+        Names are read from the directory of the segment log, so no metric is decoded.
+        """
+        stat = os.stat(log_file_path)
+        key = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._metric_names.get(log_file_path)
+            if cached is not None and cached[:2] == key:
+                return cached[2]
+
+            if self._is_segment_log(log_file_path):
+                metric_names = get_segment_names(self._update_directory(log_file_path, stat))
+                self._metric_names[log_file_path] = (*key, metric_names)
+                self._persist_lazily(log_file_path, key, metric_names)
+                return metric_names
+            return sorted(self._load_legacy(log_file_path, key))
+
+    def load_runs(self, log_file_paths, with_columns: bool = False):
+        """Indexes the log files which aren't indexed yet, fanning the work out across the worker pools.
+
+        Results are merged into the index as soon as each of them is ready. Log files which were already indexed
+        are only updated incrementally when they are accessed, which is cheap, so they aren't fanned out.
+
+        Arguments:
+            log_file_paths: Log files to index
+            with_columns: If True, legacy logs whose columns were evicted from the memory cache are decoded again
+        """
+        pending = []
+        log_file_paths = [path for log_file_path in log_file_paths for path in self.get_shard_paths(log_file_path)]
+        with self._lock:
+            for log_file_path in log_file_paths:
+                stat = os.stat(log_file_path)
+                cached = self._metric_names.get(log_file_path)
+                if log_file_path in self._directories:
+                    continue
+                if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+                    has_columns = not cached[2] or (log_file_path, cached[2][0]) in self._columns or \
+                        self._has_column_file(log_file_path, cached[2][0], cached[:2])
+                    if not with_columns or has_columns:
+                        continue
+                pending.append(log_file_path)
+
+        if self._workers == 1 or len(pending) < 2:
+            for log_file_path in pending:
+                self._merge_indexed(log_file_path, *index_log_file(log_file_path))
+            return
+
+        futures = {}
+        for log_file_path in pending:
+            executor = self._get_thread_pool() if is_segment_log(log_file_path) else self._get_process_pool()
+            futures[executor.submit(index_log_file, log_file_path)] = log_file_path
+        for future in as_completed(futures):
+            self._merge_indexed(futures[future], *future.result())
+
+    def get_run_summary(self, log_file_path: str, goals: dict = None):
+        """Returns the summary of each metric of the run along with the wall time of the run.
+
+        Summary file written by the logger is returned as is, so no metric is decoded.
+        Summary files of the shards of a run logged by several writers are merged.
+        Runs logged without the summary file are summarized from their decoded columns,
+        once per (size, modification time) of their log files.
+
+        Arguments:
+            log_file_path: Log file of the run
+            goals: Metric names along with their according goal ("min" or "max"), all other metrics are minimized.
+                Goals of the runs with the summary file were already applied by the logger
+        """
+        shard_paths = self.get_shard_paths(log_file_path)
+        with phase("file_read"):
+            shard_summaries = [read_run_summary(path) for path in shard_paths]
+        if all(run_summary is not None for run_summary in shard_summaries):
+            return shard_summaries[0] if len(shard_summaries) == 1 else merge_run_summaries(shard_summaries)
+
+        version = self.get_run_version(log_file_path)
+        with self._lock:
+            cached = self._run_summaries.get(log_file_path)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            goals = goals or {}
+            summaries = {}
+            for metric_name in self.get_metric_names(log_file_path):
+                steps, values, times = self.get_metric_columns(log_file_path, metric_name)
+                with phase("aggregation"):
+                    summaries[metric_name] = summarize_metric_columns(
+                        steps, values, times, goals.get(metric_name, "min")
+                    )
+            run_summary = summarize_run(summaries)
+            self._run_summaries[log_file_path] = (version, run_summary)
+            return run_summary
+
+    def stats(self):
+        """Retrieves the number of indexed log files and the usage of the memory cache of decoded columns."""
+        with self._lock:
+            return {
+                "indexed_log_files": len(self._metric_names),
+                "cached_series": len(self._columns),
+                "downsampled_series": len(self._downsampled),
+                "mapped_series": self._num_mapped,
+                "memory_used_bytes": self._memory_used,
+                "memory_cap_bytes": self._memory_cap
+            }
+
+    def flush(self):
+        """Persists the index entries of the segment logs which changed since they were last persisted."""
+        with self._lock:
+            self._last_persisted = time.monotonic()
+            if self._db is None or not self._unpersisted:
+                return
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, NULL)",
+                    [
+                        (log_file_path, size, mtime, json.dumps(metric_names))
+                            for log_file_path, (size, mtime, metric_names) in self._unpersisted.items()
+                    ]
+                )
+            self._unpersisted = {}
+
+    def get_all_metrics(self, log_file_paths):
+        """Retrieves names of all metrics present in the given group of log files."""
+        metrics = set()
+        for log_file_path in log_file_paths:
+            metrics.update(self.get_metric_names(log_file_path))
+        return sorted(metrics)
+
+    def get_run_version(self, log_file_path: str):
+        """Returns the (size, modification time) of the log file and of each shard of the run."""
+        return tuple(
+            (stat.st_size, stat.st_mtime_ns)
+                for stat in (os.stat(path) for path in self.get_shard_paths(log_file_path))
+        )
+
+    def _is_segment_log(self, log_file_path: str):
+        """Checks whether the log file uses the segment log format, opening it only if it isn't known yet."""
+        return log_file_path in self._directories or is_segment_log(log_file_path)
+
+    def _update_directory(self, log_file_path: str, stat):
+        """Extends the directory of the segment log with the segments appended since the last update.
+
+        Returns:
+            Dictionary mapping each metric name to its segments, as listed by scan_segments
+        """
+        directory = self._directories.get(log_file_path)
+        # Log file was replaced, so its directory is built again
+        if directory is None or directory[0] != stat.st_ino or stat.st_size < directory[1]:
+            directory = [stat.st_ino, FILE_HEADER.size, {}]
+            self._directories[log_file_path] = directory
+        if stat.st_size > directory[1]:
+            with open(log_file_path, "rb") as f, phase("file_read"):
+                f.seek(directory[1])
+                scan_segments(f, directory[2])
+                directory[1] = f.tell()
+        return directory[2]
+
+    def _get_column_file_path(self, log_file_path: str, metric_name: str):
+        """Returns the path of the column file of the metric, named after a hash of the run and the metric."""
+        run_path = os.path.relpath(log_file_path, self._logdir)
+        digest = hashlib.sha1(f"{run_path}\0{metric_name}".encode("utf-8")).hexdigest()
+        return os.path.join(self._column_dir, digest + self.COLUMN_FILE_EXTENSION)
+
+    def _has_column_file(self, log_file_path: str, metric_name: str, version: tuple):
+        """Checks whether the column file of the metric was written from the given version of the log file."""
+        if self._column_dir is None:
+            return False
+        header = read_column_file_header(self._get_column_file_path(log_file_path, metric_name))
+        return header is not None and header[1] == version
+
+    def _map_columns(self, log_file_path: str, metric_name: str, version: tuple):
+        """Maps the column file of the metric if it was written from the given version of the log file.
+
+        Returns:
+            Tuple of (steps, values, times) read-only NumPy views, or None if there is no such column file
+        """
+        if self._column_dir is None:
+            return None
+        column_file_path = self._get_column_file_path(log_file_path, metric_name)
+        with phase("file_read"):
+            header = read_column_file_header(column_file_path)
+            if header is None or header[1] != version:
+                return None
+            return map_column_file(column_file_path, header[0])
+
+    def _extend_columns(self, columns: tuple, new_columns: tuple):
+        """Appends the newly decoded points to the cached columns of a metric."""
+        num_points = len(columns[0])
+        try:
+            for column, new_column in zip(columns, new_columns):
+                column.extend(new_column)
+        except BufferError:
+            # Column is being viewed by a request in progress, so an extended copy takes its place
+            return tuple(column[:num_points] + new_column for column, new_column in zip(columns, new_columns))
+        return columns
+
+    def _load_legacy(self, log_file_path: str, key: tuple):
+        """Decodes the legacy JSON log as a whole and caches the columns of each of its metrics.
+
+        Returns:
+            Dictionary mapping each metric name to a tuple of (steps, values, times) arrays
+        """
+        with phase("file_read"):
+            columns = self._load_persisted(log_file_path, key)
+        if columns is None:
+            with phase("decode"):
+                columns = load_experiment_columns(log_file_path)
+            self._persist(log_file_path, key, sorted(columns), columns)
+        self._store_legacy(log_file_path, key, columns)
+        return columns
+
+    def _store_legacy(self, log_file_path: str, key: tuple, columns: dict):
+        """Caches the metric names and the columns of each metric of the decoded legacy JSON log.
+
+        With column files, columns are written into them and mapped, rather than kept in memory.
+        """
+        self._metric_names[log_file_path] = (*key, sorted(columns))
+        for metric_name, metric_columns in columns.items():
+            if self._column_dir is None:
+                self._cache((log_file_path, metric_name), key, metric_columns)
+                continue
+            column_file_path = self._get_column_file_path(log_file_path, metric_name)
+            write_column_file(column_file_path, metric_columns, key)
+            mapped_columns = map_column_file(column_file_path, len(metric_columns[0]))
+            self._cache((log_file_path, metric_name), key, mapped_columns, mapped=True)
+
+    def _merge_indexed(self, log_file_path: str, inode: int, key: tuple, directory: dict, offset: int, columns: dict):
+        """Merges the result of index_log_file into the index."""
+        with self._lock:
+            if columns is not None:
+                self._persist(log_file_path, key, sorted(columns), columns)
+                self._store_legacy(log_file_path, key, columns)
+                return
+            # File might have been accessed while it was being indexed, in which case its directory is up to date
+            if log_file_path not in self._directories:
+                self._directories[log_file_path] = [inode, offset, directory]
+            metric_names = get_segment_names(directory)
+            self._metric_names[log_file_path] = (*key, metric_names)
+            self._persist_lazily(log_file_path, key, metric_names)
+
+    def _persist_lazily(self, log_file_path: str, key: tuple, metric_names: list):
+        """Keeps the index entry of the segment log in memory, persisting the pending entries every PERSIST_INTERVAL.
+
+        Entries which weren't persisted are persisted when the index is flushed or when the server exits,
+        and an entry lost with a killed server only costs a scan of the log file on the next start.
+        """
+        if self._db is None:
+            return
+        self._unpersisted[log_file_path] = (*key, metric_names)
+        if time.monotonic() - self._last_persisted >= self.PERSIST_INTERVAL:
+            self.flush()
+
+    def _get_process_pool(self):
+        """Returns the pool of processes which decode legacy logs, creating it on first use."""
+        with self._lock:
+            if self._process_pool is None:
+                # Forking a server which already runs threads could copy a held lock into the child
+                self._process_pool = ProcessPoolExecutor(
+                    self._workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._process_pool
+
+    def _get_thread_pool(self):
+        """Returns the pool of threads which scan segment logs, creating it on first use."""
+        with self._lock:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(self._workers)
+            return self._thread_pool
+
+    def _cache(self, cache_key: tuple, version: tuple, columns: tuple, mapped: bool = False):
+        """Places the columns of a metric into the memory cache, evicting the least recently used ones if necessary.
+
+        Mapped columns don't count towards the memory cap, since their pages can be reclaimed by the OS at any time,
+        but their number is limited by MAX_MAPPED_SERIES.
+        """
+        if cache_key in self._columns:
+            self._uncount(self._columns.pop(cache_key)[2])
+        num_bytes = None if mapped else 24 * len(columns[0])
+        self._columns[cache_key] = (version, columns, num_bytes)
+        if mapped:
+            self._num_mapped += 1
+        else:
+            self._memory_used += num_bytes
+        while (self._memory_used > self._memory_cap or self._num_mapped > self.MAX_MAPPED_SERIES) \
+                and len(self._columns) > 1:
+            _, evicted = self._columns.popitem(last=False)
+            self._uncount(evicted[2])
+
+    def _uncount(self, num_bytes: int):
+        """Removes the evicted columns from the usage of the memory cache."""
+        if num_bytes is None:
+            self._num_mapped -= 1
+        else:
+            self._memory_used -= num_bytes
+
+    def _open_db(self):
+        """Opens the SQLite file in which the index is persisted and loads the known metric names."""
+        index_dir = os.path.join(self._logdir, self.INDEX_DIR_NAME)
+        os.makedirs(index_dir, exist_ok=True)
+        db = sqlite3.connect(os.path.join(index_dir, self.INDEX_FILE_NAME), check_same_thread=False)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, metric_names TEXT, columns BLOB)"
+        )
+        for path, size, mtime, metric_names in db.execute("SELECT path, size, mtime, metric_names FROM runs"):
+            self._metric_names[path] = (size, mtime, json.loads(metric_names))
+        return db
+
+    def _load_persisted(self, log_file_path: str, key: tuple):
+        """Loads the columns from the persisted index if they were decoded from the same version of the file."""
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT columns FROM runs WHERE path = ? AND size = ? AND mtime = ?", (log_file_path, *key)
+        ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return collect_scalar_series(io.BytesIO(row[0]))
+
+    def _persist(self, log_file_path: str, key: tuple, metric_names: list, columns: dict = None):
+        """Persists the metric names and the decoded columns of legacy logs as compressed segments of the log format."""
+        if self._db is None:
+            return
+        self._unpersisted.pop(log_file_path, None)
+        encoded_columns = None
+        if columns is not None:
+            encoded_columns = b"".join(
+                encode_scalar_segment(metric_name, *metric_columns, codec=self.PERSISTED_CODEC)
+                    for metric_name, metric_columns in columns.items()
+            )
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?)",
+                (log_file_path, *key, json.dumps(metric_names), encoded_columns)
+            )
@@ -0,0 +1,145 @@
+import time
+import threading
+
+from contextlib import contextmanager
+
+
+# Phases into which the time spent handling a request is broken down
+REQUEST_PHASES = ["listing", "file_read", "decode", "aggregation", "serialization"]
+# Upper bounds of the request duration histogram buckets in seconds
+DURATION_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+# Profile of the request handled by the current thread, if the web app is instrumented
+_active_profile = threading.local()
+
+
+class RequestProfile:
+    """Time spent in each phase of handling a single request.
+
+    Phases can be nested, e.g. decoding happens while downsampling a series. A nested phase pauses
+    the enclosing one, so the time of each phase excludes the time of the phases nested in it.
+    """
+
+    def __init__(self):
+        """Initializes the module."""
+        self.start = time.perf_counter()
+        self.phase_times = dict.fromkeys(REQUEST_PHASES, 0.0)
+        # Stack of [phase name, time at which the phase was entered or last resumed]
+        self._phase_stack = []
+
+    def enter(self, phase_name: str):
+        now = time.perf_counter()
+        if self._phase_stack:
+            enclosing_phase = self._phase_stack[-1]
+            self.phase_times[enclosing_phase[0]] += now - enclosing_phase[1]
+        self._phase_stack.append([phase_name, now])
+
+    def exit(self):
+        now = time.perf_counter()
+        phase_name, resumed = self._phase_stack.pop()
+        self.phase_times[phase_name] += now - resumed
+        if self._phase_stack:
+            self._phase_stack[-1][1] = now
+
+
+def start_request_profile():
+    """Starts profiling the request handled by the current thread."""
+    _active_profile.profile = RequestProfile()
+
+
+def finish_request_profile():
+    """Stops profiling the request handled by the current thread.
+
+    Returns:
+        Profile of the request, or None if the request wasn't profiled
+    """
+    profile = getattr(_active_profile, "profile", None)
+    _active_profile.profile = None
+    return profile
+
+
+@contextmanager
+def phase(phase_name: str):
+    """Attributes the time spent within the block to the phase of the request being profiled.
+
+    Without a request being profiled (e.g. when the web app isn't instrumented) the block runs as is.
+    """
+    profile = getattr(_active_profile, "profile", None)
+    if profile is None:
+        yield
+        return
+    profile.enter(phase_name)
+    try:
+        yield
+    finally:
+        profile.exit()
+
+
+def _format_labels(labels: dict):
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n"))
+            for name, value in labels.items()
+    )
+    return "{" + ",".join(f"{name}=\"{value}\"" for name, value in escaped) + "}"
+
+
+class RouteMetrics:
+    """Timings of the requests aggregated per route, exposed in the Prometheus text format."""
+
+    def __init__(self):
+        """Initializes the module."""
+        # Route -> [bucket counts, number of requests, total duration, total time of each phase]
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route: str, profile: RequestProfile):
+        """Records the profile of a finished request of the route."""
+        duration = time.perf_counter() - profile.start
+        with self._lock:
+            if route not in self._routes:
+                self._routes[route] = [[0] * len(DURATION_BUCKETS), 0, 0.0, dict.fromkeys(REQUEST_PHASES, 0.0)]
+            route_metrics = self._routes[route]
+            for bucket, upper_bound in enumerate(DURATION_BUCKETS):
+                if duration <= upper_bound:
+                    route_metrics[0][bucket] += 1
+            route_metrics[1] += 1
+            route_metrics[2] += duration
+            for phase_name, phase_time in profile.phase_times.items():
+                route_metrics[3][phase_name] += phase_time
+
+    def render(self, gauges: dict = None):
+        """Renders the timings of every route in the Prometheus text format.
+
+        Arguments:
+            gauges: Additional gauges to render, as names along with (help text, value) tuples
+        """
+        lines = [
+            "# HELP ml_tracking_ops_request_duration_seconds Duration of the requests handled by the web app.",
+            "# TYPE ml_tracking_ops_request_duration_seconds histogram"
+        ]
+        with self._lock:
+            routes = {route: (list(buckets), count, total, dict(phase_times))
+                      for route, (buckets, count, total, phase_times) in self._routes.items()}
+
+        for route, (buckets, count, total, _) in sorted(routes.items()):
+            for upper_bound, bucket_count in zip(DURATION_BUCKETS, buckets):
+                labels = _format_labels({"route": route, "le": upper_bound})
+                lines.append(f"ml_tracking_ops_request_duration_seconds_bucket{labels} {bucket_count}")
+            lines.append(
+                f"ml_tracking_ops_request_duration_seconds_bucket{_format_labels({'route': route, 'le': '+Inf'})} {count}"
+            )
+            lines.append(f"ml_tracking_ops_request_duration_seconds_sum{_format_labels({'route': route})} {total}")
+            lines.append(f"ml_tracking_ops_request_duration_seconds_count{_format_labels({'route': route})} {count}")
+
+        lines += [
+            "# HELP ml_tracking_ops_request_phase_seconds_total Time spent in each phase of handling the requests.",
+            "# TYPE ml_tracking_ops_request_phase_seconds_total counter"
+        ]
+        for route, (_, _, _, phase_times) in sorted(routes.items()):
+            for phase_name, phase_time in phase_times.items():
+                labels = _format_labels({"route": route, "phase": phase_name})
+                lines.append(f"ml_tracking_ops_request_phase_seconds_total{labels} {phase_time}")
+
+        for gauge_name, (help_text, value) in (gauges or {}).items():
+            lines += [f"# HELP {gauge_name} {help_text}", f"# TYPE {gauge_name} gauge", f"{gauge_name} {value}"]
+        return "\n".join(lines) + "\n"
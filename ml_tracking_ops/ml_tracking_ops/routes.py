@@ -1,92 +1,476 @@
 import json
 import os
-from flask import render_template, url_for, redirect
+from flask import render_template, url_for, redirect, request, abort, Response
 
 from ml_tracking_ops.ml_tracking_ops import app
-from ml_tracking_ops.ml_tracking_ops.utils import get_all_metrics, load_and_decode_experiment_log
+from ml_tracking_ops.ml_tracking_ops.index import RunIndex
+from ml_tracking_ops.ml_tracking_ops.catalog import RunCatalog
+from ml_tracking_ops.ml_tracking_ops.downsampling import DOWNSAMPLING_METHODS, MIN_POINTS
+from ml_tracking_ops.ml_tracking_ops.tailer import LogTailer
+from ml_tracking_ops.ml_tracking_ops.transport import BINARY_MIMETYPE, encode_series_binary, compress_response
+from ml_tracking_ops.ml_tracking_ops.instrumentation import RouteMetrics, phase, start_request_profile, \
+    finish_request_profile
+from ml_tracking_ops.experiment.log_format import is_segment_log
+from ml_tracking_ops.ml_tracking_ops.utils import decode_scalar_series, get_sweep_trials
 
 
 loaded_data = {}
 SWEEP_CONFIG_FILENAME = "experiment_description.json"
 
 
+def get_run_index():
+    """Returns the index of the runs in the logdir, creating it on first use."""
+    if "run_index" not in loaded_data:
+        loaded_data["run_index"] = RunIndex(
+            app.config["logdir"],
+            memory_cap=app.config.get("INDEX_MEMORY_CAP_MB", 512) * 2 ** 20,
+            workers=app.config.get("INDEX_WORKERS")
+        )
+    return loaded_data["run_index"]
+
+
+def get_run_catalog():
+    """Returns the catalog of the trials of the sweeps in the logdir, creating it on first use."""
+    if "run_catalog" not in loaded_data:
+        loaded_data["run_catalog"] = RunCatalog(os.path.join(app.config["logdir"], RunIndex.INDEX_DIR_NAME))
+    return loaded_data["run_catalog"]
+
+
+def get_log_tailer():
+    """Returns the tailer which follows the log files of the runs in progress, creating it on first use."""
+    if "log_tailer" not in loaded_data:
+        loaded_data["log_tailer"] = LogTailer()
+    return loaded_data["log_tailer"]
+
+
+def get_route_metrics():
+    """Returns the timings of the requests of each route, creating them on first use."""
+    if "route_metrics" not in loaded_data:
+        loaded_data["route_metrics"] = RouteMetrics()
+    return loaded_data["route_metrics"]
+
+
+def to_json(data):
+    """Serializes the response data, attributing the time spent to the serialization phase of the request."""
+    with phase("serialization"):
+        return json.dumps(data)
+
+
+@app.before_request
+def start_profiling():
+    # Requests are profiled only if the web app was started with instrumentation enabled
+    if app.config.get("INSTRUMENT", False):
+        start_request_profile()
+
+
+@app.after_request
+def finish_profiling(response):
+    profile = finish_request_profile()
+    if profile is not None and request.url_rule is not None:
+        get_route_metrics().observe(request.url_rule.rule, profile)
+    return response
+
+
+@app.after_request
+def compress(response):
+    # Registered after the profiling hook, so it runs before it and compression is part of the request profile
+    if not app.config.get("COMPRESS_RESPONSES", False):
+        return response
+    with phase("serialization"):
+        return compress_response(response, request.accept_encodings)
+
+
+def get_run_log_file(run_id: str):
+    """Finds the log file of the run.
+
+    Run id is either the name of an experiment directory, or "<sweep directory>:<trial log file name>"
+    for a trial of a sweep, e.g. "Experiment_Oct-18_12-35-36:trial-00001".
+    """
+    run_index = get_run_index()
+    experiment_dirs, sweep_dirs = run_index.list_runs()
+    if ":" in run_id:
+        sweep_dir, trial_name = run_id.split(":", 1)
+        if sweep_dir not in sweep_dirs or os.path.basename(trial_name) != trial_name:
+            abort(404)
+        return os.path.join(app.config["logdir"], sweep_dir, f"{trial_name}.dat")
+
+    if run_id not in experiment_dirs or not run_index.get_log_files(run_id):
+        abort(404)
+    return run_index.get_log_files(run_id)[0]
+
+
+def get_series_options():
+    """Parses the query parameters which select the metric, the window of steps and the resolution of the series.
+
+    Supported parameters are `metric`, `max_points`, `method` ("minmax" or "lttb"), `step_min`, `step_max`
+    and `since_step`, which selects only the points logged after the given step.
+    """
+    options = {
+        "metric": request.args.get("metric"),
+        "max_points": request.args.get("max_points", type=int),
+        "method": request.args.get("method", "minmax"),
+        "step_min": request.args.get("step_min", type=int),
+        "step_max": request.args.get("step_max", type=int)
+    }
+    if options["method"] not in DOWNSAMPLING_METHODS:
+        abort(400, f"Unknown downsampling method {options['method']}")
+    if options["max_points"] is not None:
+        options["max_points"] = max(options["max_points"], MIN_POINTS)
+    since_step = request.args.get("since_step", type=int)
+    if since_step is not None:
+        options["step_min"] = since_step + 1 if options["step_min"] is None else max(since_step + 1, options["step_min"])
+    return options
+
+
+def wants_binary():
+    """Checks whether the client asked for the series as packed binary columns instead of JSON.
+
+    Binary columns are requested either by the `format=bin` query parameter, or by preferring
+    the application/octet-stream content type in the Accept header.
+    """
+    return request.args.get("format") == "bin" or request.accept_mimetypes.best == BINARY_MIMETYPE
+
+
+def load_run_series(log_file_path: str, options: dict):
+    """Loads the series of the run selected by the query parameters.
+
+    Returns:
+        Dictionary mapping each metric name to a tuple of (steps, values, times) arrays
+    """
+    run_index = get_run_index()
+    metric_names = run_index.get_metric_names(log_file_path)
+    if options["metric"] is not None:
+        metric_names = [options["metric"]] if options["metric"] in metric_names else []
+
+    return {
+        metric_name: run_index.get_series(
+            log_file_path, metric_name, options["max_points"], options["method"],
+            options["step_min"], options["step_max"]
+        ) for metric_name in metric_names
+    }
+
+
+def load_run_data(log_file_path: str, options: dict):
+    """Loads the series of the run selected by the query parameters, in the event form used by the frontend."""
+    run_data = {}
+    for metric_name, (steps, values, times) in load_run_series(log_file_path, options).items():
+        with phase("serialization"):
+            run_data[metric_name] = decode_scalar_series(steps.tolist(), values.tolist(), times.tolist())
+    return run_data
+
+
+def series_response(log_file_path: str, options: dict):
+    """Responds with the series of the run selected by the query parameters, as binary columns or as JSON."""
+    if not wants_binary():
+        return to_json(load_run_data(log_file_path, options))
+    series = load_run_series(log_file_path, options)
+    with phase("serialization"):
+        return Response(encode_series_binary(series), mimetype=BINARY_MIMETYPE)
+
+
+def list_runs():
+    """Registers the experiment and sweep directories present in the logdir."""
+    loaded_data["experiment_dirs"], loaded_data["sweep_dirs"] = get_run_index().list_runs()
+
+
+def describe_sweep(sweep_dir: str):
+    """Reads the configuration of the sweep, including the sampled hyperparameters, and the log file of each trial."""
+    sweep_dir_abs = os.path.join(app.config["logdir"], sweep_dir)
+    sampled_hyperparameters, trial_log_paths = get_sweep_trials(sweep_dir_abs)
+
+    # Decode sweep configuration
+    with open(os.path.join(sweep_dir_abs, SWEEP_CONFIG_FILENAME), "r") as f:
+        sweep_config = json.load(f)
+    if sampled_hyperparameters is not None:
+        sweep_config["sampled_hyperparameters"] = sampled_hyperparameters
+
+    return {
+        "sweep_config": sweep_config,
+        "trial_log_paths": trial_log_paths
+    }
+
+
+def get_goals(sweep_config: dict):
+    """Returns the goal of the optimization metric of the sweep, the goal of every other metric being "min"."""
+    goals = {}
+    if sweep_config.get("optimization_goal", "/") != "/":
+        goals[sweep_config["optimization_metric"]] = sweep_config["optimization_goal"]
+    return goals
+
+
 @app.route("/")
 @app.route("/home")
 def home():
-    experiment_dirs = os.listdir(app.config["logdir"])
-    loaded_data["sweep_dirs"] = []
-    loaded_data["experiment_dirs"] = []
-    for dir_name in experiment_dirs:
-        sweep_configuration_file_path = os.path.join(app.config["logdir"], dir_name, SWEEP_CONFIG_FILENAME)
-        if os.path.exists(sweep_configuration_file_path):
-            loaded_data["sweep_dirs"].append(dir_name)
-        else:
-            loaded_data["experiment_dirs"].append(dir_name)
-
+    list_runs()
     return redirect(url_for("experiments"))
 
 
 @app.route("/get_experiment_data/<experiment_id>")
 def get_experiment_data(experiment_id):
-    experiment_data = loaded_data["experiment_logs"][experiment_id]
-    return json.dumps(experiment_data)
+    return series_response(loaded_data["experiment_logs"][experiment_id], get_series_options())
 
 
 @app.route("/experiments")
 def experiments():
-    experiment_dirs = loaded_data["experiment_dirs"]
-    experiment_dirs_abs = [os.path.join(app.config["logdir"], dirname) for dirname in experiment_dirs]
+    list_runs()
+    run_index = get_run_index()
 
     # Register filenames for log files for each experiment run
     experiment_filedata = {}
-    for experiment_dir_rel, experiment_dir_abs in zip(experiment_dirs, experiment_dirs_abs):
-        experiment_files = [fname for fname in os.listdir(experiment_dir_abs) if fname.endswith(".dat")]
-        if experiment_files:
-            experiment_filedata[experiment_dir_rel] = os.path.join(experiment_dir_abs, experiment_files[0])
-
-    # Load log files for each experiment
-    experiment_logs_data = {
-        log_file_dir: load_and_decode_experiment_log(log_file_path)
-            for log_file_dir, log_file_path in experiment_filedata.items()
-    }
-    all_metrics = get_all_metrics(experiment_logs_data.values())
-    loaded_data["experiment_logs"] = experiment_logs_data
+    with phase("listing"):
+        for experiment_dir in loaded_data["experiment_dirs"]:
+            experiment_files = run_index.get_log_files(experiment_dir)
+            if experiment_files:
+                experiment_filedata[experiment_dir] = experiment_files[0]
+
+    # Only metric names are needed for rendering the page, log data is retrieved per experiment
+    with phase("file_read"):
+        run_index.load_runs(experiment_filedata.values())
+    with phase("aggregation"):
+        all_metrics = run_index.get_all_metrics(experiment_filedata.values())
+    loaded_data["experiment_logs"] = experiment_filedata
     loaded_data["all_metrics"] = all_metrics
-    experiment_ids = list(experiment_logs_data.keys())
+    experiment_ids = list(experiment_filedata.keys())
 
-    return render_template("experiments.html", experiment_ids=experiment_ids, all_metrics=all_metrics)
+    with phase("serialization"):
+        return render_template("experiments.html", experiment_ids=experiment_ids, all_metrics=all_metrics)
 
 
 @app.route("/get_sweep_data/<sweep_id>")
 def get_sweep_data(sweep_id):
-    sweep_data = loaded_data["sweep_logs"][sweep_id]
-    return json.dumps(sweep_data)
+    """Retrieves the configuration of the sweep and the summary of each trial.
+
+    Summaries carry the count, the minimum, the maximum, the last and the best value of each metric
+    and the wall time of the trial, which is all the sweep table needs. Series of the trials are retrieved
+    per trial and metric through /get_metric, using the returned trial ids. Series of every metric of every trial
+    are returned as well only with the `full=1` query parameter, along with the other series query parameters.
+    With the `summaries=0` query parameter only the configuration of the sweep (without the sampled hyperparameters)
+    and the number of trials are returned, for clients which page through the trials with /query_sweep.
+    """
+    sweep_desc = loaded_data["sweep_logs"][sweep_id]
+    sweep_config = sweep_desc["sweep_config"]
+    run_index = get_run_index()
+    goals = get_goals(sweep_config)
+
+    if not request.args.get("summaries", 1, type=int):
+        return to_json({
+            "sweep_config": {key: value for key, value in sweep_config.items() if key != "sampled_hyperparameters"},
+            "num_trials": len(sweep_desc["trial_log_paths"])
+        })
+
+    sweep_data = {
+        "sweep_config": sweep_config,
+        "trial_ids": [
+            f"{sweep_id}:{os.path.splitext(os.path.basename(log_file_path))[0]}"
+                for log_file_path in sweep_desc["trial_log_paths"]
+        ],
+        # Trial which was just started might not have created its log file yet
+        "experiment_summaries": [
+            run_index.get_run_summary(log_file_path, goals) if os.path.exists(log_file_path) else {}
+                for log_file_path in sweep_desc["trial_log_paths"]
+        ]
+    }
+    if request.args.get("full", 0, type=int):
+        options = get_series_options()
+        with phase("file_read"):
+            run_index.load_runs(
+                [log_file_path for log_file_path in sweep_desc["trial_log_paths"] if os.path.exists(log_file_path)],
+                with_columns=True
+            )
+        sweep_data["experiment_data"] = [
+            load_run_data(log_file_path, options) if os.path.exists(log_file_path) else {}
+                for log_file_path in sweep_desc["trial_log_paths"]
+        ]
+    return to_json(sweep_data)
 
 
 @app.route("/sweeps")
 def sweeps():
+    list_runs()
+    run_index = get_run_index()
     sweep_dirs = loaded_data["sweep_dirs"]
-    
+
     sweep_logs = {}
+    existing_log_paths = []
     for sweep_dir in sweep_dirs:
-        sweep_dir_abs = os.path.join(app.config["logdir"], sweep_dir)
-        sweep_log_files = os.listdir(sweep_dir_abs)
-
-        # Decode sweep configuration
-        with open(os.path.join(sweep_dir_abs, SWEEP_CONFIG_FILENAME), "r") as f:
-            sweep_config = json.load(f)
-
-        sweep_desc = {
-            "sweep_config": sweep_config,
-            "experiment_data": [load_and_decode_experiment_log(os.path.join(sweep_dir_abs, log_file_path))
-                for log_file_path in sweep_log_files if log_file_path != SWEEP_CONFIG_FILENAME]
-        }
-        sweep_logs[sweep_dir] = sweep_desc
-
-    all_metrics = []
-    for sweep in sweep_logs.values():
-        all_metrics += get_all_metrics(sweep["experiment_data"])
-    all_metrics = list(set(all_metrics))
-    
-    loaded_data["sweep_logs"] = sweep_logs        
-    return render_template("sweeps.html", sweep_dirs=sweep_dirs, all_metrics=all_metrics)
+        with phase("listing"):
+            sweep_logs[sweep_dir] = describe_sweep(sweep_dir)
+            existing_log_paths += [
+                log_file_path for log_file_path in sweep_logs[sweep_dir]["trial_log_paths"] if os.path.exists(log_file_path)
+            ]
+
+    # Trials of all sweeps are indexed at once, so the work is spread across all of the workers
+    with phase("file_read"):
+        run_index.load_runs(existing_log_paths)
+    with phase("aggregation"):
+        all_metrics = run_index.get_all_metrics(existing_log_paths)
+
+    loaded_data["sweep_logs"] = sweep_logs
+    with phase("serialization"):
+        return render_template("sweeps.html", sweep_dirs=sweep_dirs, all_metrics=all_metrics)
+
+
+@app.route("/query_sweep/<sweep_id>")
+def query_sweep(sweep_id):
+    """Retrieves a page of the trials of the sweep, filtered and sorted by the catalog of the trials.
+
+    Supported query parameters are `filter` (repeatable, "<field>:<operator>:<value>", e.g. "hp.batch_size:eq:64"
+    or "metric.Accuracy.best:ge:0.9"), `sort` (a field, prefixed with "-" for the descending order,
+    e.g. "-metric.Accuracy.best"), `limit` and `offset`. Fields are "trial", "wall_time", "hp.<hyperparameter>"
+    and "metric.<metric>.<statistic>", with the statistic being one of count, min, max, last, last_step, best,
+    best_step and wall_time. Operators are eq, ne, lt, le, gt and ge.
+    Each returned trial carries its index in the sweep, its run id, its sampled hyperparameters and its summary.
+    """
+    if sweep_id not in get_run_index().list_runs()[1]:
+        abort(404)
+    filters = []
+    for condition in request.args.getlist("filter"):
+        parts = condition.split(":", 2)
+        if len(parts) != 3:
+            abort(400, f"Invalid filter {condition}, expected <field>:<operator>:<value>")
+        filters.append(parts)
+
+    with phase("listing"):
+        sweep_desc = describe_sweep(sweep_id)
+        sweep_config = sweep_desc["sweep_config"]
+        # Sweeps started before the sampled hyperparameters were recorded have none
+        sampled_hyperparameters = sweep_config.get("sampled_hyperparameters") or []
+        sampled_hyperparameters += [{}] * (len(sweep_desc["trial_log_paths"]) - len(sampled_hyperparameters))
+    run_catalog = get_run_catalog()
+    with phase("aggregation"):
+        run_catalog.sync_sweep(
+            sweep_id, sampled_hyperparameters, sweep_desc["trial_log_paths"], get_run_index(), get_goals(sweep_config)
+        )
+        try:
+            page = run_catalog.query_trials(
+                sweep_id, filters, request.args.get("sort"), request.args.get("limit", type=int),
+                request.args.get("offset", 0, type=int)
+            )
+        except ValueError as e:
+            abort(400, str(e))
+    return to_json(page)
+
+
+@app.route("/get_metric/<run_id>/<path:metric_name>")
+def get_metric(run_id, metric_name):
+    """Retrieves the series of a single metric of the run, without decoding the other metrics.
+
+    Accepts the same query parameters as the other data endpoints, except for `metric`.
+    With `format=bin` the series is sent as binary columns, as a response holding only this metric.
+    """
+    log_file_path = get_run_log_file(run_id)
+    if not os.path.exists(log_file_path) or metric_name not in get_run_index().get_metric_names(log_file_path):
+        abort(404)
+    options = get_series_options()
+    options["metric"] = metric_name
+    if wants_binary():
+        return series_response(log_file_path, options)
+    return to_json(load_run_data(log_file_path, options)[metric_name])
+
+
+@app.route("/get_metric_summary/<run_id>/<path:metric_name>")
+def get_metric_summary(run_id, metric_name):
+    """Retrieves the number of points, the minimum, the maximum and the last value, and the last step of the metric."""
+    log_file_path = get_run_log_file(run_id)
+    if not os.path.exists(log_file_path) or metric_name not in get_run_index().get_metric_names(log_file_path):
+        abort(404)
+    return to_json(get_run_index().get_metric_summary(log_file_path, metric_name))
+
+
+def encode_histogram(histogram: dict):
+    """Converts the histogram into its JSON form, with the mean and the standard deviation of the finite values.
+
+    Statistics which are undefined for a histogram without finite values are null.
+    """
+    count = histogram["count"]
+    mean = histogram["sum"] / count if count else None
+    return {
+        "step": int(histogram["step"]),
+        "time": histogram["time"],
+        "count": int(count),
+        "nonfinite": int(histogram["nonfinite"]),
+        "min": histogram["min"] if count else None,
+        "max": histogram["max"] if count else None,
+        "mean": mean,
+        "std": max(histogram["sum_squares"] / count - mean ** 2, 0.0) ** 0.5 if count else None,
+        "edges": [float(edge) for edge in histogram["edges"]],
+        "counts": [float(bin_count) for bin_count in histogram["counts"]]
+    }
+
+
+@app.route("/list_histograms/<run_id>")
+def list_histograms(run_id):
+    """Lists the names of the metrics of the run which were logged as histograms."""
+    log_file_path = get_run_log_file(run_id)
+    if not os.path.exists(log_file_path):
+        abort(404)
+    return to_json(get_run_index().get_histogram_names(log_file_path))
+
+
+@app.route("/get_histograms/<run_id>/<path:metric_name>")
+def get_histograms(run_id, metric_name):
+    """Retrieves the histograms of a single metric of the run over the steps.
+
+    Supported parameters are `step_min` and `step_max`, which select a window of steps, and `max_steps`,
+    which merges the histograms of consecutive steps so that at most that many histograms are sent.
+    """
+    log_file_path = get_run_log_file(run_id)
+    run_index = get_run_index()
+    if not os.path.exists(log_file_path) or metric_name not in run_index.get_histogram_names(log_file_path):
+        abort(404)
+    max_steps = request.args.get("max_steps", type=int)
+    histograms = run_index.get_histograms(
+        log_file_path, metric_name, max(max_steps, 1) if max_steps is not None else None,
+        request.args.get("step_min", type=int), request.args.get("step_max", type=int)
+    )
+    return to_json([encode_histogram(histogram) for histogram in histograms])
+
+
+@app.route("/stream/<run_id>")
+def stream(run_id):
+    """Streams the points appended to the log file of the run as Server-Sent Events.
+
+    Each "metrics" event carries the new points of each metric in the event form used by the frontend.
+    Without the `since_step` query parameter only the points appended after connecting are streamed,
+    otherwise the whole log is streamed, skipping the points logged up to that step.
+    """
+    log_file_path = get_run_log_file(run_id)
+    if os.path.exists(log_file_path) and not is_segment_log(log_file_path):
+        abort(400, "Only runs logged in the segment log format can be streamed")
+    offset = 0
+    since_step = request.args.get("since_step", type=int)
+    if since_step is None and os.path.exists(log_file_path):
+        offset = get_run_index().get_end_offset(log_file_path)
+
+    def generate_events():
+        for new_series in get_log_tailer().follow(log_file_path, since_step, offset):
+            if new_series is None:
+                # Comment line keeps the connection alive and reveals disconnected clients
+                yield ": heartbeat\n\n"
+                continue
+            run_data = {
+                metric_name: decode_scalar_series(*columns) for metric_name, columns in new_series.items()
+            }
+            yield f"event: metrics\ndata: {json.dumps(run_data)}\n\n"
+
+    return Response(generate_events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.route("/_metrics")
+def metrics():
+    """Exposes the timings of the requests of each route in the Prometheus text format.
+
+    Time of each request is broken down into listing the runs, reading the log files, decoding the series,
+    aggregating them (downsampling and summaries) and serializing the response.
+    Available only if the web app was started with instrumentation enabled.
+    """
+    if not app.config.get("INSTRUMENT", False):
+        abort(404)
+    index_stats = get_run_index().stats()
+    gauges = {
+        "ml_tracking_ops_index_log_files": ("Number of indexed log files.", index_stats["indexed_log_files"]),
+        "ml_tracking_ops_index_cached_series": ("Number of decoded series kept in memory.", index_stats["cached_series"]),
+        "ml_tracking_ops_index_memory_bytes": ("Memory taken by the decoded series.", index_stats["memory_used_bytes"]),
+        "ml_tracking_ops_index_memory_cap_bytes": ("Memory cap of the decoded series.", index_stats["memory_cap_bytes"])
+    }
+    return Response(get_route_metrics().render(gauges), mimetype="text/plain; version=0.0.4")
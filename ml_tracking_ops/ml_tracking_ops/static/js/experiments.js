@@ -2,11 +2,14 @@ $(document).ready(function () {
   jQuery.ajaxSetup({ async: false });
 
   // Variables neccesarry for acquiring experiment data
-  const experiment_id_url = "/get_experiment_data/";
+  const metric_url = "/get_metric/";
+  const stream_url = "/stream/";
+  // Series are downsampled by the backend, a chart can't show more points than it has pixels anyway
+  const maxChartPoints = 2000;
 
-  // Selected metrics
-  let selectedMetrics = new Set([]);
   let chartHandlers = {};
+  // Metrics whose charts are currently scrolled into view
+  let visibleMetrics = new Set([]);
 
   // For drawing experiment log data onto the chart
   const metricCharts = $(".experiment-metric-chart");
@@ -19,6 +22,8 @@ $(document).ready(function () {
   let checkboxesChecked = [0];
   let experimentsSelected = [];
   let experimentData = [];
+  // Streams of points logged by the selected experiments which are still in progress
+  let experimentStreams = {};
 
 
   /**
@@ -43,6 +48,23 @@ $(document).ready(function () {
       chartHandlers[metricName].chart = new Chart(chartHandlers[metricName].ctx, {});
     });
 
+    // Metric data is retrieved only once its chart is scrolled into view
+    const chartObserver = new IntersectionObserver((entries) => {
+      entries.forEach((entry) => {
+        const metricName = entry.target.dataset.metric;
+        if (!entry.isIntersecting) {
+          visibleMetrics.delete(metricName);
+          return;
+        }
+        visibleMetrics.add(metricName);
+        if (chartHandlers[metricName].stale && experimentData.length > 0) {
+          loadMetricData(metricName);
+          populateMetricChart(experimentData, metricName);
+        }
+      });
+    });
+    metricCharts.each((index) => chartObserver.observe(metricCharts[index]));
+
     // Radio buttons set-up
     for (let i = 0; i < sidebarRadios.length; i++) {
       sidebarRadios[i].style.width = "15%";
@@ -51,7 +73,8 @@ $(document).ready(function () {
         // Display data for the selected experiment(s)
         const experimentId = sidebarRadios[i].value;
         experimentsSelected = [experimentId];
-        experimentData = [retrieveExperimentData(experimentId, chartHandlers)];
+        experimentData = [{ experimentId: experimentId }];
+        followSelectedExperiments();
         populateMetricCharts(experimentData);
 
         // Radio buttons are mutually exclusive
@@ -73,15 +96,15 @@ $(document).ready(function () {
 
       sidebarCheckboxes[i].onclick = function () {
         const experimentId = sidebarCheckboxes[i].value;
-        experimentDataCurr = retrieveExperimentData(experimentId, chartHandlers);
 
         if (sidebarCheckboxes[i].checked) {
           checkboxesChecked.push(i);
           checkboxesCheckedNum++;
           
           // Remember the newly selected experiment data
-          experimentsSelected.push(sidebarCheckboxes[i].value);
-          experimentData.push(experimentDataCurr);
+          experimentsSelected.push(experimentId);
+          experimentData.push({ experimentId: experimentId });
+          followSelectedExperiments();
 
           if (checkboxesCheckedNum >= 2) {
             // We wish to show multiple training runs on the graph areas
@@ -95,6 +118,7 @@ $(document).ready(function () {
           const tgtIdx = experimentsSelected.indexOf(sidebarCheckboxes[i].value);
           experimentsSelected.splice(tgtIdx, 1);
           experimentData.splice(tgtIdx, 1);
+          followSelectedExperiments();
 
           sidebarRadios[i].checked = false;
           if (checkboxesCheckedNum == 0) {
@@ -142,38 +166,92 @@ $(document).ready(function () {
   }
 
   /**
-   * Retrieves data for the selected experiment.
-   * This data was previously loaded by the backend.
+   * Retrieves data of a single metric for the selected experiment.
+   * Other metrics of the experiment aren't decoded by the backend.
    * @param experimentId Id of the wanted experiment
+   * @param metricName Metric to retrieve
+   * @param seriesQuery Optional window of steps ({step_min, step_max}) to retrieve
+   * @returns Series of the metric, or null if the experiment didn't log it
    */
-  function retrieveExperimentData(experimentId) {
-    let loggedMetricData;
-    $.get(`${experiment_id_url}/${experimentId}`, (experimentData) => {
-      experimentData = JSON.parse(experimentData);
-
-      // Extract names of the metrics logged during experiment
-      const loggedMetricNames = Object.getOwnPropertyNames(experimentData);
-      loggedMetricNames.forEach((metricName) => {
-        selectedMetrics.add(metricName);
-      });
+  function retrieveMetricData(experimentId, metricName, seriesQuery = {}) {
+    // Series is sent as binary columns, which are read into typed arrays
+    const query = $.param({ max_points: maxChartPoints, format: "bin", ...seriesQuery });
+    const metricSeries = retrieveBinarySeries(`${metric_url}${experimentId}/${encodeURIComponent(metricName)}?${query}`);
+    return metricSeries? metricSeries[metricName] : null;
+  }
 
-      // Object which contains retrieved data for each metric
-      loggedMetricData = loggedMetricNames.map(function(metricName) {
-        const entries = [
-          metricName,
-          {
-            timestamp: extractMetricProperty(experimentData[metricName], "time"),
-            x: extractMetricProperty(experimentData[metricName], "step"),
-            y: extractMetricProperty(experimentData[metricName], "value"),
-          },
-        ];
-        return entries;
-      });
+  /**
+   * Retrieves data of the metric for every selected experiment which doesn't have it yet.
+   * @param metricName Metric to retrieve
+   */
+  function loadMetricData(metricName) {
+    experimentData.forEach((element) => {
+      if (!element.hasOwnProperty(metricName)) {
+        element[metricName] = retrieveMetricData(element.experimentId, metricName);
+      }
+    });
+  }
+
+  /**
+   * Follows the selected experiments, so points logged by the runs in progress are appended to the charts.
+   * Experiments which are no longer selected stop being followed.
+   */
+  function followSelectedExperiments() {
+    for (const experimentId in experimentStreams) {
+      if (!experimentsSelected.includes(experimentId)) {
+        experimentStreams[experimentId].close();
+        delete experimentStreams[experimentId];
+      }
+    }
 
-      loggedMetricData = Object.fromEntries(loggedMetricData);
-      loggedMetricData.experimentId = experimentId;
+    experimentsSelected.forEach((experimentId) => {
+      if (experimentStreams.hasOwnProperty(experimentId)) {
+        return;
+      }
+      // Stream carries only the points appended after it was opened
+      const eventSource = new EventSource(`${stream_url}${experimentId}`);
+      eventSource.addEventListener("metrics", (event) => {
+        appendExperimentData(experimentId, JSON.parse(event.data));
+      });
+      experimentStreams[experimentId] = eventSource;
     });
-    return loggedMetricData;
+  }
+
+  /**
+   * Appends the streamed points to the data and the charts of the experiment.
+   *
+   * @param experimentId Id of the experiment which logged the points
+   * @param newData New points of each metric
+   */
+  function appendExperimentData(experimentId, newData) {
+    const index = experimentsSelected.indexOf(experimentId);
+    if (index == -1) {
+      return;
+    }
+    for (const metricName in newData) {
+      // Metric which wasn't retrieved yet will be retrieved together with the new points
+      const metricSeries = experimentData[index][metricName];
+      if (!metricSeries) {
+        continue;
+      }
+      // Points retrieved after the stream was opened may have been streamed as well
+      const lastStep = metricSeries.x.length > 0 ? metricSeries.x[metricSeries.x.length - 1] : -Infinity;
+      const newPoints = newData[metricName].filter((logEvent) => logEvent.step > lastStep);
+      metricSeries.timestamp = appendToColumn(metricSeries.timestamp, extractMetricProperty(newPoints, "time"));
+      metricSeries.x = appendToColumn(metricSeries.x, extractMetricProperty(newPoints, "step"));
+      metricSeries.y = appendToColumn(metricSeries.y, extractMetricProperty(newPoints, "value"));
+
+      // Metric which wasn't logged when the page was loaded has no chart, a zoomed chart shows a fixed window
+      if (!chartHandlers.hasOwnProperty(metricName) || chartHandlers[metricName].zoomed) {
+        continue;
+      }
+      const chart = chartHandlers[metricName].chart;
+      if (chart.data.datasets === undefined || chart.data.datasets[index] === undefined) {
+        continue;
+      }
+      chart.data.datasets[index].data.push(...newPoints.map((logEvent) => ({ x: logEvent.step, y: logEvent.value })));
+      chart.update("none");
+    }
   }
 
   /**
@@ -185,123 +263,175 @@ $(document).ready(function () {
    */
   function populateMetricCharts(metricData) {
     for (const metricName in chartHandlers) {
-      // Extract the maximum timestep reached for the selected metric
-      // for all experiments included
-      const numberOfTimeStepsPerExperiment = metricData.map((element) => {
-        return element.hasOwnProperty(metricName)? element[metricName].x[element[metricName].x.length - 1] : 0;
-      });
-      const maxXVal = Math.max(...numberOfTimeStepsPerExperiment);
-      // Define x-axis for the according graph
-      const xAxisLabels = [...Array(maxXVal).keys()];
-
-      // Create a dataset object for each experiment for this metric (@metricName)
-      let metricDatasets = metricData.map((element, index) => {
-        const experimentDesc = {
-          label: element.experimentId,
-          data: element.hasOwnProperty(metricName)? element[metricName].y : [0.0,],
-          borderColor: colors[index % colors.length],
-          borderWidth: 1,
-        };
-        return experimentDesc;
-      });
+      // Charts which aren't visible are drawn once they are scrolled into view
+      if (!visibleMetrics.has(metricName)) {
+        chartHandlers[metricName].stale = true;
+        continue;
+      }
+      loadMetricData(metricName);
+      populateMetricChart(metricData, metricName);
+    }
+  }
+
+  /**
+   * Re-retrieves the zoomed-in window of steps of the metric for every selected experiment.
+   * The narrower the window, the closer the retrieved series are to their full resolution.
+   *
+   * @param metricName Metric whose chart was zoomed
+   * @param chart Zoomed chart
+   */
+  function zoomMetricChart(metricName, chart) {
+    const seriesQuery = {
+      step_min: Math.floor(chart.scales.x.min),
+      step_max: Math.ceil(chart.scales.x.max),
+    };
+    const zoomedData = experimentsSelected.map((experimentId) => {
+      return {
+        experimentId: experimentId,
+        [metricName]: retrieveMetricData(experimentId, metricName, seriesQuery),
+      };
+    });
+    populateMetricChart(zoomedData, metricName);
+  }
+
+  /**
+   * Populates the chart of a single metric for every selected experiment.
+   *
+   * @param metricData Logs of the selected experiments
+   * @param metricName Metric to draw
+   */
+  function populateMetricChart(metricData, metricName) {
+    // Number of points shown for the selected metric for all experiments included
+    const numberOfPointsPerExperiment = metricData.map((element) => {
+      return element[metricName]? element[metricName].x.length : 0;
+    });
+    const maxXVal = Math.max(...numberOfPointsPerExperiment);
+
+    // Create a dataset object for each experiment for this metric (@metricName)
+    let metricDatasets = metricData.map((element, index) => {
+      const experimentDesc = {
+        label: element.experimentId,
+        // Points are placed at their steps, since the downsampled series aren't evenly spaced
+        data: element[metricName]?
+          Array.from(element[metricName].x, (step, pointIndex) => ({ x: step, y: element[metricName].y[pointIndex] })) :
+          [{ x: 0, y: 0.0 }],
+        borderColor: colors[index % colors.length],
+        borderWidth: 1,
+      };
+      return experimentDesc;
+    });
 
-      // Draw the graphs
-      chartHandlers[metricName]["chart"].destroy();
-      chartHandlers[metricName]["chart"] = new Chart(
-        chartHandlers[metricName]["ctx"],
-        {
-          type: "line",
-          data: {
-            labels: xAxisLabels,
-            datasets: metricDatasets,
+    // Draw the graphs
+    chartHandlers[metricName].zoomed = metricData !== experimentData;
+    chartHandlers[metricName].stale = false;
+    chartHandlers[metricName]["chart"].destroy();
+    chartHandlers[metricName]["chart"] = new Chart(
+      chartHandlers[metricName]["ctx"],
+      {
+        type: "line",
+        data: {
+          datasets: metricDatasets,
+        },
+        options: {
+          responsive: true,
+          maintainAspectRatio: false,
+          animation: {
+            duration: 500,
           },
-          options: {
-            responsive: true,
-            maintainAspectRatio: false,
-            animation: {
-              duration: 500,
+          scales: {
+            x: {
+              type: "linear",
             },
-            scales: {
-              y: {
-                beginAtZero: true,
-              },
+            y: {
+              beginAtZero: true,
             },
+          },
 
-            elements: {
-              point: {
-                radius: maxXVal <= 25 ? 3 : 0, // Having circle points for large (dense) graph lines causes overhead
-              },
+          elements: {
+            point: {
+              radius: maxXVal <= 25 ? 3 : 0, // Having circle points for large (dense) graph lines causes overhead
             },
+          },
 
-            plugins: {
-              title: {
-                display: true,
-                text: metricName,
+          plugins: {
+            title: {
+              display: true,
+              text: metricName,
+            },
+            // Select a range of steps to zoom in, double click to zoom out
+            zoom: {
+              zoom: {
+                drag: {
+                  enabled: true,
+                },
+                mode: "x",
+                onZoomComplete: ({ chart }) => zoomMetricChart(metricName, chart),
               },
-              legend: {
-                display: true,
+            },
+            legend: {
+              display: true,
+            },
+            tooltip: {
+              displayColors: false,
+
+              // color settings
+              titleFontColor:  "rgb(255,255,255)",
+              bodyFontColor:   "rgb(255,255,255)",
+              footerFontColor: "rgb(255,255,255)",
+              footerFontStyle: "normal",
+              titleAlign:      "center",
+
+              // Adapt tooltip to color of the graph line
+              backgroundColor: function (item) {
+                return item.tooltip.labelColors[0].borderColor;
               },
-              tooltip: {
-                displayColors: false,
-
-                // color settings
-                titleFontColor:  "rgb(255,255,255)",
-                bodyFontColor:   "rgb(255,255,255)",
-                footerFontColor: "rgb(255,255,255)",
-                footerFontStyle: "normal",
-                titleAlign:      "center",
-
-                // Adapt tooltip to color of the graph line
-                backgroundColor: function (item) {
-                  return item.tooltip.labelColors[0].borderColor;
+
+              callbacks: {
+                // Display the value of the metric
+                title: function (item) {
+                  const y_ = parseFloat(item[0].parsed.y).toFixed(3);
+                  const titleRepresentation = `${metricName}: ${y_}`;
+                  return titleRepresentation;
+                },
+
+                // Display the time passed from the start of the experiment
+                label: function (item) {
+                  let relativeSeconds = parseFloat(
+                    metricData[item.datasetIndex][metricName].timestamp[item.dataIndex]
+                  ).toFixed(2);
+
+                  let relativeTime;
+                  if (relativeSeconds < 60) {
+                    relativeTime = relativeSeconds + "s";
+                  } else if (relativeSeconds < 3600) {
+                    relativeSeconds = Math.floor(relativeSeconds);
+                    const minutes = Math.floor(relativeSeconds / 60);
+                    const seconds = relativeSeconds % 60;
+                    relativeTime = `${minutes}m ${seconds}s`;
+                  } else {
+                    relativeSeconds = Math.floor(relativeSeconds);
+                    const hours = Math.floor(relativeSeconds / 3600);
+                    const remainingSeconds = relativeSeconds % 3600;
+                    const minutes = Math.floor(remainingSeconds / 60);
+                    const seconds = remainingSeconds % 60;
+                    relativeTime = `${hours}h ${minutes}m ${seconds}s`;
+                  }
+                  const logStep = item.parsed.x;
+                  labelRepresentation = `${relativeTime}  Step: ${logStep}`;
+                  return labelRepresentation;
                 },
 
-                callbacks: {
-                  // Display the value of the metric
-                  title: function (item) {
-                    const y_ = parseFloat(item[0].parsed.y).toFixed(3);
-                    const titleRepresentation = `${metricName}: ${y_}`;
-                    return titleRepresentation;
-                  },
-
-                  // Display the time passed from the start of the experiment
-                  label: function (item) {
-                    let relativeSeconds = parseFloat(
-                      metricData[item.datasetIndex][metricName].timestamp[item.dataIndex]
-                    ).toFixed(2);
-
-                    let relativeTime;
-                    if (relativeSeconds < 60) {
-                      relativeTime = relativeSeconds + "s";
-                    } else if (relativeSeconds < 3600) {
-                      relativeSeconds = Math.floor(relativeSeconds);
-                      const minutes = Math.floor(relativeSeconds / 60);
-                      const seconds = relativeSeconds % 60;
-                      relativeTime = `${minutes}m ${seconds}s`;
-                    } else {
-                      relativeSeconds = Math.floor(relativeSeconds);
-                      const hours = Math.floor(relativeSeconds / 3600);
-                      const remainingSeconds = relativeSeconds % 3600;
-                      const minutes = Math.floor(remainingSeconds / 60);
-                      const seconds = remainingSeconds % 60;
-                      relativeTime = `${hours}h ${minutes}m ${seconds}s`;
-                    }
-                    const logStep = item.parsed.x;
-                    labelRepresentation = `${relativeTime}  Step: ${logStep}`;
-                    return labelRepresentation;
-                  },
-
-                  // Display the id of the experiment
-                  footer: function (item) {
-                    return item[0].dataset["label"];
-                  },
+                // Display the id of the experiment
+                footer: function (item) {
+                  return item[0].dataset["label"];
                 },
               },
             },
           },
-        }
-      );
-    }
+        },
+      }
+    );
+    chartHandlers[metricName]["ctx"].canvas.ondblclick = () => populateMetricChart(experimentData, metricName);
   }
 
   init();
@@ -0,0 +1,115 @@
+/**
+ * Retrieval of metric series which the backend sends as packed binary columns (`format=bin`).
+ * Columns are viewed as typed arrays, so decoding a series doesn't create an object per point.
+ */
+
+const binarySeriesMagic = "MTSB";
+// Columns are sent in little-endian byte order, which typed arrays use on little-endian platforms only
+const littleEndianPlatform = new Uint8Array(new Uint16Array([1]).buffer)[0] === 1;
+
+/**
+ * Decodes the binary response into the columns of each metric.
+ *
+ * @param buffer ArrayBuffer with the response: a header (magic, version, number of series), followed by
+ *   each series (name length, reserved, number of points, padded name, steps, values and times columns)
+ * @returns Object mapping each metric name to its columns ({timestamp, x, y})
+ */
+function decodeBinarySeries(buffer) {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== binarySeriesMagic) {
+    throw new Error("Response doesn't contain binary series");
+  }
+  const numSeries = view.getUint16(6, true);
+  const textDecoder = new TextDecoder("utf-8");
+
+  let series = {};
+  let offset = 8;
+  for (let seriesIndex = 0; seriesIndex < numSeries; seriesIndex++) {
+    const nameLength = view.getUint16(offset, true);
+    const numPoints = view.getUint32(offset + 4, true);
+    offset += 8;
+    const metricName = textDecoder.decode(new Uint8Array(buffer, offset, nameLength));
+    // Columns start at a multiple of 8 bytes
+    offset += nameLength + ((8 - ((offset + nameLength) % 8)) % 8);
+
+    series[metricName] = {
+      x: readStepColumn(view, offset, numPoints),
+      y: readFloatColumn(view, offset + 8 * numPoints, numPoints),
+      timestamp: readFloatColumn(view, offset + 16 * numPoints, numPoints),
+    };
+    offset += 24 * numPoints;
+  }
+  return series;
+}
+
+/**
+ * Reads a column of float64 values, as a view of the response whenever the platform allows it.
+ */
+function readFloatColumn(view, offset, numPoints) {
+  if (littleEndianPlatform) {
+    return new Float64Array(view.buffer, offset, numPoints);
+  }
+  let column = new Float64Array(numPoints);
+  for (let i = 0; i < numPoints; i++) {
+    column[i] = view.getFloat64(offset + 8 * i, true);
+  }
+  return column;
+}
+
+/**
+ * Reads a column of int64 steps into a Float64Array, since Chart.js works with numbers rather than BigInts.
+ * Steps are exact as long as they don't exceed 2^53.
+ */
+function readStepColumn(view, offset, numPoints) {
+  let column = new Float64Array(numPoints);
+  if (littleEndianPlatform) {
+    const words = new Int32Array(view.buffer, offset, 2 * numPoints);
+    for (let i = 0; i < numPoints; i++) {
+      column[i] = words[2 * i + 1] * 4294967296 + (words[2 * i] >>> 0);
+    }
+    return column;
+  }
+  for (let i = 0; i < numPoints; i++) {
+    column[i] = view.getInt32(offset + 8 * i + 4, true) * 4294967296 + view.getUint32(offset + 8 * i, true);
+  }
+  return column;
+}
+
+/**
+ * Retrieves binary series from the backend.
+ * Requests are synchronous like the rest of the frontend, and synchronous requests can't ask for an ArrayBuffer,
+ * so the response is received as text with a charset which keeps every byte as is.
+ *
+ * @param url URL of a data endpoint, including the `format=bin` query parameter
+ * @returns Object mapping each metric name to its columns ({timestamp, x, y}), or null if the request failed
+ */
+function retrieveBinarySeries(url) {
+  const request = new XMLHttpRequest();
+  request.open("GET", url, false);
+  request.overrideMimeType("text/plain; charset=x-user-defined");
+  request.send();
+  if (request.status !== 200) {
+    return null;
+  }
+  const text = request.responseText;
+  let bytes = new Uint8Array(text.length);
+  for (let i = 0; i < text.length; i++) {
+    bytes[i] = text.charCodeAt(i) & 0xff;
+  }
+  return decodeBinarySeries(bytes.buffer);
+}
+
+/**
+ * Appends values to a column.
+ *
+ * @param column Float64Array column
+ * @param values Values to append
+ * @returns New column holding the values of both
+ */
+function appendToColumn(column, values) {
+  let extended = new Float64Array(column.length + values.length);
+  extended.set(column);
+  extended.set(values, column.length);
+  return extended;
+}
@@ -2,13 +2,19 @@ $(document).ready(function () {
   jQuery.ajaxSetup({ async: false });
 
   // Usage: Current state of the sweep UI
-  let currentSweepLogs;
+  let currentSweepId;
+  // Trials on the current page, each with its index in the sweep, run id, sampled hyperparameters and summary
+  let currentPageTrials = [];
   let currentSweepConfig;
   let currentMetricDisplayed;
   let earlyStopping = true;
 
   // Variables necessary for acquiring experiment data
   const sweep_id_url = "/get_sweep_data/";
+  const query_sweep_url = "/query_sweep/";
+  const metric_url = "/get_metric/";
+  // Series are downsampled by the backend, a chart can't show more points than it has pixels anyway
+  const maxChartPoints = 2000;
 
   // For selecting the data to display onto the chart
   let sidebarRadios = $(".radio-experiment");
@@ -39,6 +45,8 @@ $(document).ready(function () {
   const maxRunsPerPage = 5;
   let currentPage = 1;
   let totalRuns = 0;
+  // Field by which the trials are sorted by the backend, null for the order in which they were started
+  let currentSort = null;
   let prevRunsBtn = document.getElementById("prev-runs-btn");
   let nextRunsBtn = document.getElementById("next-runs-btn");
 
@@ -71,28 +79,15 @@ $(document).ready(function () {
         uncheckElements(sidebarRadios, i);
 
         // Retrieve data for the selected sweep
-        const experimentId = sidebarRadios[i].value;
-        const sweepData = retrieveSweepData(experimentId);
+        currentSweepId = sidebarRadios[i].value;
+        currentSort = null;
+        const sweepData = retrieveSweepData(currentSweepId);
 
         // Update current state of the retrieved sweep data
         currentSweepConfig = sweepData.sweepConfiguration;
-        currentSweepLogs = sweepData.sweepLogs;
         currentMetricDisplayed = currentSweepConfig["optimization_metric"];
         metricChoiceDropdown.value = currentMetricDisplayed;
-        earlyStopping = currentSweepLogs["optimization_metric"] != "/";
-
-        // Update the Number of pages monitor
-        totalRuns = currentSweepLogs.length;
-        maxPages = Math.floor(totalRuns / maxRunsPerPage);
-        maxPages += totalRuns % maxRunsPerPage == 0 ? 0 : 1;
-
-        // Not all sweeps need to have all metrics logged
-        currentSweepLogs.map((element) => {
-          if (!element.hasOwnProperty(currentMetricDisplayed)) {
-            element[currentMetricDisplayed] = [0.0];
-          }
-          return element;
-        });
+        earlyStopping = currentSweepConfig["optimization_metric"] != "/";
 
         populateTableHeader(
           Object.getOwnPropertyNames(currentSweepConfig["hyperparameters"]),
@@ -112,18 +107,8 @@ $(document).ready(function () {
   // Update the metric currently shown on the sweep graph
   metricChoiceDropdown.addEventListener("change", (event) => {
     currentMetricDisplayed = event.target.value;
-    // Some runs don't have the desired metric logged
-    currentSweepLogs.map((element) => {
-      if (!element.hasOwnProperty(currentMetricDisplayed)) {
-        element[currentMetricDisplayed] = [0.0];
-      }
-      return element;
-    });
-
-    const startIndex = (currentPage - 1) * maxRunsPerPage;
-    const endIndex = currentPage * maxRunsPerPage;
     populateSweepChart(
-      currentSweepLogs.slice(startIndex, endIndex),
+      retrievePageSeries(currentMetricDisplayed),
       currentMetricDisplayed
     );
   });
@@ -176,35 +161,66 @@ $(document).ready(function () {
     });
   }
 
-  /** 
-   * Extracts specific property from the given list of objects.
-   * This functionality is performed on a per object basis.
-   * 
-   * @param metricData List of different experiment logs
-   * @param propertyName Propery to extract from these experiment logs
-   */
-  function extractProperty(metricData, propertyName) {
-    return metricData.map((logEvent) => logEvent[propertyName]);
-  }
-
   /**
-   * Retrieves data for the selected sweep.
-   * This data was previously loaded by the backend.
+   * Retrieves the configuration of the selected sweep.
+   * Training runs are retrieved a page at a time, see retrievePage.
    * @param  {{string}} sweepId Id of the wanted sweep
    */
    function retrieveSweepData(sweepId) {
     let sweepConfiguration;
-    let sweepLogs;
 
-    $.get(`${sweep_id_url}/${sweepId}`, (retrievedData) => {
+    $.get(`${sweep_id_url}/${sweepId}?summaries=0`, (retrievedData) => {
       retrievedData = JSON.parse(retrievedData);
 
       // Configuration (description) of the sweep set-up
       sweepConfiguration = retrievedData["sweep_config"];
-      // Logs of the separate training runs
-      sweepLogs = retrievedData["experiment_data"];
     });
-    return { sweepConfiguration, sweepLogs };
+    return { sweepConfiguration };
+  }
+
+  /**
+   * Retrieves the training runs on the current page, sorted by the backend.
+   * Updates the number of pages, since the sweep might have started new training runs in the meantime.
+   */
+  function retrievePage() {
+    let query = { limit: maxRunsPerPage, offset: (currentPage - 1) * maxRunsPerPage };
+    if (currentSort) {
+      query.sort = currentSort;
+    }
+    $.get(`${query_sweep_url}${currentSweepId}?${$.param(query)}`, (retrievedData) => {
+      retrievedData = JSON.parse(retrievedData);
+      currentPageTrials = retrievedData["trials"];
+      totalRuns = retrievedData["total"];
+    });
+
+    // Update the Number of pages monitor
+    maxPages = Math.max(minPage, Math.ceil(totalRuns / maxRunsPerPage));
+    $(nextRunsBtn).prop("disabled", currentPage >= maxPages);
+  }
+
+  /**
+   * Retrieves the series of the metric for the training runs on the current page.
+   * Runs which didn't log the metric get an empty series, without asking the backend.
+   *
+   * @param metricToDisplay Metric whose series are retrieved
+   * @param seriesQuery Optional window of steps ({step_min, step_max}) to retrieve
+   */
+  function retrievePageSeries(metricToDisplay, seriesQuery = {}) {
+    // Series are sent as binary columns, which are read into typed arrays
+    const query = $.param({ max_points: maxChartPoints, format: "bin", ...seriesQuery });
+
+    let pageSeries = [];
+    for (const trial of currentPageTrials) {
+      const runSummary = trial["summary"];
+      let runSeries = null;
+      if (runSummary.hasOwnProperty("metrics") && runSummary["metrics"].hasOwnProperty(metricToDisplay)) {
+        runSeries = retrieveBinarySeries(
+          `${metric_url}${trial["run_id"]}/${encodeURIComponent(metricToDisplay)}?${query}`
+        );
+      }
+      pageSeries.push(runSeries? runSeries : {});
+    }
+    return pageSeries;
   }
 
   /**
@@ -213,31 +229,44 @@ $(document).ready(function () {
    * Training run = One hyperparameter combination
    */
   function updateRunsUI() {
-    const startIndex = (currentPage - 1) * maxRunsPerPage;
-    const endIndex = currentPage * maxRunsPerPage;
-
-    populateSelectedRunsInfo(
-      currentSweepConfig["sampled_hyperparameters"].slice(startIndex, endIndex)
-    );
+    retrievePage();
+    populateSelectedRunsInfo(currentPageTrials);
     populateSweepChart(
-      currentSweepLogs.slice(startIndex, endIndex),
+      retrievePageSeries(currentMetricDisplayed),
       currentMetricDisplayed
     );
   }
 
+  /**
+   * Sorts the training runs by the best value of the optimization metric, best runs first.
+   * Sorting again restores the order in which the training runs were started.
+   */
+  function toggleBestValueSort() {
+    const bestField = `metric.${currentSweepConfig["optimization_metric"]}.best`;
+    currentSort = currentSort ? null : (currentSweepConfig["optimization_goal"] == "max" ? `-${bestField}` : bestField);
+    currentPage = 1;
+    $(prevRunsBtn).prop("disabled", true);
+    populateTableHeader(
+      Object.getOwnPropertyNames(currentSweepConfig["hyperparameters"]),
+      currentSweepConfig["optimization_metric"]
+    );
+    updateRunsUI();
+  }
+
   /**
    * Retrieves the best value for the optimization metric.
    * It adapts to the optimization goal. 
    * 
-   * @param runIndex Index of the desired run in the logs of the selected sweep
+   * @param runSummary Summary of the desired run
    */
-   function getBestMetricValue(runIndex) {
-    let metricData = currentSweepLogs[runIndex][currentSweepConfig["optimization_metric"]];
-    if (metricData.length == 1) {
-      return (typeof metricData[0] == "number")? metricData[0] : "/";
+   function getBestMetricValue(runSummary) {
+    const metricToOptimize = currentSweepConfig["optimization_metric"];
+    if (!runSummary.hasOwnProperty("metrics") || !runSummary["metrics"].hasOwnProperty(metricToOptimize)) {
+      return "/";
     }
-    metricData = metricData.map((element) => element.value);
-    return currentSweepConfig["optimization_goal"] == "max"? Math.max(...metricData) : Math.min(...metricData);
+    // Best value according to the optimization goal is already part of the summary
+    const metricSummary = runSummary["metrics"][metricToOptimize];
+    return (typeof metricSummary["best"] == "number")? metricSummary["best"] : "/";
   }
             
   /**
@@ -260,8 +289,11 @@ $(document).ready(function () {
     if (earlyStopping) {
       // Best value of the metric to optimize
       let bestMetricValue = document.createElement("TH");
-      bestMetricValue.innerHTML = `Best ${metricToOptimize}`;
+      bestMetricValue.innerHTML = `Best ${metricToOptimize}` + (currentSort ? " &#9660;" : "");
       bestMetricValue.classList.add("table-header-item");
+      // Sorting is done by the backend, over all of the training runs of the sweep
+      bestMetricValue.style.cursor = "pointer";
+      bestMetricValue.onclick = toggleBestValueSort;
       tableHeaders.appendChild(bestMetricValue);
     }
      
@@ -279,20 +311,19 @@ $(document).ready(function () {
    * Populates the info regarding the separate training runs.
    * Displays only the data related to the selected page.
    * 
-   * @param sampledHyperparametersGroup Contains sampled values of hyperparameter
-   *   for each run on the selected page
+   * @param pageTrials Training runs on the selected page, with their sampled values of hyperparameters
    */
-  function populateSelectedRunsInfo(sampledHyperparametersGroup) {
+  function populateSelectedRunsInfo(pageTrials) {
     // Reset the table
     $("#runs-table").find("tr:not(:first)").remove();
-    const initIndex = (currentPage - 1) * maxRunsPerPage + 1;
-    sampledHyperparametersGroup.forEach((sampledHyperparameters, index) => {
+    pageTrials.forEach((trial) => {
+      const sampledHyperparameters = trial["hyperparameters"];
       // Descriptor of the run
       let runDesc = document.createElement("TR");
 
       // Run Number
       let runNum = document.createElement("TD");
-      runNum.innerHTML = `Run ${initIndex + index}`;
+      runNum.innerHTML = `Run ${trial["trial_index"] + 1}`;
       runNum.classList.add("run-desc-item");
       runDesc.appendChild(runNum);
 
@@ -301,11 +332,11 @@ $(document).ready(function () {
         let bestMetricValue = document.createElement("TD");
         // Optimization hyperparameter does not have to be a strin
         try {
-          let bestVal = getBestMetricValue(initIndex + index - 1);
+          let bestVal = getBestMetricValue(trial["summary"]);
           bestMetricValue.innerHTML = bestVal.toExponential(3);
           
         } catch {
-          bestMetricValue.innerHTML = getBestMetricValue(initIndex + index - 1);
+          bestMetricValue.innerHTML = getBestMetricValue(trial["summary"]);
         }
         bestMetricValue.classList.add("run-desc-item");
         runDesc.appendChild(bestMetricValue);
@@ -397,27 +428,55 @@ $(document).ready(function () {
    * @param metricToDisplay Metric to display on the graph
    */
   function populateSweepChart(sweepData, metricToDisplay) {
-    const initIndex = (currentPage - 1) * maxRunsPerPage + 1;
+    drawSweepChart(sweepData, metricToDisplay);
+    // Double click zooms out to the whole series
+    ctx.canvas.ondblclick = () => drawSweepChart(sweepData, metricToDisplay);
+  }
+
+  /**
+   * Re-retrieves the zoomed-in window of steps of the displayed metric for the runs on the current page.
+   * The narrower the window, the closer the retrieved series are to their full resolution.
+   *
+   * @param chart Zoomed chart
+   * @param metricToDisplay Metric displayed on the graph
+   */
+  function zoomSweepChart(chart, metricToDisplay) {
+    const seriesQuery = {
+      step_min: Math.floor(chart.scales.x.min),
+      step_max: Math.ceil(chart.scales.x.max),
+    };
+    drawSweepChart(retrievePageSeries(metricToDisplay, seriesQuery), metricToDisplay);
+  }
+
+  /**
+   * Draws the graph of the metric for the given runs.
+   *
+   * @param sweepData Logs of the separate training runs executed during sweep
+   * @param metricToDisplay Metric to display on the graph
+   */
+  function drawSweepChart(sweepData, metricToDisplay) {
+    const pageTrials = currentPageTrials;
     sweepChart.destroy();
 
-    // Extract only logs of the desired metric
+    // Extract only columns of the desired metric
     const relevantLogs = sweepData.map((sweepLog) => {
-      return sweepLog.hasOwnProperty(metricToDisplay)? sweepLog[metricToDisplay]: [];
+      return sweepLog.hasOwnProperty(metricToDisplay)? sweepLog[metricToDisplay]: null;
     });
-    // Extract the maximum timestep reached for the selected metric for selected runs
-    const maxXVal = Math.max(...relevantLogs.map((element) => element.length));
-    // Define x-axis for the graph
-    const xAxisLabels = [...Array(maxXVal).keys()];
+    // Extract the maximum number of points shown for the selected metric for selected runs
+    const maxXVal = Math.max(...relevantLogs.map((element) => element? element.x.length : 0));
 
     // Create a dataset object for each experiment for this metric (@metricToDisplay)
     let metricDatasets = relevantLogs.map((run, index) => {
-      if (relevantLogs[index].length == 0) {
+      if (!run || run.x.length == 0) {
         return;
       }
 
       const experimentDesc = {
-        label: `Run ${initIndex + index}`,
-        data: extractProperty(run, "value"),
+        label: `Run ${pageTrials[index]["trial_index"] + 1}`,
+        // Runs without the metric have no dataset, so each dataset remembers its run
+        runIndex: index,
+        // Points are placed at their steps, since the downsampled series aren't evenly spaced
+        data: Array.from(run.x, (step, pointIndex) => ({ x: step, y: run.y[pointIndex] })),
         borderColor: colors[index % colors.length],
         borderWidth: 1,
       };
@@ -429,7 +488,6 @@ $(document).ready(function () {
     sweepChart = new Chart(ctx, {
       type: "line",
       data: {
-        labels: xAxisLabels,
         datasets: metricDatasets,
       },
       options: {
@@ -439,6 +497,9 @@ $(document).ready(function () {
           duration: 500,
         },
         scales: {
+          x: {
+            type: "linear",
+          },
           y: {
             beginAtZero: true,
           },
@@ -454,6 +515,16 @@ $(document).ready(function () {
             display: true,
             text: metricToDisplay,
           },
+          // Select a range of steps to zoom in, double click to zoom out
+          zoom: {
+            zoom: {
+              drag: {
+                enabled: true,
+              },
+              mode: "x",
+              onZoomComplete: ({ chart }) => zoomSweepChart(chart, metricToDisplay),
+            },
+          },
           legend: {
             display: true,
           },
@@ -483,7 +554,7 @@ $(document).ready(function () {
               // Display the time passed from the start of the experiment
               label: function (item) {
                 let relativeSeconds = parseFloat(
-                    sweepData[item.datasetIndex][metricToDisplay][item.dataIndex].time
+                    sweepData[item.dataset.runIndex][metricToDisplay].timestamp[item.dataIndex]
                 ).toFixed(2);
 
                 let relativeTime;
@@ -0,0 +1,133 @@
+import os
+import threading
+
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+
+from ml_tracking_ops.experiment.log_format import FILE_HEADER, read_scalar_series_from
+
+
+class LogFileEventHandler(FileSystemEventHandler):
+    """Notifies the tailer whenever a log file is created or appended to."""
+
+    def __init__(self, tailer):
+        """Initializes the module.
+
+        Arguments:
+            tailer: Tailer which is notified about the changed log files
+        """
+        self._tailer = tailer
+
+    def on_created(self, event):
+        self._tailer.notify(event.src_path)
+
+    def on_modified(self, event):
+        self._tailer.notify(event.src_path)
+
+    def on_moved(self, event):
+        self._tailer.notify(event.dest_path)
+
+
+class LogTailer:
+    """Follows segment log files which are still being written to.
+
+    Directories of the followed log files are watched with watchdog, so a follower wakes up
+    as soon as a flush of a metric buffer lands. Each follower keeps its own read offset,
+    so only the newly appended segments are decoded.
+    """
+
+    # Seconds after which a follower reports that nothing was appended
+    HEARTBEAT_INTERVAL = 15.0
+
+    def __init__(self):
+        """Initializes the module."""
+        self._observer = Observer()
+        self._observer.daemon = True
+        self._observer.start()
+        self._watched_dirs = set()
+        # Log file path -> set of events which wake up its followers
+        self._followers = {}
+        self._lock = threading.Lock()
+
+    def notify(self, path: str):
+        """Wakes up the followers of the log file."""
+        with self._lock:
+            for wakeup in self._followers.get(os.path.abspath(path), ()):
+                wakeup.set()
+
+    def follow(self, log_file_path: str, since_step: int = None, offset: int = 0):
+        """Follows the log file.
+
+        Arguments:
+            log_file_path: Segment log file to follow. It doesn't need to exist yet
+            since_step: Only points logged after this step are yielded. If None, every point is yielded
+            offset: Offset of the segment from which the log file is followed. If 0, it is followed from its beginning
+
+        Yields:
+            Dictionary mapping each metric name to a tuple of (steps, values, times) of the newly appended points,
+            or None if nothing was appended during the last @HEARTBEAT_INTERVAL seconds
+        """
+        log_file_path = os.path.abspath(log_file_path)
+        wakeup = self._add_follower(log_file_path)
+        inode = os.stat(log_file_path).st_ino if offset else None
+        # Metric name -> last step yielded, so a replaced log file doesn't yield the same points twice
+        last_steps = {}
+        try:
+            while True:
+                wakeup.clear()
+                new_series = {}
+                stat = os.stat(log_file_path) if os.path.exists(log_file_path) else None
+                if stat is not None and stat.st_size >= FILE_HEADER.size:
+                    # Log file was replaced, so it is read again from its beginning
+                    if stat.st_ino != inode or stat.st_size < offset:
+                        offset, inode = 0, stat.st_ino
+                    new_series, offset = read_scalar_series_from(log_file_path, offset)
+
+                new_series = self._select_new_points(new_series, last_steps, since_step)
+                if new_series:
+                    yield new_series
+                elif not wakeup.wait(self.HEARTBEAT_INTERVAL):
+                    yield None
+        finally:
+            self._remove_follower(log_file_path, wakeup)
+
+    def _select_new_points(self, series: dict, last_steps: dict, since_step: int):
+        """Selects the points of each metric logged after the last step yielded for that metric.
+
+        Arguments:
+            series: Newly read series of each metric
+            last_steps: Last step yielded for each metric, updated with the selected points
+            since_step: Step after which points of the metrics which weren't yielded yet are selected
+        """
+        selected_series = {}
+        for metric_name, (steps, values, times) in series.items():
+            last_step = last_steps.get(metric_name, since_step)
+            if last_step is not None and min(steps) <= last_step:
+                indices = [idx for idx, step in enumerate(steps) if step > last_step]
+                if not indices:
+                    continue
+                steps = [steps[idx] for idx in indices]
+                values = [values[idx] for idx in indices]
+                times = [times[idx] for idx in indices]
+            selected_series[metric_name] = (steps, values, times)
+            last_steps[metric_name] = max(steps) if last_step is None else max(last_step, max(steps))
+        return selected_series
+
+    def _add_follower(self, log_file_path: str):
+        """Registers a new follower of the log file and starts watching its directory."""
+        wakeup = threading.Event()
+        log_dir = os.path.dirname(log_file_path)
+        with self._lock:
+            if log_dir not in self._watched_dirs:
+                self._observer.schedule(LogFileEventHandler(self), log_dir, recursive=False)
+                self._watched_dirs.add(log_dir)
+            self._followers.setdefault(log_file_path, set()).add(wakeup)
+        return wakeup
+
+    def _remove_follower(self, log_file_path: str, wakeup: threading.Event):
+        """Unregisters the follower of the log file."""
+        with self._lock:
+            followers = self._followers[log_file_path]
+            followers.discard(wakeup)
+            if not followers:
+                del self._followers[log_file_path]
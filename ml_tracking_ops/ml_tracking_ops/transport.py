@@ -0,0 +1,65 @@
+import gzip
+import struct
+
+import numpy as np
+
+
+BINARY_MIMETYPE = "application/octet-stream"
+BINARY_MAGIC = b"MTSB"
+BINARY_VERSION = 1
+# Response header: magic, version, number of series
+BINARY_HEADER = struct.Struct("<4sHH")
+# Series header: metric name length, reserved, number of points
+BINARY_SERIES_HEADER = struct.Struct("<HHI")
+# Columns are aligned to 8 bytes, so the client can view them as typed arrays without copying
+COLUMN_ALIGNMENT = 8
+
+# Responses smaller than this aren't worth compressing
+MIN_COMPRESSED_SIZE = 1024
+
+
+def encode_series_binary(series: dict):
+    """Encodes the series of several metrics as packed little-endian column blocks.
+
+    The response starts with a header (magic "MTSB", version, number of series). Each series follows as
+    a series header (metric name length, reserved, number of points), the UTF-8 metric name padded
+    with zeros to a multiple of 8 bytes, and its steps (int64), values (float64) and relative times (float64) columns.
+
+    Arguments:
+        series: Metric names along with their according (steps, values, times) columns
+    """
+    blocks = [BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(series))]
+    for metric_name, (steps, values, times) in series.items():
+        name_bytes = metric_name.encode("utf-8")
+        padding = -(BINARY_SERIES_HEADER.size + len(name_bytes)) % COLUMN_ALIGNMENT
+        blocks += [
+            BINARY_SERIES_HEADER.pack(len(name_bytes), 0, len(steps)),
+            name_bytes,
+            bytes(padding),
+            np.asarray(steps).astype("<i8").tobytes(),
+            np.asarray(values).astype("<f8").tobytes(),
+            np.asarray(times).astype("<f8").tobytes()
+        ]
+    return b"".join(blocks)
+
+
+def compress_response(response, accept_encoding, compression_level: int = 6):
+    """Compresses the body of the response with gzip if the client accepts it.
+
+    Streamed responses and small responses are left as they are.
+
+    Arguments:
+        response: Response of the web app
+        accept_encoding: Encodings accepted by the client, as parsed by Flask from the Accept-Encoding header
+        compression_level: Level of the gzip compression, from 1 (fastest) to 9 (smallest)
+    """
+    if response.direct_passthrough or response.is_streamed or "Content-Encoding" in response.headers \
+            or "gzip" not in accept_encoding or response.status_code != 200:
+        return response
+    body = response.get_data()
+    if len(body) < MIN_COMPRESSED_SIZE:
+        return response
+    response.set_data(gzip.compress(body, compression_level))
+    response.headers["Content-Encoding"] = "gzip"
+    response.headers.add("Vary", "Accept-Encoding")
+    return response
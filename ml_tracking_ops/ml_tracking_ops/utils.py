@@ -1,6 +1,30 @@
+import os
 import json
+import mmap
 import pickle
 import base64
+import struct
+
+from array import array
+
+import numpy as np
+
+from ml_tracking_ops.experiment.journal import TrialJournal
+from ml_tracking_ops.experiment.log_format import FILE_HEADER, is_segment_log, read_scalar_series, scan_segments, \
+    read_metric_series, read_metric_summary
+from ml_tracking_ops.experiment.shards import is_shard_file
+from ml_tracking_ops.experiment.summary import MetricSummary
+
+
+# Column files hold the decoded series of a single metric as fixed-size little-endian records,
+# so the series can be memory-mapped and viewed as NumPy columns without being copied
+COLUMN_FILE_MAGIC = b"MTOPSCOL"
+COLUMN_FILE_VERSION = 1
+# Header: magic, version, reserved, number of points, version of the log file from which the points were decoded
+COLUMN_FILE_HEADER = struct.Struct("<8sIIqqq")
+# Header is padded, so the records are aligned to their size
+COLUMN_FILE_HEADER_SIZE = 48
+COLUMN_RECORD_DTYPE = np.dtype([("step", "<i8"), ("value", "<f8"), ("time", "<f8")])
 
 
 def get_all_metrics(experiment_logs_data):
@@ -19,11 +43,254 @@ def decode_experiment_log(binarized_series):
     return decoded_series_json
 
 
-def load_and_decode_experiment_log(log_file_path: str):
-    """Opens and decodes bynary encoding of the log data stored in the specified path."""
+def decode_scalar_series(steps, values, times):
+    """Converts step, value and time columns into the event form used by the frontend."""
+    return [
+        {"value": value, "step": step, "time": time_}
+            for step, value, time_ in zip(steps, values, times)
+    ]
+
+
+def load_experiment_columns(log_file_path: str):
+    """Opens the log file stored in the specified path and decodes it into columns.
+
+    Both the append-only segment log format and the legacy JSON log format are supported.
+
+    Returns:
+        Dictionary mapping each metric name to a tuple of (steps, values, times) arrays
+    """
+    if is_segment_log(log_file_path):
+        return read_scalar_series(log_file_path)
+
     with open(log_file_path, "r") as f:
         log_data = json.load(f)
-        decoded_logs = {
-            metric_name: decode_experiment_log(value_series) for metric_name, value_series in log_data.items()
-        }
-    return decoded_logs
+    experiment_columns = {}
+    for metric_name, value_series in log_data.items():
+        events = decode_experiment_log(value_series)
+        experiment_columns[metric_name] = (
+            array("q", [event["step"] for event in events]),
+            array("d", [event["value"] for event in events]),
+            array("d", [event["time"] for event in events])
+        )
+    return experiment_columns
+
+
+def load_metric_directory(log_file_path: str):
+    """Lists the segments of each metric stored in the segment log file, without decoding any of them."""
+    with open(log_file_path, "rb") as f:
+        f.seek(FILE_HEADER.size)
+        return scan_segments(f)
+
+
+def load_metric_columns(log_file_path: str, metric_name: str):
+    """Opens the log file and decodes only the series of a single metric.
+
+    Returns:
+        Tuple of (steps, values, times) arrays
+    """
+    if not is_segment_log(log_file_path):
+        return load_experiment_columns(log_file_path)[metric_name]
+
+    metric_segments = load_metric_directory(log_file_path)[metric_name]
+    with open(log_file_path, "rb") as f:
+        return read_metric_series(f, metric_segments)
+
+
+def summarize_columns(steps, values):
+    """Summarizes already decoded columns of a metric in the same form as read_metric_summary.
+
+    Extremes are found by NumPy reductions, which run directly on the pages of memory-mapped columns.
+    """
+    if len(values) == 0:
+        return {"count": 0, "min": None, "max": None, "last": None, "last_step": None}
+    values = np.asarray(values)
+    # NaN is never the minimum nor the maximum, and fmin and fmax return NaN only if every value is NaN
+    minimum, maximum = float(np.fmin.reduce(values)), float(np.fmax.reduce(values))
+    return {
+        "count": len(values),
+        "min": None if minimum != minimum else minimum,
+        "max": None if maximum != maximum else maximum,
+        "last": float(values[-1]),
+        "last_step": int(steps[-1])
+    }
+
+
+def merge_columns_by_step(shard_columns: list):
+    """Merges the columns which several writers logged for the same metric into a single series ordered by step.
+
+    Points of different writers logged at the same step keep the order of the shards.
+
+    Arguments:
+        shard_columns: Tuples of (steps, values, times) columns, one for each shard
+
+    Returns:
+        Tuple of (steps, values, times) NumPy arrays
+    """
+    steps, values, times = (
+        np.concatenate([np.asarray(columns[column_idx]) for columns in shard_columns]) for column_idx in range(3)
+    )
+    order = np.argsort(steps, kind="stable")
+    return steps[order], values[order], times[order]
+
+
+def merge_metric_summaries(summaries: list):
+    """Merges the summaries of a metric which several writers logged, as produced by read_metric_summary."""
+    summaries = [summary for summary in summaries if summary["count"]]
+    if not summaries:
+        return {"count": 0, "min": None, "max": None, "last": None, "last_step": None}
+    last = max(summaries, key=lambda summary: summary["last_step"])
+    # NaN is never the minimum nor the maximum, and writers which logged only NaN values have no extremes
+    minima, maxima = (
+        [extreme for extreme in (summary[key] for summary in summaries) if extreme is not None and extreme == extreme]
+            for key in ("min", "max")
+    )
+    return {
+        "count": sum(summary["count"] for summary in summaries),
+        "min": min(minima) if minima else None,
+        "max": max(maxima) if maxima else None,
+        "last": last["last"],
+        "last_step": last["last_step"]
+    }
+
+
+def summarize_metric_columns(steps, values, times, goal: str = "min"):
+    """Builds the rolling summary of a metric from its already decoded columns, using NumPy reductions.
+
+    Arguments:
+        steps, values, times: Columns of the metric, e.g. views of a column file
+        goal: "min" or "max", depending on whether the best value of the metric is its minimum or its maximum
+    """
+    summary = MetricSummary(goal)
+    summary.count = len(values)
+    if summary.count == 0:
+        return summary
+    values = np.asarray(values)
+    summary.last, summary.last_step, summary.wall_time = float(values[-1]), int(steps[-1]), float(times[-1])
+    # NaN is never the minimum nor the maximum
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid):
+        min_idx = valid[np.argmin(values[valid])]
+        max_idx = valid[np.argmax(values[valid])]
+        summary.min, summary.min_step = float(values[min_idx]), int(steps[min_idx])
+        summary.max, summary.max_step = float(values[max_idx]), int(steps[max_idx])
+    return summary
+
+
+def read_column_file_header(column_file_path: str):
+    """Reads the header of the column file.
+
+    Returns:
+        Tuple of (number of points, version of the log file from which they were decoded),
+        or None if the column file doesn't exist or isn't complete
+    """
+    try:
+        with open(column_file_path, "rb") as f:
+            header = f.read(COLUMN_FILE_HEADER.size)
+            file_size = os.fstat(f.fileno()).st_size
+    except FileNotFoundError:
+        return None
+    if len(header) < COLUMN_FILE_HEADER.size:
+        return None
+    magic, version, _, num_points, *source_version = COLUMN_FILE_HEADER.unpack(header)
+    if magic != COLUMN_FILE_MAGIC or version != COLUMN_FILE_VERSION or \
+            file_size < COLUMN_FILE_HEADER_SIZE + num_points * COLUMN_RECORD_DTYPE.itemsize:
+        return None
+    return num_points, tuple(source_version)
+
+
+def _encode_column_records(columns: tuple):
+    steps, values, times = columns
+    records = np.empty(len(steps), dtype=COLUMN_RECORD_DTYPE)
+    records["step"], records["value"], records["time"] = steps, values, times
+    return records.tobytes()
+
+
+def _encode_column_file_header(num_points: int, source_version: tuple):
+    header = COLUMN_FILE_HEADER.pack(COLUMN_FILE_MAGIC, COLUMN_FILE_VERSION, 0, num_points, *source_version)
+    return header + bytes(COLUMN_FILE_HEADER_SIZE - len(header))
+
+
+def write_column_file(column_file_path: str, columns: tuple, source_version: tuple):
+    """Writes the decoded series of a metric into a new column file, replacing the existing one atomically.
+
+    Arguments:
+        column_file_path: Path of the column file
+        columns: Tuple of (steps, values, times) columns of the metric
+        source_version: Pair of integers identifying the version of the log file from which the columns were decoded
+    """
+    tmp_path = f"{column_file_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_encode_column_file_header(len(columns[0]), source_version))
+        f.write(_encode_column_records(columns))
+    os.replace(tmp_path, column_file_path)
+
+
+def map_column_file(column_file_path: str, num_points: int):
+    """Memory-maps the column file and views its series as read-only NumPy columns, without copying them.
+
+    Only the pages which are actually touched (e.g. by slicing or downsampling) are read from the disk,
+    so the resident memory depends on the points being used rather than on the size of the series.
+
+    Arguments:
+        column_file_path: Path of the column file
+        num_points: Number of points to map, as read by read_column_file_header
+
+    Returns:
+        Tuple of (steps, values, times) read-only NumPy views
+    """
+    with open(column_file_path, "rb") as f:
+        # Mapping stays valid after the file is closed, and the views keep it alive
+        mapped = mmap.mmap(
+            f.fileno(), COLUMN_FILE_HEADER_SIZE + num_points * COLUMN_RECORD_DTYPE.itemsize, access=mmap.ACCESS_READ
+        )
+    records = np.frombuffer(mapped, dtype=COLUMN_RECORD_DTYPE, count=num_points, offset=COLUMN_FILE_HEADER_SIZE)
+    return records["step"], records["value"], records["time"]
+
+
+def load_metric_summary(log_file_path: str, metric_name: str):
+    """Opens the log file and summarizes a single metric (count, min, max, last value and last step).
+
+    Only the values of the metric itself are read from segment log files.
+    """
+    if not is_segment_log(log_file_path):
+        steps, values, _ = load_experiment_columns(log_file_path)[metric_name]
+        return summarize_columns(steps, values)
+
+    metric_segments = load_metric_directory(log_file_path)[metric_name]
+    with open(log_file_path, "rb") as f:
+        return read_metric_summary(f, metric_segments)
+
+
+def decode_experiment_columns(experiment_columns: dict):
+    """Converts the columns of each metric into the event form used by the frontend."""
+    return {
+        metric_name: decode_scalar_series(*columns) for metric_name, columns in experiment_columns.items()
+    }
+
+
+def load_and_decode_experiment_log(log_file_path: str):
+    """Opens and decodes bynary encoding of the log data stored in the specified path."""
+    return decode_experiment_columns(load_experiment_columns(log_file_path))
+
+
+def get_sweep_trials(sweep_dir_abs: str):
+    """Retrieves the sampled hyperparameters and the log file path of each trial of the sweep.
+
+    Trials are ordered by their id. Sweeps started before the trial journal was introduced
+    keep the sampled hyperparameters in the sweep configuration file, in which case None is returned for them.
+
+    Returns:
+        Tuple of (list of sampled hyperparameters or None, list of log file paths)
+    """
+    journal = TrialJournal(sweep_dir_abs)
+    if not journal.exists():
+        log_files = sorted(
+            fname for fname in os.listdir(sweep_dir_abs) if fname.endswith(".dat") and not is_shard_file(fname)
+        )
+        return None, [os.path.join(sweep_dir_abs, fname) for fname in log_files]
+
+    _, started_trials, _ = journal.replay()
+    trial_ids = sorted(started_trials)
+    sampled_hyperparameters = [started_trials[trial_id]["params"] for trial_id in trial_ids]
+    log_file_paths = [os.path.join(sweep_dir_abs, f"trial-{trial_id:05d}.dat") for trial_id in trial_ids]
+    return sampled_hyperparameters, log_file_paths
@@ -14,7 +14,7 @@ NAME = "ml_tracking_ops"
 AUTHOR = "Senad Kurtiši"
 VERSION = "0.0.1"
 LICENCE = "MIT"
-PACKAGES = ["ml_tracking_ops", 'ml_tracking_ops.experiment', 'ml_tracking_ops.ml_tracking_ops']
+PACKAGES = ["ml_tracking_ops", 'ml_tracking_ops.experiment', 'ml_tracking_ops.ml_tracking_ops', 'ml_tracking_ops.bench']
 
 DESCRIPTION = 'ML-Ops-Tracking: An ML Ops library which enables tracking and visualizing machine learning experiments '
 LONG_DESCRIPTION = read("README.md")
@@ -0,0 +1,38 @@
+import pytest
+
+from ml_tracking_ops.ml_tracking_ops.catalog import RunCatalog
+
+
+@pytest.fixture
+def catalog():
+    run_catalog = RunCatalog()
+    run_catalog._store_trial(
+        "sweep", 0, "sweep:trial-00000", "v", {"lr": 0.1},
+        {"wall_time": 1.0, "metrics": {"loss": {"count": 1, "min": 0.5, "max": 0.5, "last": 0.5, "best": 0.5}}}
+    )
+    return run_catalog
+
+
+@pytest.mark.parametrize("sort", [
+    "metric.loss.min; DROP TABLE trials",
+    "metric.loss",
+    "unknown"
+])
+def test_invalid_sort_is_rejected(catalog, sort):
+    with pytest.raises(ValueError):
+        catalog.query_trials("sweep", sort=sort)
+
+
+@pytest.mark.parametrize("condition", [
+    ("metric.loss.min) OR (1", "eq", "0"),
+    ("metric.loss.min", "= 0 OR 1 =", "0")
+])
+def test_invalid_filter_is_rejected(catalog, condition):
+    with pytest.raises(ValueError):
+        catalog.query_trials("sweep", filters=[condition])
+    assert catalog.query_trials("sweep")["total"] == 1
+
+
+def test_valid_query(catalog):
+    page = catalog.query_trials("sweep", filters=[("hp.lr", "ge", "0.1")], sort="-metric.loss.best")
+    assert page["total"] == 1 and page["trials"][0]["run_id"] == "sweep:trial-00000"
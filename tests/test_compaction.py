@@ -0,0 +1,63 @@
+import os
+import time
+
+import pytest
+
+from ml_tracking_ops.experiment.logger import ExperimentLogger
+from ml_tracking_ops.ml_tracking_ops import compaction
+from ml_tracking_ops.ml_tracking_ops.compaction import compact_logdir, start_compaction_policy
+
+
+def log_old_run(logdir, run_name):
+    logger = ExperimentLogger(logdir=logdir, run_name=run_name, max_events=10)
+    for step in range(1000):
+        logger.add_scalar("loss", 1 / (step + 1), step)
+    logger._clean_up()
+    log_file_path = os.path.join(logdir, run_name, f"{run_name}.dat")
+    old_time = time.time() - 60 * 24 * 3600
+    os.utime(log_file_path, (old_time, old_time))
+    return log_file_path
+
+
+def test_failed_log_file_does_not_stop_compaction(tmp_path, monkeypatch):
+    broken_path = log_old_run(str(tmp_path), "broken")
+    healthy_path = log_old_run(str(tmp_path), "healthy")
+    compact_log_file = compaction.compact_log_file
+
+    def compact_log_file_or_fail(log_file_path, *args):
+        if log_file_path == broken_path:
+            raise PermissionError(f"Permission denied: '{log_file_path}'")
+        return compact_log_file(log_file_path, *args)
+
+    monkeypatch.setattr(compaction, "compact_log_file", compact_log_file_or_fail)
+    report = compact_logdir(str(tmp_path))
+
+    assert [entry["path"] for entry in report["compacted"]] == [healthy_path]
+    assert [entry["path"] for entry in report["failed"]] == [broken_path]
+    assert report["failed"][0]["error"].startswith("PermissionError")
+
+
+def test_compaction_policy_survives_failed_compaction(tmp_path, monkeypatch, capsys):
+    calls = []
+
+    def compact_logdir_and_fail(logdir, **compaction_settings):
+        calls.append(logdir)
+        raise ValueError("Corrupt segment")
+
+    monkeypatch.setattr(compaction, "compact_logdir", compact_logdir_and_fail)
+    timer = start_compaction_policy(str(tmp_path), 0.01)
+    deadline = time.time() + 5
+    while len(calls) < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    timer.cancel()
+
+    assert len(calls) >= 3
+    assert "Corrupt segment" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("bucket_steps", [0, -10])
+def test_invalid_bucket_steps_are_rejected(tmp_path, bucket_steps):
+    with pytest.raises(ValueError):
+        compact_logdir(str(tmp_path), bucket_steps=bucket_steps)
+    with pytest.raises(ValueError):
+        start_compaction_policy(str(tmp_path), 3600, bucket_steps=bucket_steps)
@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from ml_tracking_ops.experiment.experiment_tracking import HyperparameterSweep
+from ml_tracking_ops.experiment.journal import TrialJournal
+from ml_tracking_ops.experiment.sampler import Uniform
+
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TRIAL_SCRIPT = """
+import sys
+import time
+from argparse import ArgumentParser
+from ml_tracking_ops.experiment.logger import ExperimentLogger
+
+parser = ArgumentParser()
+parser.add_argument("--logdir", type=str)
+parser.add_argument("--lr", type=float)
+parser.add_argument("--sleep", type=float, default=0)
+cfg = parser.parse_args()
+if cfg.sleep:
+    print("started", flush=True)
+    time.sleep(cfg.sleep)
+logger = ExperimentLogger(cfg.logdir)
+for step in range(3):
+    logger.add_scalar("acc", cfg.lr * step, step)
+"""
+
+
+@pytest.fixture
+def script_path(tmp_path):
+    path = tmp_path / "trial.py"
+    path.write_text(TRIAL_SCRIPT)
+    return str(path)
+
+
+def create_sweep(script_path, logdir, **kwargs):
+    return HyperparameterSweep(
+        script_name=script_path,
+        hyperparameters={"lr": Uniform(0.1, 1.0)},
+        max_runs=2,
+        logdir=logdir,
+        optimization_metric=None,
+        worker_env={"PYTHONPATH": PACKAGE_ROOT},
+        seed=0,
+        **kwargs
+    )
+
+
+def test_final_metric_is_recorded_without_early_stopping(tmp_path, script_path):
+    sweep = create_sweep(script_path, str(tmp_path / "runs"), final_metric="acc")
+    sweep.run()
+
+    _, started_trials, finished_trials = TrialJournal(sweep._logdir).replay()
+    assert sorted(finished_trials) == [0, 1]
+    for trial_id, record in finished_trials.items():
+        assert record["exit_status"] == 0
+        assert record["final_metric"] == pytest.approx(2 * started_trials[trial_id]["params"]["lr"])
+
+
+def test_resume_is_refused_while_trial_is_still_running(tmp_path, script_path):
+    sweep = create_sweep(script_path, str(tmp_path / "runs"))
+    journal = TrialJournal(sweep._logdir)
+    orphan = subprocess.Popen(
+        [sys.executable, script_path, "--logdir", str(tmp_path), "--sleep", "30"], stdout=subprocess.PIPE,
+        env={**os.environ, "PYTHONPATH": PACKAGE_ROOT}
+    )
+    try:
+        # Until the script starts, the process still runs the command line of the test
+        assert orphan.stdout.readline() == b"started\n"
+        journal.append({"event": "start", "trial_id": 0, "params": {"lr": 0.5}, "pid": orphan.pid, "start_time": 0})
+        with pytest.raises(RuntimeError, match="still running"):
+            create_sweep(script_path, str(tmp_path / "runs"), resume_dir=sweep._logdir)
+    finally:
+        orphan.kill()
+        orphan.communicate()
+
+    resumed = create_sweep(script_path, str(tmp_path / "runs"), resume_dir=sweep._logdir)
+    assert resumed._pending_trials == [0]
@@ -0,0 +1,58 @@
+import base64
+import glob
+import json
+import os
+import pickle
+
+import pytest
+
+from ml_tracking_ops.experiment.logger import ExperimentLogger
+from ml_tracking_ops.ml_tracking_ops.index import RunIndex
+
+
+def test_segment_log_columns_are_not_copied_into_column_files(tmp_path):
+    logger = ExperimentLogger(logdir=str(tmp_path), run_name="run", async_logging=False)
+    for step in range(5):
+        logger.add_scalar("loss", 1 / (step + 1), step)
+    logger._clean_up()
+    log_file_path, = glob.glob(os.path.join(str(tmp_path), "run", "*.dat"))
+
+    index = RunIndex(str(tmp_path), persist=True)
+    steps, values, _ = index.get_metric_columns(log_file_path, "loss")
+
+    assert list(steps) == list(range(5))
+    assert values[-1] == 0.2
+    column_dir = os.path.join(str(tmp_path), RunIndex.INDEX_DIR_NAME, RunIndex.COLUMN_DIR_NAME)
+    assert not glob.glob(os.path.join(column_dir, "*" + RunIndex.COLUMN_FILE_EXTENSION))
+
+
+def test_live_segment_log_is_persisted_in_batches(tmp_path):
+    logger = ExperimentLogger(logdir=str(tmp_path), run_name="run", log_interval=60)
+    log_file_path = os.path.join(str(tmp_path), "run", "run.dat")
+    index = RunIndex(str(tmp_path), persist=True)
+    for step in range(5):
+        logger.add_scalar(f"metric_{step}", 0.5, step)
+        logger._dump_all()
+        assert index.get_metric_names(log_file_path) == [f"metric_{idx}" for idx in range(step + 1)]
+    logger._clean_up()
+    assert index._db.total_changes == 0
+
+    index.flush()
+    assert index._db.total_changes == 1
+    restarted_index = RunIndex(str(tmp_path), persist=True)
+    assert restarted_index._metric_names[log_file_path][2] == [f"metric_{idx}" for idx in range(5)]
+
+
+@pytest.mark.parametrize("persist", [False, True])
+def test_legacy_log_metric_is_returned_when_cache_is_small(tmp_path, monkeypatch, persist):
+    log_file_path = os.path.join(str(tmp_path), "exp", "run.dat")
+    os.makedirs(os.path.dirname(log_file_path))
+    events = [json.dumps({"step": step, "value": step / 2, "time": 0.0}).encode() for step in range(300)]
+    with open(log_file_path, "w") as f:
+        json.dump({f"m{idx}": base64.b64encode(pickle.dumps(events)).decode() for idx in range(5)}, f)
+    monkeypatch.setattr(RunIndex, "MAX_MAPPED_SERIES", 1)
+
+    index = RunIndex(str(tmp_path), memory_cap=30000, persist=persist)
+    steps, values, _ = index.get_metric_columns(log_file_path, "m0")
+
+    assert len(steps) == 300 and values[-1] == 149.5
@@ -0,0 +1,86 @@
+import os
+import time
+
+import pytest
+
+from ml_tracking_ops.experiment.logger import ExperimentLogger
+from ml_tracking_ops.experiment.shards import MetricAggregator, AggregationClient
+from ml_tracking_ops.ml_tracking_ops.utils import load_experiment_columns
+
+
+def test_batch_is_kept_until_writer_0_advertises_aggregator(tmp_path):
+    log_file_path = os.path.join(str(tmp_path), "run.dat")
+    client = AggregationClient(log_file_path, writer_id=1)
+    client.add("loss", 0, 1.0, 0.0)
+    start = time.monotonic()
+    client.collect()
+    assert time.monotonic() - start < 1.0
+
+    aggregator = MetricAggregator(log_file_path, num_writers=2, reduction="mean")
+    client.add("loss", 1, 3.0, 0.0)
+    client.collect(final=True)
+    # Writer 0 only waits for the writers whose connections it already accepted
+    deadline = time.monotonic() + 5
+    while aggregator._num_connected_writers == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    aggregator.add("loss", 0, 3.0, 0.0)
+    aggregator.add("loss", 1, 5.0, 0.0)
+    events = aggregator.collect(final=True)
+    assert sorted((step, value) for _, step, value, _ in events) == [(0, 2.0), (1, 4.0)]
+
+
+def test_aggregation_runs_without_holding_buffers_lock(tmp_path, monkeypatch):
+    logger = ExperimentLogger(logdir=str(tmp_path), run_name="run", writer_id=1, num_writers=2, aggregation="mean",
+                              log_interval=60)
+    lock_states = []
+
+    def collect(final=False):
+        lock_states.append(logger._buffers_lock.locked())
+        return []
+
+    monkeypatch.setattr(logger._aggregation, "collect", collect)
+    logger.add_scalar("loss", 1.0, 0)
+    logger._clean_up()
+    assert lock_states == [False]
+
+
+def test_unreachable_aggregator_is_reported_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(AggregationClient, "CONNECT_TIMEOUT", 0.0)
+    client = AggregationClient(os.path.join(str(tmp_path), "run.dat"), writer_id=1)
+    client.add("loss", 0, 1.0, 0.0)
+    with pytest.warns(RuntimeWarning, match="writer 1"):
+        client.collect(final=True)
+    client.add("loss", 1, 1.0, 0.0)
+    assert not client._batch
+
+
+def test_step_is_complete_only_once_every_writer_logged_it(tmp_path):
+    aggregator = MetricAggregator(os.path.join(str(tmp_path), "run.dat"), num_writers=2, reduction="sum")
+    aggregator.add("loss", 0, 1.0, 0.0)
+    aggregator.add("loss", 0, 2.0, 0.0)
+    assert aggregator.collect() == []
+
+    # Writers which never connected aren't waited for when writer 0 is closed
+    start = time.monotonic()
+    events = aggregator.collect(final=True)
+    assert time.monotonic() - start < MetricAggregator.CLOSE_TIMEOUT / 2
+    assert [(step, value) for _, step, value, _ in events] == [(0, 2.0)]
+
+
+def test_writers_reduce_values_of_the_same_step(tmp_path):
+    loggers = [
+        ExperimentLogger(logdir=str(tmp_path), run_name="run", writer_id=writer_id, num_writers=2, aggregation="mean")
+            for writer_id in range(2)
+    ]
+    for step in range(10):
+        for writer_id, logger in enumerate(loggers):
+            logger.add_scalar("loss", step + writer_id, step)
+    loggers[1]._clean_up()
+    deadline = time.monotonic() + 5
+    while loggers[0]._aggregation._num_connected_writers == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    loggers[0]._clean_up()
+
+    steps, values, _ = load_experiment_columns(os.path.join(str(tmp_path), "run", "run.dat"))["loss"]
+    assert list(steps) == list(range(10))
+    assert list(values) == [step + 0.5 for step in range(10)]
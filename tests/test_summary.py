@@ -0,0 +1,57 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+
+from ml_tracking_ops.experiment.logger import ExperimentLogger
+from ml_tracking_ops.experiment.summary import MetricSummary, read_run_summary
+from ml_tracking_ops.ml_tracking_ops.index import RunIndex
+from ml_tracking_ops.ml_tracking_ops.utils import merge_metric_summaries
+
+
+def test_summary_converts_numpy_values():
+    summary = MetricSummary("max")
+    summary.update(np.int64(1), np.float32(0.5), 0.1)
+    summary.update_batch(np.array([2, 3], dtype=np.int64), np.array([0.25, 0.75], dtype=np.float32), 0.2)
+
+    assert type(summary.last) is float and type(summary.last_step) is int
+    assert type(summary.best) is float and summary.best == 0.75
+    assert type(summary.max_step) is int and summary.max_step == 3
+
+
+@pytest.mark.parametrize("async_logging", [False, True])
+def test_logger_writes_summary_of_numpy_scalars(tmp_path, async_logging):
+    logger = ExperimentLogger(logdir=str(tmp_path), run_name="run", async_logging=async_logging)
+    for step in range(5):
+        logger.add_scalar("acc", np.float32(step / 10), np.int64(step))
+    logger.add_scalars(np.int32(5), {"acc": np.float64(0.9), "loss": np.float16(0.5)})
+    logger.add_scalar_array("batch_loss", np.linspace(1, 0, 10, dtype=np.float32), np.arange(10))
+    logger._clean_up()
+
+    log_file_path, = glob.glob(os.path.join(str(tmp_path), "run", "*.dat"))
+    metrics = read_run_summary(log_file_path)["metrics"]
+    assert metrics["acc"]["count"] == 6
+    assert metrics["acc"]["last"] == pytest.approx(0.9)
+    assert metrics["loss"]["last_step"] == 5
+    assert metrics["batch_loss"]["min"] == 0.0
+
+
+def test_metric_summary_skips_nan(tmp_path):
+    logger = ExperimentLogger(logdir=str(tmp_path), run_name="run")
+    for step, value in enumerate([float("nan"), 3.0, 1.0]):
+        logger.add_scalar("loss", value, step)
+    logger.add_scalar("diverged", float("nan"), 0)
+    logger._clean_up()
+    log_file_path = os.path.join(str(tmp_path), "run", "run.dat")
+
+    index = RunIndex(str(tmp_path), persist=False)
+    summary = index.get_metric_summary(log_file_path, "loss")
+    assert (summary["min"], summary["max"], summary["last"]) == (1.0, 3.0, 1.0)
+    metrics = read_run_summary(log_file_path)["metrics"]
+    assert (metrics["loss"]["min"], metrics["loss"]["max"]) == (1.0, 3.0)
+    diverged = index.get_metric_summary(log_file_path, "diverged")
+    assert (diverged["min"], diverged["max"]) == (None, None)
+
+    merged = merge_metric_summaries([diverged, summary])
+    assert (merged["count"], merged["min"], merged["max"]) == (4, 1.0, 3.0)
@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+
+from ml_tracking_ops.experiment.logger import ExperimentLogger
+from ml_tracking_ops.experiment.writer import EventQueue, BackgroundWriter
+
+
+def test_failed_writer_releases_blocked_producers():
+    event_queue = EventQueue(capacity=2, backpressure="block")
+
+    def write_event(*event):
+        raise OSError("No space left on device")
+
+    writer = BackgroundWriter(event_queue, write_event, lambda: None, flush_interval=0.05)
+    writer.start()
+    with pytest.raises(RuntimeError) as error:
+        for step in range(1000):
+            event_queue.put(("loss", step, 0.0, 0.0))
+    assert isinstance(error.value.__cause__, OSError)
+
+    with pytest.raises(RuntimeError):
+        writer.stop()
+    assert not writer.is_alive()
+
+
+def test_stats_while_async_writer_registers_metrics(tmp_path):
+    logger = ExperimentLogger(logdir=str(tmp_path), run_name="run", async_logging=True)
+    errors = []
+    done = threading.Event()
+
+    def read_stats():
+        try:
+            while not done.is_set():
+                logger.stats()
+        except Exception as e:
+            errors.append(e)
+
+    reader = threading.Thread(target=read_stats)
+    reader.start()
+    for metric_idx in range(2000):
+        logger.add_scalar(f"metric_{metric_idx}", 0.5, 0)
+    logger._clean_up()
+    done.set()
+    reader.join()
+
+    assert not errors
+    assert len(logger.stats()["buffers"]) == 2000
+
+
+def test_failed_periodic_flush_is_raised(tmp_path, monkeypatch):
+    logger = ExperimentLogger(logdir=str(tmp_path), run_name="run", log_interval=0.01)
+
+    def write_run_summary(*args):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr("ml_tracking_ops.experiment.logger.write_run_summary", write_run_summary)
+    logger.add_scalar("loss", 0.5, 0)
+    logger._log_timer.join(timeout=5)
+    assert not logger._log_timer.is_alive()
+
+    with pytest.raises(RuntimeError) as error:
+        logger.add_scalar("loss", 0.25, 1)
+    assert isinstance(error.value.__cause__, OSError)
+    with pytest.raises(RuntimeError):
+        logger._clean_up()